@@ -0,0 +1,62 @@
+"""Benchmark of response JSON decoding: requests' Response.json() against
+the UTIL decoders working on raw bytes.
+
+Run with: python -m benchmarks.bench_json
+"""
+
+import json
+import timeit
+
+import requests
+
+from noaa_sdk.util import JSON_DECODERS, UTIL
+
+
+def alerts_payload(count=2000):
+    feature = {
+        'id': 'https://api.weather.gov/alerts/urn:oid:2.49.0.1.840.0.{}',
+        'type': 'Feature',
+        'geometry': {'type': 'Polygon', 'coordinates': [[
+            [-73.8 + i * 0.01, 40.7 + i * 0.01] for i in range(20)]]},
+        'properties': {
+            'areaDesc': 'Queens; Kings; New York',
+            'geocode': {'UGC': ['NYZ072', 'NYZ073', 'NYZ074']},
+            'sent': '2020-01-01T00:51:00-05:00',
+            'expires': '2020-01-01T06:00:00-05:00',
+            'severity': 'Moderate',
+            'event': 'Winter Weather Advisory',
+            'description': 'Snow expected. ' * 40,
+        },
+    }
+    return json.dumps({
+        'type': 'FeatureCollection',
+        'features': [dict(feature, id=feature['id'].format(i))
+                     for i in range(count)]}).encode('utf-8')
+
+
+def make_response(content):
+    response = requests.Response()
+    response._content = content
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/geo+json'
+    return response
+
+
+def main(number=10):
+    content = alerts_payload()
+    print('payload: {:.1f} MB'.format(len(content) / 1e6))
+    baseline = timeit.timeit(
+        lambda: make_response(content).json(), number=number) / number
+    print('{:<24} {:8.2f} ms'.format('Response.json()', baseline * 1e3))
+    for name in sorted(JSON_DECODERS):
+        util = UTIL(json_decoder=name)
+        elapsed = timeit.timeit(
+            lambda: util.decode_json(make_response(content)),
+            number=number) / number
+        print('{:<24} {:8.2f} ms  speedup {:4.1f}x'.format(
+            'decode_json ({})'.format(name), elapsed * 1e3,
+            baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
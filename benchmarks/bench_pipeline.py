@@ -0,0 +1,208 @@
+"""Benchmark of the request pipeline (session, retries, caches, decoding)
+against a local stub server emulating api.weather.gov, Nominatim and NCDC.
+
+Reports throughput and p50/p99 latency of get_forecasts, get_observations,
+active_alerts and NCDC.datasets.
+
+Run with: python -m benchmarks.bench_pipeline [--latency 0.02] [--payload 500]
+    [--error-rate 0.05] [--requests 200] [--concurrency 8] [--no-cache]
+or, with pytest-benchmark installed:
+    python -m pytest benchmarks/bench_pipeline.py
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import logging
+import time
+
+from benchmarks.bench_json import alerts_payload
+from noaa_sdk.ncdc import NCDC
+from noaa_sdk.noaa import NOAA
+from noaa_sdk.retry import RetryPolicy
+from tests.stub_server import StubServer
+
+try:
+    import pytest
+except ImportError:
+    pytest = None
+
+
+def forecast_payload(periods):
+    return {'properties': {'periods': [{
+        'number': i + 1,
+        'startTime': '2020-01-01T{:02d}:00:00-05:00'.format(i % 24),
+        'temperature': 30 + i % 10,
+        'temperatureUnit': 'F',
+        'windSpeed': '10 mph',
+        'shortForecast': 'Chance Light Snow',
+        'detailedForecast': 'A chance of light snow. ' * 4,
+    } for i in range(periods)]}}
+
+
+def observations_payload(count):
+    quantity = {'value': 1.5, 'unitCode': 'wmoUnit:degC',
+                'qualityControl': 'V'}
+    return {'features': [{'properties': {
+        'station': 'https://api.weather.gov/stations/KJFK',
+        'timestamp': '2020-01-01T{:02d}:51:00+00:00'.format(i % 24),
+        'textDescription': 'Cloudy',
+        'temperature': quantity,
+        'dewpoint': quantity,
+        'windSpeed': quantity,
+        'relativeHumidity': quantity,
+        'barometricPressure': quantity,
+    }} for i in range(count)]}
+
+
+def datasets_payload(count):
+    return {
+        'metadata': {'resultset': {
+            'offset': 1, 'count': count, 'limit': count}},
+        'results': [{
+            'uid': 'gov.noaa.ncdc:C{:05d}'.format(i),
+            'mindate': '1763-01-01', 'maxdate': '2020-01-01',
+            'name': 'Dataset {}'.format(i), 'datacoverage': 1,
+            'id': 'DS{}'.format(i)} for i in range(count)]}
+
+
+def routes(server, payload):
+    """Routes of the emulated services.
+
+    Args:
+        server (StubServer): server the absolute links point to.
+        payload (int): number of items in list responses (forecast
+            periods, observations, alerts, datasets).
+    Returns:
+        dict: routes for StubServer.
+    """
+    return {
+        '/search': [{'lat': '40.7', 'lon': '-73.8'}],
+        '/points/40.7,-73.8': {'properties': {
+            'forecast': server.url('/gridpoints/OKX/33,35/forecast'),
+            'forecastHourly': server.url(
+                '/gridpoints/OKX/33,35/forecast/hourly'),
+            'observationStations': server.url(
+                '/gridpoints/OKX/33,35/stations')}},
+        '/gridpoints/OKX/33,35/forecast': forecast_payload(payload),
+        '/gridpoints/OKX/33,35/forecast/hourly': forecast_payload(payload),
+        '/gridpoints/OKX/33,35/stations': {'observationStations': [
+            server.url('/stations/KJFK')]},
+        '/stations/KJFK/observations': observations_payload(payload),
+        '/alerts/active': alerts_payload(payload),
+        '/cdo-web/api/v2/datasets': datasets_payload(payload),
+    }
+
+
+SCENARIOS = {
+    'get_forecasts': lambda n, c: n.get_forecasts('11365', 'US'),
+    'get_observations': lambda n, c: list(
+        n.get_observations('11365', 'US')),
+    'active_alerts': lambda n, c: n.active_alerts(),
+    'ncdc_datasets': lambda n, c: c.datasets(),
+}
+
+
+def make_clients(server, cache=True, concurrency=8):
+    kwargs = {
+        'pool_maxsize': concurrency,
+        'retry_policy': RetryPolicy(
+            max_attempts=6, backoff_base=0.01, backoff_cap=0.1),
+    }
+    if not cache:
+        kwargs.update(geocode_cache=False, points_cache=False)
+    n = server.point(NOAA(user_agent='benchmark', **kwargs))
+    kwargs.pop('geocode_cache', None)
+    kwargs.pop('points_cache', None)
+    c = server.point(NCDC('token', user_agent='benchmark', **kwargs))
+    return n, c
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return float('nan')
+    index = max(0, min(len(values) - 1,
+                       int(round(q / 100.0 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def run(scenario, n, c, requests=200, concurrency=8):
+    """Call a scenario repeatedly from concurrent threads.
+
+    Returns:
+        dict: throughput (calls per second), p50 and p99 (seconds) and the
+        number of failed calls.
+    """
+    def call(_):
+        started = time.perf_counter()
+        try:
+            scenario(n, c)
+        except Exception:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(r for r in results if r is not None)
+    return {
+        'throughput': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'failures': len(results) - len(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every response')
+    parser.add_argument('--payload', type=int, default=100,
+                        help='items in list responses')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with 503')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--no-cache', action='store_true',
+                        help='disable the geocode and points caches')
+    args = parser.parse_args(argv)
+    logging.getLogger('noaa_sdk.retry').setLevel(logging.ERROR)
+
+    server = StubServer(latency=args.latency, error_rate=args.error_rate,
+                        seed=0)
+    server.routes.update(routes(server, args.payload))
+    with server:
+        n, c = make_clients(
+            server, cache=not args.no_cache, concurrency=args.concurrency)
+        print('{:<18} {:>10} {:>10} {:>10} {:>9}'.format(
+            'scenario', 'calls/s', 'p50 ms', 'p99 ms', 'failures'))
+        for name in sorted(SCENARIOS):
+            result = run(SCENARIOS[name], n, c, requests=args.requests,
+                         concurrency=args.concurrency)
+            print('{:<18} {:>10.1f} {:>10.2f} {:>10.2f} {:>9}'.format(
+                name, result['throughput'], result['p50'] * 1e3,
+                result['p99'] * 1e3, result['failures']))
+        n.close()
+        c.close()
+
+
+if pytest is not None:
+    @pytest.fixture(scope='module')
+    def clients():
+        pytest.importorskip('pytest_benchmark')
+        server = StubServer()
+        server.routes.update(routes(server, 100))
+        with server:
+            n, c = make_clients(server)
+            yield n, c
+            n.close()
+            c.close()
+
+    @pytest.mark.parametrize('name', sorted(SCENARIOS))
+    def test_pipeline(benchmark, clients, name):
+        benchmark(SCENARIOS[name], *clients)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Micro-benchmark of UTIL timestamp parsing against plain strptime.
+
+Run with: python -m benchmarks.bench_timestamps
+"""
+
+from datetime import datetime, timedelta
+import timeit
+
+from noaa_sdk.util import UTIL, _parse_iso_param_timestamp
+
+PARAM_FORMATS = ['%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S']
+PARAM_VALUES = ['2020-01-01', '2020-01-01 12:30:00', '2020-01-01T12:30:00Z']
+# Distinct values, more than the parse cache holds, so every call parses.
+DISTINCT_PARAM_VALUES = [
+    (datetime(2000, 1, 1) + timedelta(minutes=37 * i)).strftime(
+        PARAM_FORMATS[i % len(PARAM_FORMATS)])
+    for i in range(6000)]
+RESPONSE_VALUES = [
+    '2020-01-{:02d}T{:02d}:51:00+00:00'.format(day, hour)
+    for day in range(1, 29) for hour in range(24)]
+
+
+def strptime_param_timestamp(value):
+    for format in PARAM_FORMATS:
+        try:
+            return datetime.strptime(value, format)
+        except Exception:
+            continue
+    raise Exception('invalid')
+
+
+def strptime_response_timestamp(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S+00:00')
+
+
+def bench(name, baseline, optimized, number):
+    before = timeit.timeit(baseline, number=number)
+    after = timeit.timeit(optimized, number=number)
+    print('{:<32} strptime {:8.2f} us  fast {:8.2f} us  speedup {:5.1f}x'
+          .format(name, before / number * 1e6, after / number * 1e6,
+                  before / after))
+
+
+def main():
+    util = UTIL()
+    for value in PARAM_VALUES + DISTINCT_PARAM_VALUES:
+        assert util.parse_param_timestamp(value) == (
+            strptime_param_timestamp(value))
+    _parse_iso_param_timestamp.cache_clear()
+    bench(
+        'parse_param_timestamp (distinct)',
+        lambda: [strptime_param_timestamp(v) for v in DISTINCT_PARAM_VALUES],
+        lambda: [util.parse_param_timestamp(v) for v in DISTINCT_PARAM_VALUES],
+        number=10)
+    bench(
+        'parse_param_timestamp (memoized)',
+        lambda: [strptime_param_timestamp(v) for v in PARAM_VALUES],
+        lambda: [util.parse_param_timestamp(v) for v in PARAM_VALUES],
+        number=20000)
+    bench(
+        'parse_response_timestamp',
+        lambda: strptime_response_timestamp(RESPONSE_VALUES[0]),
+        lambda: util.parse_response_timestamp(RESPONSE_VALUES[0]),
+        number=50000)
+    bench(
+        'parse_response_timestamps ({})'.format(len(RESPONSE_VALUES)),
+        lambda: [strptime_response_timestamp(v) for v in RESPONSE_VALUES],
+        lambda: util.parse_response_timestamps(RESPONSE_VALUES),
+        number=50)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Asyncio wrappers for NOAA and NCDC
+==================================
+Coroutine versions of the NOAA and NCDC endpoint methods. Requests are
+executed by the synchronous clients on a bounded thread pool, so they share
+the client's pooled keep-alive session and retry behaviour and the event
+loop is never blocked. Any number of coroutines may be awaited at once,
+but max_concurrency worker threads is the real limit on requests in
+flight; the other calls wait for a free thread.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from types import GeneratorType
+
+from noaa_sdk.ncdc import NCDC
+from noaa_sdk.noaa import NOAA
+
+
+def _drain(func, *args, **kwargs):
+    result = func(*args, **kwargs)
+    if isinstance(result, GeneratorType):
+        return list(result)
+    return result
+
+
+def _coroutine(client_class, name, collect=False):
+    """Build a coroutine method delegating to the synchronous client.
+
+    Args:
+        client_class (class): synchronous client class (docstring source).
+        name (str): name of the method on the synchronous client.
+        collect (boolean[optional]): True to drain a generator result into
+            a list inside the worker thread.
+    Returns:
+        function: coroutine function.
+    """
+
+    async def method(self, *args, **kwargs):
+        func = getattr(self._client, name)
+        if collect:
+            func = partial(_drain, func)
+        return await self._run(func, *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = getattr(client_class, name).__doc__
+    return method
+
+
+class AsyncClient(object):
+    """Base class running a synchronous client on a bounded thread pool."""
+
+    DEFAULT_MAX_CONCURRENCY = 10
+
+    def __init__(self, client, max_concurrency=None):
+        """Constructor.
+
+        Args:
+            client (UTIL): synchronous client making the requests.
+            max_concurrency (int[optional]): number of worker threads,
+                which is the maximum number of requests in flight at the
+                same time whatever the number of coroutines awaited.
+        """
+        self._client = client
+        self._max_concurrency = (
+            max_concurrency or self.DEFAULT_MAX_CONCURRENCY)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        # Shutting down waits for the requests in flight, keep that off
+        # the event loop thread.
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    @property
+    def client(self):
+        return self._client
+
+    @property
+    def max_concurrency(self):
+        return self._max_concurrency
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(func, *args, **kwargs))
+
+    def close(self):
+        """Shut down the worker pool and close pooled connections."""
+        self._executor.shutdown(wait=True)
+        self._client.close()
+
+
+class AsyncNOAA(AsyncClient):
+    """Asyncio version of NOAA.
+
+    Every endpoint method of NOAA is available as a coroutine taking the
+    same arguments. Generator results (get_observations*) are returned as
+    lists.
+    """
+
+    def __init__(self, user_agent=None, accept=None, show_uri=False,
+                 max_concurrency=None, **kwargs):
+        """Constructor.
+
+        Args:
+            user_agent (str[optional]): user agent specified in the header.
+            accept (str[optional]): accept string specified in the header.
+            show_uri (boolean[optional]): True for showing the
+                actual url with query string being sent for requesting data.
+            max_concurrency (int[optional]): number of worker threads, the
+                maximum number of requests in flight at the same time. Also
+                used as the connection pool size unless pool_maxsize is
+                given.
+            kwargs: connection options passed through to NOAA.
+        """
+        max_concurrency = max_concurrency or self.DEFAULT_MAX_CONCURRENCY
+        kwargs.setdefault('pool_maxsize', max_concurrency)
+        super().__init__(
+            NOAA(user_agent=user_agent, accept=accept, show_uri=show_uri,
+                 **kwargs),
+            max_concurrency=max_concurrency)
+
+    get_forecasts = _coroutine(NOAA, 'get_forecasts')
+    get_observations = _coroutine(NOAA, 'get_observations', collect=True)
+    get_observations_by_lat_lon = _coroutine(
+        NOAA, 'get_observations_by_lat_lon', collect=True)
+    points = _coroutine(NOAA, 'points')
+    points_forecast = _coroutine(NOAA, 'points_forecast')
+    stations = _coroutine(NOAA, 'stations')
+    stations_observations = _coroutine(NOAA, 'stations_observations')
+    products = _coroutine(NOAA, 'products')
+    products_types = _coroutine(NOAA, 'products_types')
+    products_locations = _coroutine(NOAA, 'products_locations')
+    offices = _coroutine(NOAA, 'offices')
+    zones = _coroutine(NOAA, 'zones')
+    alerts = _coroutine(NOAA, 'alerts')
+    active_alerts = _coroutine(NOAA, 'active_alerts')
+
+
+class AsyncNCDC(AsyncClient):
+    """Asyncio version of NCDC."""
+
+    def __init__(self, token, user_agent=None, accept=None, show_uri=False,
+                 max_concurrency=None, **kwargs):
+        """Constructor.
+
+        Args:
+            token (str): token for api.
+            user_agent (str[optional]): user agent specified in the header.
+            accept (str[optional]): accept string specified in the header.
+            show_uri (boolean[optional]): True for showing the
+                actual url with query string being sent for requesting data.
+            max_concurrency (int[optional]): number of worker threads, the
+                maximum number of requests in flight at the same time.
+            kwargs: connection options passed through to NCDC.
+        """
+        max_concurrency = max_concurrency or self.DEFAULT_MAX_CONCURRENCY
+        kwargs.setdefault('pool_maxsize', max_concurrency)
+        super().__init__(
+            NCDC(token, user_agent=user_agent, accept=accept,
+                 show_uri=show_uri, **kwargs),
+            max_concurrency=max_concurrency)
+
+    request_end_point = _coroutine(NCDC, 'request_end_point')
+    datasets = _coroutine(NCDC, 'datasets')
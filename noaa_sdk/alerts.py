@@ -0,0 +1,493 @@
+"""
+Active alert watching
+=====================
+AlertWatcher polls /alerts/active (optionally for one zone, area or region)
+and reports what changed since the previous poll instead of the full set:
+
+    added    an alert id seen for the first time
+    updated  a known alert whose sent or expires time changed
+    expired  an alert that left the feed or whose expires time passed
+
+Polls are conditional (If-None-Match / If-Modified-Since), so an unchanged
+feed costs a 304 and no decoding. Alerts are indexed by id and expiry times
+are kept in a heap, so expiring alerts does not scan the index.
+
+AlertIndex answers which alerts affect a zone or a coordinate from one
+/alerts/active payload: an inverted map of UGC zone codes to alerts and an
+R-tree (Sort-Tile-Recursive packed) over the bounding boxes of the alert
+polygons, followed by point in polygon tests. Batches of coordinates are
+tested with numpy when it is installed.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+import heapq
+import math
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+EVENTS = ('added', 'updated', 'expired')
+
+AlertEvent = namedtuple('AlertEvent', ['type', 'id', 'alert'])
+
+
+def _timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _alert_id(feature):
+    return (feature.get('properties') or {}).get('id') or feature.get('id')
+
+
+class AlertWatcher(object):
+    """Incremental view of the active alerts."""
+
+    def __init__(self, client, callbacks=None, **params):
+        """Constructor.
+
+        Args:
+            client (NOAA): client used to poll the api.
+            callbacks (dict[optional]): {event: callable or list of
+                callables} called with an AlertEvent, event being one of
+                EVENTS.
+            params: zone_id, area or region to watch the alerts of, as
+                accepted by NOAA.active_alerts().
+        """
+        self._client = client
+        self._uri = client._active_alerts_uri(**params)
+        self._callbacks = dict((event, []) for event in EVENTS)
+        for event, callback in (callbacks or {}).items():
+            for function in (callback if isinstance(callback, (list, tuple))
+                             else [callback]):
+                self.add_callback(event, function)
+        self._validators = {}
+        self._alerts = {}
+        self._expiries = []
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def __contains__(self, alert_id):
+        return alert_id in self._alerts
+
+    @property
+    def alerts(self):
+        """dict: active alert features by id."""
+        return dict((alert_id, entry[2])
+                    for alert_id, entry in self._alerts.items())
+
+    def get(self, alert_id):
+        entry = self._alerts.get(alert_id)
+        return entry[2] if entry is not None else None
+
+    def add_callback(self, event, callback):
+        """Call a function for every event of a type.
+
+        Args:
+            event (str): one of EVENTS.
+            callback (function): called with an AlertEvent.
+        """
+        if event not in self._callbacks:
+            raise Exception('Error: unknown alert event {}.'.format(event))
+        self._callbacks[event].append(callback)
+
+    def remove_callback(self, event, callback):
+        if event in self._callbacks and callback in self._callbacks[event]:
+            self._callbacks[event].remove(callback)
+
+    def poll(self, now=None):
+        """Fetch the active alerts once and apply the changes.
+
+        Args:
+            now (float[optional]): current time (seconds since the epoch)
+                used to expire alerts. Defaults to time.time().
+        Returns:
+            list: AlertEvent of the changes, also passed to the callbacks.
+        """
+        now = time.time() if now is None else now
+        features = self._fetch()
+        events = []
+        if features is not None:
+            events.extend(self._apply(features, now))
+        events.extend(self._expire(now))
+        for event in events:
+            for callback in self._callbacks[event.type]:
+                callback(event)
+        return events
+
+    def watch(self, interval=30, polls=None):
+        """Poll forever (or polls times) and yield the changes.
+
+        Args:
+            interval (float[optional]): seconds between polls.
+            polls (int[optional]): number of polls before stopping.
+        Returns:
+            generator: AlertEvent of each change.
+        """
+        count = 0
+        while polls is None or count < polls:
+            if count:
+                time.sleep(interval)
+            for event in self.poll():
+                yield event
+            count += 1
+
+    def _fetch(self):
+        response = self._client.make_conditional_get_request(
+            self._uri, validators=self._validators,
+            end_point=self._client.DEFAULT_END_POINT)
+        if not response.modified:
+            # A 304 may come without validators, keep the previous ones.
+            self._validators = response.validators() or self._validators
+            return None
+        self._validators = response.validators()
+        return response.body.get('features', [])
+
+    def _apply(self, features, now):
+        events = []
+        seen = set()
+        for feature in features:
+            alert_id = _alert_id(feature)
+            if alert_id is None:
+                continue
+            seen.add(alert_id)
+            properties = feature.get('properties') or {}
+            sent = properties.get('sent')
+            expires = _timestamp(properties.get('expires'))
+            entry = self._alerts.get(alert_id)
+            if entry is not None and entry[0] == sent and (
+                    entry[1] == expires):
+                continue
+            if expires is not None and expires <= now:
+                # Still listed but already over, the expiry below reports
+                # it if it was known.
+                continue
+            self._alerts[alert_id] = (sent, expires, feature)
+            if expires is not None:
+                heapq.heappush(self._expiries, (expires, alert_id))
+            events.append(AlertEvent(
+                'added' if entry is None else 'updated', alert_id, feature))
+        for alert_id in [alert_id for alert_id in self._alerts
+                         if alert_id not in seen]:
+            events.append(AlertEvent(
+                'expired', alert_id, self._alerts.pop(alert_id)[2]))
+        return events
+
+    def _expire(self, now):
+        events = []
+        while self._expiries and self._expiries[0][0] <= now:
+            expires, alert_id = heapq.heappop(self._expiries)
+            entry = self._alerts.get(alert_id)
+            # Entries of removed or since updated alerts are stale.
+            if entry is not None and entry[1] == expires:
+                del self._alerts[alert_id]
+                events.append(AlertEvent('expired', alert_id, entry[2]))
+        return events
+
+
+class AlertIndex(object):
+    """Zone and spatial index of alerts.
+
+    Alerts without a geometry (most zone based products) are only found
+    by zone. The spatial index is rebuilt on the first query following a
+    change.
+    """
+
+    NODE_CAPACITY = 16
+
+    def __init__(self, features=None):
+        """Constructor.
+
+        Args:
+            features (iterable[optional]): alert features, eg. the features
+                of NOAA.active_alerts().
+        """
+        self._alerts = {}
+        self._zones = {}
+        self._tree = None
+        self._polygons = None
+        self._arrays = None
+        self.update(features or [])
+
+    @classmethod
+    def fetch(cls, client, **params):
+        """Build an index of the active alerts.
+
+        Args:
+            client (NOAA): client used to fetch the alerts.
+            params: zone_id, area or region accepted by
+                NOAA.active_alerts().
+        Returns:
+            AlertIndex: index of the alerts fetched.
+        """
+        return cls(client.active_alerts(**params).get('features', []))
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def __contains__(self, alert_id):
+        return alert_id in self._alerts
+
+    def get(self, alert_id):
+        return self._alerts.get(alert_id)
+
+    def update(self, features):
+        """Add alerts or replace the alerts with the same id.
+
+        Args:
+            features (iterable): alert features.
+        """
+        for feature in features:
+            alert_id = _alert_id(feature)
+            if alert_id is None:
+                continue
+            if alert_id in self._alerts:
+                self._unlink(alert_id)
+            self._alerts[alert_id] = feature
+            for zone in _zones(feature):
+                self._zones.setdefault(zone, {})[alert_id] = None
+        self._polygons = None
+
+    def remove(self, alert_ids):
+        """Remove alerts.
+
+        Args:
+            alert_ids (iterable): ids of the alerts to remove.
+        """
+        for alert_id in alert_ids:
+            if alert_id in self._alerts:
+                self._unlink(alert_id)
+                del self._alerts[alert_id]
+        self._polygons = None
+
+    def _unlink(self, alert_id):
+        for zone in _zones(self._alerts[alert_id]):
+            alerts = self._zones.get(zone)
+            if alerts is not None:
+                alerts.pop(alert_id, None)
+                if not alerts:
+                    del self._zones[zone]
+
+    def attach(self, watcher):
+        """Keep the index in sync with an AlertWatcher.
+
+        Args:
+            watcher (AlertWatcher): watcher whose events update the index.
+        """
+        self.update(watcher.alerts.values())
+        watcher.add_callback('added', self._on_change)
+        watcher.add_callback('updated', self._on_change)
+        watcher.add_callback('expired', self._on_expired)
+
+    def _on_change(self, event):
+        self.update([event.alert])
+
+    def _on_expired(self, event):
+        self.remove([event.id])
+
+    def alerts_for_zone(self, zone):
+        """Get the alerts affecting a zone.
+
+        Args:
+            zone (str): UGC zone code (eg. NYZ072 or NYC081).
+        Returns:
+            list: alert ids.
+        """
+        return list(self._zones.get(zone.upper(), ()))
+
+    def alerts_for_point(self, lat, lon):
+        """Get the alerts whose polygon contains a coordinate.
+
+        Args:
+            lat (float): latitude.
+            lon (float): longitude.
+        Returns:
+            list: alert ids.
+        """
+        self._build()
+        matches = sorted(
+            index for index in _search(self._tree, lon, lat)
+            if _contains(self._polygons[index][2], lon, lat))
+        return _dedup(self._polygons[index][0] for index in matches)
+
+    def alerts_for_points(self, lats, lons):
+        """Get the alerts whose polygon contains each coordinate.
+
+        With numpy, each polygon is tested against the coordinates
+        falling in its bounding box at once; otherwise the coordinates
+        are looked up one by one.
+
+        Args:
+            lats (list): latitudes.
+            lons (list): longitudes.
+        Returns:
+            list: list of alert ids for each coordinate.
+        """
+        if np is None:
+            return [self.alerts_for_point(lat, lon)
+                    for lat, lon in zip(lats, lons)]
+        self._build()
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        order = np.argsort(lons, kind='stable')
+        xs, ys = lons[order], lats[order]
+        results = [[] for _ in range(len(xs))]
+        for (alert_id, box, _), (x1, y1, y2, slope) in zip(
+                self._polygons, self._edge_arrays()):
+            start = np.searchsorted(xs, box[0], side='left')
+            stop = np.searchsorted(xs, box[2], side='right')
+            if start >= stop:
+                continue
+            px, py = xs[start:stop], ys[start:stop]
+            candidates = np.nonzero((py >= box[1]) & (py <= box[3]))[0]
+            if not len(candidates):
+                continue
+            # Even-odd rule over every (coordinate, edge) pair.
+            px, py = px[candidates, None], py[candidates, None]
+            crossings = ((y1 > py) != (y2 > py)) & (
+                px < x1 + (py - y1) * slope)
+            inside = np.count_nonzero(crossings, axis=1) % 2 == 1
+            for position in order[start + candidates[inside]].tolist():
+                matched = results[position]
+                if not matched or matched[-1] != alert_id:
+                    matched.append(alert_id)
+        return results
+
+    def _build(self):
+        if self._polygons is not None:
+            return
+        polygons = []
+        for alert_id, feature in self._alerts.items():
+            for rings in _polygon_rings(feature.get('geometry')):
+                edges = _edges(rings)
+                if edges:
+                    polygons.append((alert_id, _edges_box(edges), edges))
+        self._tree = _pack(
+            [(box, index) for index, (_, box, _) in enumerate(polygons)],
+            self.NODE_CAPACITY)
+        self._polygons = polygons
+        self._arrays = None
+
+    def _edge_arrays(self):
+        # x1, y1, y2 and the inverse slope of the non horizontal edges of
+        # each polygon.
+        if self._arrays is None:
+            arrays = []
+            for _, _, edges in self._polygons:
+                edges = np.array([edge for edge in edges
+                                  if edge[1] != edge[3]], dtype=np.float64)
+                edges = edges.reshape(-1, 4)
+                arrays.append((edges[:, 0], edges[:, 1], edges[:, 3],
+                               (edges[:, 2] - edges[:, 0]) /
+                               (edges[:, 3] - edges[:, 1])))
+            self._arrays = arrays
+        return self._arrays
+
+
+def _zones(feature):
+    properties = feature.get('properties') or {}
+    zones = (properties.get('geocode') or {}).get('UGC')
+    if not zones:
+        zones = [uri.rstrip('/').split('/')[-1]
+                 for uri in properties.get('affectedZones') or []]
+    return [zone.upper() for zone in zones]
+
+
+def _polygon_rings(geometry):
+    if not geometry:
+        return []
+    if geometry.get('type') == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry.get('type') == 'MultiPolygon':
+        return geometry['coordinates']
+    if geometry.get('type') == 'GeometryCollection':
+        return [rings for part in geometry.get('geometries', [])
+                for rings in _polygon_rings(part)]
+    return []
+
+
+def _edges(rings):
+    # Edges of every ring (holes included, the even-odd rule handles them)
+    # as (x1, y1, x2, y2) in degrees.
+    edges = []
+    for ring in rings:
+        points = [(float(point[0]), float(point[1])) for point in ring]
+        if len(points) < 3:
+            continue
+        if points[0] != points[-1]:
+            points.append(points[0])
+        edges.extend((x1, y1, x2, y2) for (x1, y1), (x2, y2) in zip(
+            points, points[1:]))
+    return edges
+
+
+def _edges_box(edges):
+    xs = [x for edge in edges for x in (edge[0], edge[2])]
+    ys = [y for edge in edges for y in (edge[1], edge[3])]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _contains(edges, x, y):
+    inside = False
+    for x1, y1, x2, y2 in edges:
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (
+                y2 - y1):
+            inside = not inside
+    return inside
+
+
+def _dedup(alert_ids):
+    # Alert ids of consecutive polygons of the same alert appear once.
+    results = []
+    for alert_id in alert_ids:
+        if not results or results[-1] != alert_id:
+            results.append(alert_id)
+    return results
+
+
+def _pack(entries, capacity):
+    # Sort-Tile-Recursive bulk loading: each level sorts the entries by x
+    # into vertical slabs, each slab by y, and groups runs of capacity
+    # entries into a node (box, children). Leaf entries hold an int.
+    if not entries:
+        return None
+    while True:
+        count = int(math.ceil(len(entries) / float(capacity)))
+        per_slab = int(math.ceil(math.sqrt(count))) * capacity
+        entries = sorted(entries, key=lambda e: e[0][0] + e[0][2])
+        nodes = []
+        for i in range(0, len(entries), per_slab):
+            slab = sorted(entries[i:i + per_slab],
+                          key=lambda e: e[0][1] + e[0][3])
+            for j in range(0, len(slab), capacity):
+                group = slab[j:j + capacity]
+                nodes.append(((min(e[0][0] for e in group),
+                               min(e[0][1] for e in group),
+                               max(e[0][2] for e in group),
+                               max(e[0][3] for e in group)), group))
+        if len(nodes) == 1:
+            return nodes[0]
+        entries = nodes
+
+
+def _search(node, x, y):
+    if node is None:
+        return
+    stack = [node]
+    while stack:
+        for box, child in stack.pop()[1]:
+            if box[0] <= x <= box[2] and box[1] <= y <= box[3]:
+                if isinstance(child, list):
+                    stack.append((box, child))
+                else:
+                    yield child
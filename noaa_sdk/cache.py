@@ -0,0 +1,358 @@
+"""
+Caches used by the SDK clients
+==============================
+In-memory LRU caches with optional time-to-live, an SQLite backed store for
+persisting entries across processes, the geocode cache combining both and
+an HTTP response cache honouring Cache-Control and validators.
+"""
+
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+import json
+import sqlite3
+import threading
+import time
+
+
+class LRUCache(object):
+    """Thread safe in-memory LRU cache with an optional time-to-live."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """Constructor.
+
+        Args:
+            maxsize (int[optional]): maximum number of entries kept.
+            ttl (float[optional]): seconds an entry stays valid
+                (None for no expiry).
+        """
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Get a cached value.
+
+        Args:
+            key (hashable): cache key.
+            default (object[optional]): value returned on a miss.
+        Returns:
+            object: cached value or default.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Cache a value.
+
+        Args:
+            key (hashable): cache key.
+            value (object): value to cache.
+            ttl (float[optional]): overrides the default time-to-live.
+        """
+        ttl = self._ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(object):
+    """Persistent key/value cache stored in an SQLite database.
+
+    Values must be JSON serializable. The database can be shared between
+    processes.
+    """
+
+    def __init__(self, path, ttl=None):
+        """Constructor.
+
+        Args:
+            path (str): path of the SQLite database file.
+            ttl (float[optional]): seconds an entry stays valid
+                (None for no expiry).
+        """
+        self._path = path
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache '
+                '(key TEXT PRIMARY KEY, value TEXT, expires REAL)')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires FROM cache WHERE key = ?',
+                (key,)).fetchone()
+            if row is None:
+                return default
+            if row[1] is not None and row[1] <= time.time():
+                with self._conn:
+                    self._conn.execute(
+                        'DELETE FROM cache WHERE key = ?', (key,))
+                return default
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        ttl = self._ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                (key, json.dumps(value), expires))
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM cache')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class GeocodeCache(object):
+    """Cache for geocoding results.
+
+    Lookups go to an in-memory LRU first and then to the optional on-disk
+    store, which also receives every new entry.
+    """
+
+    def __init__(self, maxsize=4096, ttl=None, path=None, store=None):
+        """Constructor.
+
+        Args:
+            maxsize (int[optional]): maximum number of entries kept in memory.
+            ttl (float[optional]): seconds an entry stays valid
+                (None for no expiry).
+            path (str[optional]): SQLite file used to persist entries.
+            store (object[optional]): any object with get/set methods used
+                as the persistent store instead of an SQLite file.
+        """
+        self._memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        if store is None and path:
+            store = SQLiteCache(path, ttl=ttl)
+        self._store = store
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    def stats(self):
+        """Get cache hit and miss counters.
+
+        Returns:
+            dict: hits, misses and number of entries held in memory.
+        """
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'size': len(self._memory)
+        }
+
+    def get(self, key):
+        """Get a cached geocoding result.
+
+        Args:
+            key (str): cache key.
+        Returns:
+            tuple: cached result or None.
+        """
+        value = self._memory.get(key)
+        if value is None and self._store is not None:
+            value = self._store.get(key)
+            if value is not None:
+                value = tuple(value)
+                self._memory.set(key, value)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def set(self, key, value):
+        self._memory.set(key, value)
+        if self._store is not None:
+            self._store.set(key, list(value))
+
+    def clear(self):
+        self._memory.clear()
+        if self._store is not None:
+            self._store.clear()
+
+
+class CachedResponse(object):
+    """Raw response body with the HTTP caching metadata it came with.
+
+    The raw bytes are kept rather than the decoded body so that every
+    cache hit decodes a fresh object callers are free to mutate.
+    """
+
+    def __init__(self, content, etag=None, last_modified=None,
+                 expires=None):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def is_fresh(self, now=None):
+        """True while the response may be served without revalidation."""
+        if self.expires is None:
+            return False
+        return (now or time.time()) < self.expires
+
+    def validators(self):
+        """Get conditional request headers for revalidating the response.
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HTTPCache(object):
+    """Response cache following HTTP caching semantics.
+
+    Responses are fresh for Cache-Control max-age (or until Expires) and are
+    revalidated afterwards with If-None-Match / If-Modified-Since so that a
+    304 Not Modified answer reuses the cached body. This is a private cache,
+    so the shared cache directives (s-maxage, public) are ignored.
+    """
+
+    def __init__(self, maxsize=256):
+        """Constructor.
+
+        Args:
+            maxsize (int[optional]): maximum number of responses kept.
+        """
+        self._entries = LRUCache(maxsize=maxsize)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Get a cached response.
+
+        Args:
+            key (hashable): cache key.
+        Returns:
+            CachedResponse: cached response or None.
+        """
+        return self._entries.get(key)
+
+    def store(self, key, response):
+        """Cache a response if its headers allow it.
+
+        Args:
+            key (hashable): cache key.
+            response (Response): response object holding the headers and
+                the raw body.
+        Returns:
+            CachedResponse: cached entry or None if not cacheable.
+        """
+        headers = getattr(response, 'headers', None) or {}
+        directives = self._cache_control(headers)
+        if 'no-store' in directives:
+            return None
+        entry = CachedResponse(
+            response.content, etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+            expires=self._expires(headers, directives))
+        if entry.expires is None and not entry.validators():
+            return None
+        self._entries.set(key, entry)
+        return entry
+
+    def revalidated(self, key, entry, response):
+        """Refresh a cached entry after a 304 Not Modified response.
+
+        Args:
+            key (hashable): cache key.
+            entry (CachedResponse): entry that was revalidated.
+            response (Response): the 304 response.
+        Returns:
+            CachedResponse: refreshed entry.
+        """
+        headers = getattr(response, 'headers', None) or {}
+        entry.expires = self._expires(headers, self._cache_control(headers))
+        entry.etag = headers.get('ETag') or entry.etag
+        entry.last_modified = (
+            headers.get('Last-Modified') or entry.last_modified)
+        self._entries.set(key, entry)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def _cache_control(self, headers):
+        directives = {}
+        for directive in headers.get('Cache-Control', '').split(','):
+            name, _, value = directive.strip().partition('=')
+            if name:
+                directives[name.lower()] = value.strip('"')
+        return directives
+
+    def _expires(self, headers, directives):
+        if 'no-cache' in directives:
+            return None
+        now = time.time()
+        if 'max-age' in directives:
+            try:
+                max_age = int(directives['max-age'])
+                age = int(headers.get('Age', 0))
+            except ValueError:
+                return None
+            return now + max_age - age
+        if headers.get('Expires'):
+            try:
+                expires = parsedate_to_datetime(headers['Expires'])
+            except (TypeError, ValueError):
+                return None
+            if expires is None:
+                return None
+            return expires.timestamp()
+        return None
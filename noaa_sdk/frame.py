@@ -0,0 +1,331 @@
+"""
+Columnar results
+================
+Observations and gridpoint forecasts parsed straight into typed NumPy
+arrays, one per variable. Requires numpy; pandas is only needed for
+to_pandas().
+"""
+
+from datetime import datetime, timezone
+import math
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def require_numpy():
+    if np is None:
+        raise Exception(
+            'Error: numpy is required for columnar results. '
+            'Install it with: pip install numpy')
+
+
+class ObservationFrame(object):
+    """Observations stored column by column.
+
+    Quantities ({'value', 'unitCode', 'qualityControl'} dictionaries) become
+    float64 arrays with NaN for missing values and their unit is recorded
+    once in units. timestamp becomes a datetime64[s] (UTC) array and other
+    scalar fields become object arrays. Nested lists (eg. cloudLayers,
+    presentWeather) are not kept.
+    """
+
+    def __init__(self, columns, units=None):
+        """Constructor.
+
+        Args:
+            columns (dict): column name to numpy array of equal lengths.
+            units (dict[optional]): column name to unit code.
+        """
+        require_numpy()
+        self._columns = columns
+        self._units = units or {}
+        lengths = set(len(column) for column in columns.values())
+        if len(lengths) > 1:
+            raise Exception('Error: columns must have the same length.')
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_observations(cls, observations):
+        """Build a frame from observations.
+
+        Args:
+            observations (iterable): observation dictionaries or GeoJSON
+                observation features (as returned by stations_observations).
+        Returns:
+            ObservationFrame: columnar observations.
+        """
+        require_numpy()
+        values = {}
+        quantities = set()
+        units = {}
+        count = 0
+        for observation in observations:
+            if 'properties' in observation:
+                observation = observation['properties']
+            for name, value in observation.items():
+                if isinstance(value, dict):
+                    if 'value' not in value:
+                        continue
+                    if name not in units:
+                        units[name] = value.get('unitCode')
+                    quantities.add(name)
+                    value = value['value']
+                elif isinstance(value, list):
+                    continue
+                column = values.get(name)
+                if column is None:
+                    column = values[name] = [None] * count
+                elif len(column) < count:
+                    column.extend([None] * (count - len(column)))
+                column.append(value)
+            count += 1
+
+        columns = {}
+        for name, column in values.items():
+            if len(column) < count:
+                column.extend([None] * (count - len(column)))
+            if name == 'timestamp':
+                columns[name] = _parse_timestamps(column)
+            elif name in quantities:
+                columns[name] = np.array(column, dtype=np.float64)
+            else:
+                columns[name] = np.array(column, dtype=object)
+        return cls(columns, units=units)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    @property
+    def columns(self):
+        return sorted(self._columns)
+
+    @property
+    def units(self):
+        return dict(self._units)
+
+    def to_dict(self):
+        return dict(self._columns)
+
+    def to_pandas(self):
+        """Export the frame as a pandas DataFrame (requires pandas).
+
+        Returns:
+            DataFrame: one column per variable, indexed by timestamp when
+            available. Units are kept in DataFrame.attrs['units'].
+        """
+        try:
+            import pandas
+        except ImportError:
+            raise Exception(
+                'Error: pandas is required for to_pandas(). '
+                'Install it with: pip install pandas')
+        df = pandas.DataFrame(self._columns, columns=self.columns)
+        if 'timestamp' in self._columns:
+            df = df.set_index('timestamp')
+        df.attrs['units'] = self.units
+        return df
+
+
+def _parse_timestamps(values):
+    if all(value is None or value.endswith('+00:00') for value in values):
+        return np.array(
+            [value[:-6] if value is not None else 'NaT' for value in values],
+            dtype='datetime64[s]')
+    parsed = []
+    for value in values:
+        if value is None:
+            parsed.append(np.datetime64('NaT'))
+            continue
+        timestamp = datetime.strptime(value, '%Y-%m-%dT%H:%M:%S%z')
+        parsed.append(
+            timestamp.astimezone(timezone.utc).replace(tzinfo=None))
+    return np.array(parsed, dtype='datetime64[s]')
+
+
+_DURATION = re.compile(
+    r'^P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$')
+
+UNIT_CONVERSIONS = {
+    'wmoUnit:degF': ('wmoUnit:degC', 5.0 / 9.0, -32.0 * 5.0 / 9.0),
+    'wmoUnit:K': ('wmoUnit:degC', 1.0, -273.15),
+    'wmoUnit:km_h-1': ('wmoUnit:m_s-1', 1 / 3.6, 0.0),
+    'wmoUnit:kn': ('wmoUnit:m_s-1', 0.514444, 0.0),
+    'wmoUnit:mm': ('wmoUnit:m', 0.001, 0.0),
+    'wmoUnit:km': ('wmoUnit:m', 1000.0, 0.0),
+}
+
+
+def parse_duration_hours(duration):
+    """Parse an ISO-8601 duration (eg. P1DT5H) into hours.
+
+    Args:
+        duration (str): ISO-8601 duration.
+    Returns:
+        float: number of hours.
+    """
+    match = _DURATION.match(duration)
+    if match is None or duration in ('P', 'PT'):
+        raise Exception('Error: invalid duration {}.'.format(duration))
+    parts = dict((k, int(v or 0)) for k, v in match.groupdict().items())
+    return (parts['weeks'] * 168 + parts['days'] * 24 + parts['hours'] +
+            parts['minutes'] / 60.0 + parts['seconds'] / 3600.0)
+
+
+def _parse_time(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S%z')
+
+
+class GridForecast(object):
+    """Gridpoint forecast layers decoded into aligned hourly arrays.
+
+    Every numeric layer of a forecastGridData response becomes a float64
+    array covering the hours of validTimes (NaN where the layer has no
+    value). Layers with non numeric values (eg. weather, hazards) are left
+    out.
+    """
+
+    def __init__(self, times, layers, units=None, properties=None):
+        """Constructor.
+
+        Args:
+            times (numpy.ndarray): hourly datetime64[h] UTC time axis.
+            layers (dict): layer name to float64 array aligned with times.
+            units (dict[optional]): layer name to unit code.
+            properties (dict[optional]): scalar properties of the gridpoint.
+        """
+        require_numpy()
+        self._times = times
+        self._layers = layers
+        self._units = units or {}
+        self._properties = properties or {}
+
+    @classmethod
+    def from_properties(cls, properties, convert_units=True):
+        """Decode the properties of a forecastGridData response.
+
+        Args:
+            properties (dict): properties of the gridpoint response.
+            convert_units (boolean[optional]): True to convert layers to SI
+                units (degC, m_s-1, m) using UNIT_CONVERSIONS.
+        Returns:
+            GridForecast: decoded forecast.
+        """
+        require_numpy()
+        start, duration = properties['validTimes'].split('/')
+        origin = _parse_time(start)
+        length = int(math.ceil(parse_duration_hours(duration)))
+        base = np.datetime64(
+            origin.astimezone(timezone.utc).replace(tzinfo=None), 'h')
+        times = base + np.arange(length)
+
+        offsets = {}
+        layers = {}
+        units = {}
+        scalars = {}
+        for name, layer in properties.items():
+            if not isinstance(layer, dict) or 'values' not in layer:
+                if not isinstance(layer, (dict, list)):
+                    scalars[name] = layer
+                continue
+            values = layer['values']
+            if any(not isinstance(v.get('value'), (int, float, type(None)))
+                   for v in values):
+                continue
+            layers[name] = _expand_layer(values, origin, length, offsets)
+            unit = layer.get('uom')
+            if convert_units and unit in UNIT_CONVERSIONS:
+                unit, scale, offset = UNIT_CONVERSIONS[unit]
+                layers[name] = layers[name] * scale + offset
+            units[name] = unit
+        return cls(times, layers, units=units, properties=scalars)
+
+    def __len__(self):
+        return len(self._times)
+
+    def __getitem__(self, name):
+        return self._layers[name]
+
+    def __contains__(self, name):
+        return name in self._layers
+
+    @property
+    def times(self):
+        return self._times
+
+    @property
+    def layer_names(self):
+        return sorted(self._layers)
+
+    @property
+    def units(self):
+        return dict(self._units)
+
+    @property
+    def properties(self):
+        return dict(self._properties)
+
+    def to_array(self, names=None):
+        """Stack layers into a 2 dimensional array.
+
+        Args:
+            names (list[optional]): layers to stack (default: all, sorted).
+        Returns:
+            numpy.ndarray: array of shape (layers, hours).
+        """
+        names = names or self.layer_names
+        return np.vstack([self._layers[name] for name in names])
+
+    def to_pandas(self):
+        """Export the layers as a pandas DataFrame indexed by hour."""
+        try:
+            import pandas
+        except ImportError:
+            raise Exception(
+                'Error: pandas is required for to_pandas(). '
+                'Install it with: pip install pandas')
+        df = pandas.DataFrame(
+            self._layers, columns=self.layer_names,
+            index=pandas.Index(self._times, name='time'))
+        df.attrs['units'] = self.units
+        return df
+
+
+def _expand_layer(values, origin, length, offsets):
+    starts = np.empty(len(values), dtype=np.int64)
+    spans = np.empty(len(values), dtype=np.int64)
+    data = np.empty(len(values), dtype=np.float64)
+    for index, entry in enumerate(values):
+        valid_time = entry['validTime']
+        interval = offsets.get(valid_time)
+        if interval is None:
+            start, duration = valid_time.split('/')
+            hours = (_parse_time(start) - origin).total_seconds() / 3600.0
+            interval = offsets[valid_time] = (
+                int(math.floor(hours)),
+                max(1, int(math.ceil(parse_duration_hours(duration)))))
+        starts[index], spans[index] = interval
+        value = entry.get('value')
+        data[index] = np.nan if value is None else value
+
+    out = np.full(length, np.nan)
+    if not len(values):
+        return out
+    total = int(spans.sum())
+    ends = np.cumsum(spans)
+    positions = (np.arange(total) - np.repeat(ends - spans, spans) +
+                 np.repeat(starts, spans))
+    filled = np.repeat(data, spans)
+    mask = (positions >= 0) & (positions < length)
+    out[positions[mask]] = filled[mask]
+    return out
@@ -0,0 +1,328 @@
+"""
+Offline postal code gazetteer
+=============================
+Forward and reverse postal code geocoding from a GeoNames postal code dump
+(https://download.geonames.org/export/zip/) compiled into a binary file
+that is memory-mapped, so lookups need neither the network nor loading the
+table in memory.
+
+File layout (little-endian):
+    header    magic, version, record count, grid cell size (degrees),
+              strings offset, grid offset, grid entry count
+    records   sorted by hash of 'COUNTRY:POSTALCODE': hash (u64),
+              lat (f64), lon (f64), postal code offset (u32) and length (u8),
+              country code (2 bytes)
+    strings   postal codes
+    grid      (cell id, record index) pairs (u32, u32) sorted by cell id
+
+Build with:
+
+    python -m noaa_sdk.gazetteer build OUTPUT US.txt [CA.zip ...]
+"""
+
+from hashlib import blake2b
+import io
+import math
+import mmap
+import struct
+import sys
+import zipfile
+
+
+_HEADER = struct.Struct('<4sHIdIII')
+_RECORD = struct.Struct('<QddIB2s')
+_HASH = struct.Struct('<Q')
+_GRID = struct.Struct('<II')
+MAGIC = b'NGAZ'
+VERSION = 1
+DEFAULT_CELL_SIZE = 0.1
+# Reverse lookups search the cells around a coordinate up to this many
+# cells away before giving up.
+MAX_RINGS = 5
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def _key_hash(country, postalcode):
+    key = '{}:{}'.format(country, postalcode).upper().encode('utf-8')
+    return _HASH.unpack(blake2b(key, digest_size=8).digest())[0]
+
+
+def _cell(lat, lon, cell_size):
+    cols = int(math.ceil(360 / cell_size))
+    row = int(math.floor((lat + 90) / cell_size))
+    col = int(math.floor((lon + 180) / cell_size)) % cols
+    return row, col, cols
+
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) *
+         math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def read_geonames(lines):
+    """Parse the lines of a GeoNames postal code dump.
+
+    Args:
+        lines (iterable): tab separated lines (country code, postal code,
+            place name, admin names and codes, latitude, longitude, ...).
+    Returns:
+        generator: (country, postalcode, lat, lon) tuples.
+    """
+    for line in lines:
+        fields = line.rstrip('\r\n').split('\t')
+        if len(fields) < 11 or not fields[0] or not fields[1]:
+            continue
+        try:
+            lat, lon = float(fields[9]), float(fields[10])
+        except ValueError:
+            continue
+        yield fields[0].strip(), fields[1].strip(), lat, lon
+
+
+def _open_dump(path):
+    if path.endswith('.zip'):
+        archive = zipfile.ZipFile(path)
+        names = [name for name in archive.namelist()
+                 if name.endswith('.txt') and 'readme' not in name.lower()]
+        for name in names:
+            with archive.open(name) as f:
+                for line in io.TextIOWrapper(f, encoding='utf-8'):
+                    yield line
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            yield line
+
+
+def build(output, entries, cell_size=DEFAULT_CELL_SIZE):
+    """Write a gazetteer file.
+
+    Postal codes listed several times (eg. one line per place name) are
+    placed at the mean of their coordinates.
+
+    Args:
+        output (str): path of the file to write.
+        entries (iterable): (country, postalcode, lat, lon) tuples.
+        cell_size (float[optional]): size of the reverse lookup grid cells
+            in degrees.
+    Returns:
+        int: number of postal codes written.
+    """
+    merged = {}
+    for country, postalcode, lat, lon in entries:
+        key = (country.upper(), postalcode.upper())
+        total = merged.get(key)
+        if total is None:
+            merged[key] = [lat, lon, 1]
+        else:
+            total[0] += lat
+            total[1] += lon
+            total[2] += 1
+
+    records = sorted(
+        (_key_hash(country, postalcode), country, postalcode,
+         lat / count, lon / count)
+        for (country, postalcode), (lat, lon, count) in merged.items())
+    strings = io.BytesIO()
+    record_data = io.BytesIO()
+    grid = []
+    for index, (key_hash, country, postalcode, lat, lon) in enumerate(
+            records):
+        encoded = postalcode.encode('utf-8')[:255]
+        record_data.write(_RECORD.pack(
+            key_hash, lat, lon, strings.tell(), len(encoded),
+            country.encode('ascii')[:2].ljust(2)))
+        strings.write(encoded)
+        row, col, cols = _cell(lat, lon, cell_size)
+        grid.append((row * cols + col, index))
+    grid.sort()
+
+    strings_offset = _HEADER.size + record_data.tell()
+    grid_offset = strings_offset + strings.tell()
+    with open(output, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(records), cell_size,
+                             strings_offset, grid_offset, len(grid)))
+        f.write(record_data.getvalue())
+        f.write(strings.getvalue())
+        for cell, index in grid:
+            f.write(_GRID.pack(cell, index))
+    return len(records)
+
+
+class Gazetteer(object):
+    """Memory-mapped postal code table built by build()."""
+
+    def __init__(self, path):
+        """Constructor.
+
+        Args:
+            path (str): gazetteer file.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self._count, self._cell_size, self._strings,
+         self._grid, self._grid_count) = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise Exception(
+                'Error: {} is not a gazetteer file.'.format(path))
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+    def _record(self, index):
+        return _RECORD.unpack_from(
+            self._mm, _HEADER.size + index * _RECORD.size)
+
+    def _postalcode(self, record):
+        start = self._strings + record[3]
+        return self._mm[start:start + record[4]].decode('utf-8')
+
+    def lookup(self, postalcode, country):
+        """Forward lookup.
+
+        Args:
+            postalcode (str): postal code.
+            country (str): 2 letter country code.
+        Returns:
+            tuple: (lat, lon) or None when unknown.
+        """
+        postalcode = str(postalcode).strip().upper()
+        country = country.strip().upper()
+        key_hash = _key_hash(country, postalcode)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            offset = _HEADER.size + mid * _RECORD.size
+            if _HASH.unpack_from(self._mm, offset)[0] < key_hash:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self._count:
+            record = self._record(lo)
+            if record[0] != key_hash:
+                return None
+            if (record[5].decode('ascii') == country and
+                    self._postalcode(record) == postalcode):
+                return record[1], record[2]
+            lo += 1
+        return None
+
+    def reverse(self, lat, lon):
+        """Reverse lookup of the nearest postal code.
+
+        Args:
+            lat (float): latitude.
+            lon (float): longitude.
+        Returns:
+            tuple: (postalcode, lower case country code) or None when no
+            postal code lies within MAX_RINGS grid cells.
+        """
+        row, col, cols = _cell(lat, lon, self._cell_size)
+        best = None
+        ring = 0
+        while ring <= MAX_RINGS or best is not None:
+            # Keep searching while the next ring may hold a nearer code.
+            if best is not None and self._ring_km(lat, ring) > best[0]:
+                break
+            for r, first, last in _ring_spans(row, col, ring, cols):
+                if r < 0 or r * self._cell_size > 180:
+                    continue
+                for index in self._span_records(
+                        r * cols + first, r * cols + last):
+                    record = self._record(index)
+                    distance = _distance_km(lat, lon, record[1], record[2])
+                    if best is None or distance < best[0]:
+                        best = (distance, record)
+            ring += 1
+        if best is None:
+            return None
+        return self._postalcode(best[1]), best[1][5].decode('ascii').lower()
+
+    def _ring_km(self, lat, ring):
+        # Lower bound of the distance to the cells ring cells away.
+        poleward = min(89.9, abs(lat) + ring * self._cell_size)
+        return (max(0, ring - 1) * self._cell_size * _KM_PER_DEGREE *
+                math.cos(math.radians(poleward)))
+
+    def _span_records(self, first, last):
+        # Record indexes of the cells first..last, which are contiguous in
+        # the grid so one binary search covers a whole ring row.
+        lo, hi = 0, self._grid_count
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if _GRID.unpack_from(
+                    self._mm, self._grid + mid * _GRID.size)[0] < first:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self._grid_count:
+            entry_cell, index = _GRID.unpack_from(
+                self._mm, self._grid + lo * _GRID.size)
+            if entry_cell > last:
+                return
+            yield index
+            lo += 1
+
+
+def _ring_spans(row, col, ring, cols):
+    # (row, first col, last col) spans of the cells ring cells away,
+    # split where they wrap around the antimeridian.
+    if ring == 0:
+        spans = [(row, col, col)]
+    else:
+        spans = [(row - ring, col - ring, col + ring),
+                 (row + ring, col - ring, col + ring)]
+        for r in range(row - ring + 1, row + ring):
+            spans.append((r, col - ring, col - ring))
+            spans.append((r, col + ring, col + ring))
+    for r, first, last in spans:
+        if last - first + 1 >= cols:
+            yield r, 0, cols - 1
+        elif first // cols == last // cols:
+            yield r, first % cols, last % cols
+        else:
+            yield r, first % cols, cols - 1
+            yield r, 0, last % cols
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) >= 3 and argv[0] == 'build':
+        count = build(argv[1], (
+            entry for path in argv[2:]
+            for entry in read_geonames(_open_dump(path))))
+        print('{} postal codes written to {}'.format(count, argv[1]))
+        return 0
+    if len(argv) == 4 and argv[0] in ('lookup', 'reverse'):
+        with Gazetteer(argv[1]) as gazetteer:
+            if argv[0] == 'lookup':
+                print(gazetteer.lookup(argv[2], argv[3]))
+            else:
+                print(gazetteer.reverse(float(argv[2]), float(argv[3])))
+        return 0
+    print('usage: python -m noaa_sdk.gazetteer build OUTPUT DUMP [DUMP...]\n'
+          '       python -m noaa_sdk.gazetteer lookup FILE POSTALCODE '
+          'COUNTRY\n'
+          '       python -m noaa_sdk.gazetteer reverse FILE LAT LON')
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
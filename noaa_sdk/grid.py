@@ -0,0 +1,309 @@
+"""
+Offline gridpoint resolution
+============================
+The forecast grids of the CONUS forecast offices are windows of one
+Lambert conformal grid (tangent at 25N, central meridian 95W, sphere of
+radius 6,371,200 m, 2,539.703 m cells). Once the origin of an office's
+window is known, the (gridX, gridY) of a coordinate is a projection and a
+floor, so /points is only needed to learn offices the resolver has not
+seen yet.
+
+The origin of an office is learned from /points responses (each one narrows
+the interval the origin lies in) and exactly from the cell polygons of
+/gridpoints responses. The office covering a coordinate is learned per
+0.25 degree tile, and a tile is only trusted once it and the four tiles
+next to it were all seen with that one office; anything else is left to
+/points, whose response is learned in turn. Indices outside the range seen
+for an office are left to /points too.
+Offices outside CONUS use other projections and are never resolved
+offline. Batches are projected with numpy when it is installed.
+"""
+
+import json
+import math
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+EARTH_RADIUS = 6371200.0
+CELL_SIZE = 2539.703
+STANDARD_PARALLEL = 25.0
+CENTRAL_MERIDIAN = -95.0
+TILE_SIZE = 0.25
+
+_NEIGHBOURS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+# Offices whose grids are not on the CONUS Lambert conformal projection.
+NON_CONUS_OFFICES = frozenset(['AFC', 'AFG', 'AJK', 'HFO', 'GUM', 'SJU'])
+
+_N = math.sin(math.radians(STANDARD_PARALLEL))
+_F = (math.cos(math.radians(STANDARD_PARALLEL)) *
+      math.tan(math.pi / 4 + math.radians(STANDARD_PARALLEL) / 2) ** _N / _N)
+_RHO0 = EARTH_RADIUS * _F / math.tan(
+    math.pi / 4 + math.radians(STANDARD_PARALLEL) / 2) ** _N
+# Origins learned from cell polygons are exact up to the rounding of the
+# polygon coordinates.
+_EXACT_TOLERANCE = 1e-3
+
+
+def project(lat, lon):
+    """Project a coordinate onto the CONUS grid.
+
+    Args:
+        lat (float): latitude.
+        lon (float): longitude.
+    Returns:
+        tuple: (x, y) in cells.
+    """
+    rho = EARTH_RADIUS * _F / math.tan(
+        math.pi / 4 + math.radians(lat) / 2) ** _N
+    theta = _N * math.radians(lon - CENTRAL_MERIDIAN)
+    return (rho * math.sin(theta) / CELL_SIZE,
+            (_RHO0 - rho * math.cos(theta)) / CELL_SIZE)
+
+
+def project_many(lats, lons):
+    """Vectorized project() (requires numpy).
+
+    Args:
+        lats (array_like): latitudes.
+        lons (array_like): longitudes.
+    Returns:
+        tuple: arrays of x and y in cells.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    rho = EARTH_RADIUS * _F / np.tan(np.pi / 4 + np.radians(lats) / 2) ** _N
+    theta = _N * np.radians(lons - CENTRAL_MERIDIAN)
+    return (rho * np.sin(theta) / CELL_SIZE,
+            (_RHO0 - rho * np.cos(theta)) / CELL_SIZE)
+
+
+def unproject(x, y):
+    """Inverse of project().
+
+    Args:
+        x (float): x in cells.
+        y (float): y in cells.
+    Returns:
+        tuple: (lat, lon).
+    """
+    x *= CELL_SIZE
+    dy = _RHO0 - y * CELL_SIZE
+    rho = math.hypot(x, dy)
+    theta = math.atan2(x, dy)
+    lat = 2 * math.atan((EARTH_RADIUS * _F / rho) ** (1 / _N)) - math.pi / 2
+    return math.degrees(lat), CENTRAL_MERIDIAN + math.degrees(theta / _N)
+
+
+def _tile(lat, lon):
+    return int(math.floor(lat / TILE_SIZE)), int(math.floor(lon / TILE_SIZE))
+
+
+class GridResolver(object):
+    """Map coordinates to (office, gridX, gridY) from learned office grids.
+
+    For an office with origin (ox, oy) in cells, gridX = floor(x - ox) and
+    gridY = floor(y - oy). Each origin is kept as an interval (lo, hi]
+    which only resolves coordinates whose index is the same for every
+    origin of the interval. The indices seen for an office are kept as its
+    extent [min gridX, max gridX, min gridY, max gridY].
+    """
+
+    def __init__(self):
+        self._origins = {}
+        self._extents = {}
+        self._tiles = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._origins)
+
+    @property
+    def offices(self):
+        return sorted(self._origins)
+
+    def learn_point(self, lat, lon, properties):
+        """Learn from the properties of a /points response.
+
+        Args:
+            lat (float): latitude requested.
+            lon (float): longitude requested.
+            properties (dict): properties with gridId, gridX and gridY.
+        """
+        office = properties.get('gridId')
+        grid_x = properties.get('gridX')
+        grid_y = properties.get('gridY')
+        if not office or grid_x is None or grid_y is None or (
+                office in NON_CONUS_OFFICES):
+            return
+        x, y = project(lat, lon)
+        grid_x, grid_y = int(grid_x), int(grid_y)
+        with self._lock:
+            self._tiles.setdefault(_tile(lat, lon), set()).add(office)
+            self._extend(office, grid_x, grid_y)
+            origin = self._origins.get(office)
+            if origin is not None and origin['exact']:
+                return
+            learned = [x - grid_x - 1, x - grid_x, y - grid_y - 1, y - grid_y]
+            if origin is not None:
+                narrowed = [max(origin['x'][0], learned[0]),
+                            min(origin['x'][1], learned[1]),
+                            max(origin['y'][0], learned[2]),
+                            min(origin['y'][1], learned[3])]
+                # An empty intersection means the office grid moved.
+                if narrowed[0] < narrowed[1] and narrowed[2] < narrowed[3]:
+                    learned = narrowed
+            self._origins[office] = {
+                'x': learned[:2], 'y': learned[2:], 'exact': False}
+
+    def learn_cell(self, office, grid_x, grid_y, polygon):
+        """Learn the exact origin of an office from a cell polygon (the
+        geometry of a /gridpoints response).
+
+        Args:
+            office (str): office id (gridId).
+            grid_x (int): gridX of the cell.
+            grid_y (int): gridY of the cell.
+            polygon (list): [lon, lat] corners of the cell.
+        """
+        if office in NON_CONUS_OFFICES or not polygon:
+            return
+        corners = [project(lat, lon) for lon, lat in polygon]
+        ox = min(x for x, _ in corners) - int(grid_x)
+        oy = min(y for _, y in corners) - int(grid_y)
+        with self._lock:
+            self._origins[office] = {
+                'x': [ox - _EXACT_TOLERANCE, ox + _EXACT_TOLERANCE],
+                'y': [oy - _EXACT_TOLERANCE, oy + _EXACT_TOLERANCE],
+                'exact': True}
+            self._extend(office, int(grid_x), int(grid_y))
+            for lon, lat in polygon:
+                self._tiles.setdefault(_tile(lat, lon), set()).add(office)
+
+    def _extend(self, office, grid_x, grid_y):
+        extent = self._extents.get(office)
+        if extent is None:
+            self._extents[office] = [grid_x, grid_x, grid_y, grid_y]
+            return
+        extent[0] = min(extent[0], grid_x)
+        extent[1] = max(extent[1], grid_x)
+        extent[2] = min(extent[2], grid_y)
+        extent[3] = max(extent[3], grid_y)
+
+    def office(self, lat, lon):
+        """Get the office of a coordinate once its tile and the four tiles
+        next to it were only seen with that office.
+
+        Returns:
+            str: office id or None when unknown or ambiguous.
+        """
+        tile_lat, tile_lon = _tile(lat, lon)
+        offices = self._tiles.get((tile_lat, tile_lon))
+        if not offices or len(offices) > 1:
+            return None
+        for d_lat, d_lon in _NEIGHBOURS:
+            if self._tiles.get((tile_lat + d_lat, tile_lon + d_lon)) != (
+                    offices):
+                return None
+        return next(iter(offices))
+
+    def resolve(self, lat, lon):
+        """Resolve a coordinate.
+
+        Args:
+            lat (float): latitude.
+            lon (float): longitude.
+        Returns:
+            tuple: (office, gridX, gridY) or None when it cannot be resolved
+            offline.
+        """
+        office = self.office(lat, lon)
+        origin = self._origins.get(office)
+        if origin is None:
+            return None
+        x, y = project(lat, lon)
+        grid_x = _index(x, origin['x'])
+        grid_y = _index(y, origin['y'])
+        if grid_x is None or grid_y is None:
+            return None
+        extent = self._extents.get(office)
+        if extent is None or not (extent[0] <= grid_x <= extent[1] and
+                                  extent[2] <= grid_y <= extent[3]):
+            return None
+        return office, grid_x, grid_y
+
+    def resolve_many(self, lats, lons):
+        """Resolve many coordinates at once, projecting them with numpy
+        when available.
+
+        Args:
+            lats (list): latitudes.
+            lons (list): longitudes.
+        Returns:
+            list: (office, gridX, gridY) or None for each coordinate.
+        """
+        if np is None:
+            return [self.resolve(lat, lon) for lat, lon in zip(lats, lons)]
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        offices = [self.office(lat, lon)
+                   for lat, lon in zip(lats.tolist(), lons.tolist())]
+        bounds = np.full((len(offices), 4), np.nan)
+        extents = np.full((len(offices), 4), np.nan)
+        for i, office in enumerate(offices):
+            origin = self._origins.get(office)
+            extent = self._extents.get(office)
+            if origin is not None and extent is not None:
+                bounds[i] = origin['x'] + origin['y']
+                extents[i] = extent
+        xs, ys = project_many(lats, lons)
+        grid_x = np.floor(xs - bounds[:, 1])
+        grid_y = np.floor(ys - bounds[:, 3])
+        valid = ((grid_x == np.ceil(xs - bounds[:, 0]) - 1) &
+                 (grid_y == np.ceil(ys - bounds[:, 2]) - 1) &
+                 (grid_x >= 0) & (grid_y >= 0) &
+                 (grid_x >= extents[:, 0]) & (grid_x <= extents[:, 1]) &
+                 (grid_y >= extents[:, 2]) & (grid_y <= extents[:, 3]))
+        return [
+            (office, int(gx), int(gy)) if ok else None
+            for office, gx, gy, ok in zip(
+                offices, grid_x.tolist(), grid_y.tolist(), valid.tolist())]
+
+    def save(self, path):
+        """Write the learned grids to a JSON file."""
+        with self._lock:
+            data = {
+                'origins': self._origins,
+                'extents': self._extents,
+                'tiles': [[lat, lon, sorted(offices)] for (lat, lon), offices
+                          in sorted(self._tiles.items())],
+            }
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path):
+        """Read grids written by save()."""
+        with open(path) as f:
+            data = json.load(f)
+        resolver = cls()
+        resolver._origins = data['origins']
+        resolver._extents = data.get('extents', {})
+        resolver._tiles = dict(
+            ((lat, lon), set(offices))
+            for lat, lon, offices in data['tiles'])
+        return resolver
+
+
+def _index(value, interval):
+    # floor(value - origin) for every origin in (lo, hi], or None.
+    lo, hi = interval
+    index = math.floor(value - hi)
+    if index != math.ceil(value - lo) - 1 or index < 0:
+        return None
+    return int(index)
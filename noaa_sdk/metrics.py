@@ -0,0 +1,246 @@
+"""
+Request instrumentation
+=======================
+Events emitted by the clients around every request and a Metrics collector
+counting requests, retries and cache hits and timing requests and JSON
+decoding per endpoint template (eg. /stations/{id}/observations). Metrics
+export as a dictionary or in the Prometheus text format.
+"""
+
+from bisect import bisect_left
+import re
+import threading
+
+
+# Events emitted by UTIL. Hooks are called with a dictionary holding the
+# event name, end_point and uri plus:
+#   before_request: header
+#   after_response: status_code, elapsed (seconds, retries included)
+#   after_decode: elapsed (seconds spent decoding the JSON body)
+#   on_retry: attempt, status_code, delay
+#   on_cache_hit: cache ('response', 'points', 'geocode', 'gazetteer' or
+#       'in_flight' for a request shared with a concurrent identical one)
+EVENTS = ('before_request', 'after_response', 'after_decode', 'on_retry',
+          'on_cache_hit')
+
+_TEMPLATES = [(re.compile(pattern), replacement) for pattern, replacement in (
+    (r'^/points/[^/]+', '/points/{point}'),
+    (r'^/gridpoints/[^/]+/[^/]+', '/gridpoints/{wfo}/{x},{y}'),
+    (r'^/stations/[^/]+', '/stations/{id}'),
+    (r'^(/stations/\{id\}/observations)/(?!current$)[^/]+$',
+     r'\1/{recordId}'),
+    (r'^/offices/[^/]+', '/offices/{id}'),
+    (r'^/zones/([^/]+)/[^/]+', r'/zones/\1/{id}'),
+    (r'^/products/types/[^/]+', '/products/types/{type}'),
+    (r'^/products/locations/[^/]+', '/products/locations/{location}'),
+    (r'^/products/(?!types|locations)[^/]+', '/products/{id}'),
+    (r'^/alerts/active/(zone|area|region)/[^/]+', r'/alerts/active/\1/{id}'),
+    (r'^/alerts/(?!active|count|types)[^/]+$', '/alerts/{id}'),
+)]
+
+
+def endpoint_template(uri):
+    """Get the endpoint template of a uri, with identifiers replaced by
+    placeholders and the query string removed.
+
+    Args:
+        uri (str): uri with query string (eg. /stations/KJFK/observations).
+    Returns:
+        str: template (eg. /stations/{id}/observations).
+    """
+    path = '/' + uri.split('?', 1)[0].lstrip('/')
+    for pattern, replacement in _TEMPLATES:
+        path = pattern.sub(replacement, path)
+    return path
+
+
+class Histogram(object):
+    """Cumulative histogram of durations in seconds."""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+               10.0)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(sorted(buckets or self.BUCKETS))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self):
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            cumulative.append([bound, total])
+        return {'count': self.count, 'sum': self.sum, 'buckets': cumulative}
+
+
+class _EndpointMetrics(object):
+
+    def __init__(self, buckets):
+        self.responses = {}
+        self.retries = 0
+        self.cache_hits = {}
+        self.latency = Histogram(buckets)
+        self.decode = Histogram(buckets)
+
+    def as_dict(self):
+        return {
+            'responses': dict(self.responses),
+            'retries': self.retries,
+            'cache_hits': dict(self.cache_hits),
+            'latency': self.latency.as_dict(),
+            'decode': self.decode.as_dict(),
+        }
+
+
+class Metrics(object):
+    """Counters and latency histograms per end point and endpoint template.
+
+    Attach an instance to one or more clients (eg. NOAA(metrics=metrics)
+    or metrics.attach(client)); it collects through the client hooks, so
+    clients without metrics or hooks pay no instrumentation cost.
+    """
+
+    def __init__(self, buckets=None):
+        """Constructor.
+
+        Args:
+            buckets (iterable[optional]): histogram bucket upper bounds in
+                seconds. Defaults to Histogram.BUCKETS.
+        """
+        self._buckets = buckets
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def attach(self, client):
+        """Register the collecting hooks on a client.
+
+        Args:
+            client (UTIL): NOAA, OSM or NCDC instance.
+        """
+        client.add_hook('after_response', self._after_response)
+        client.add_hook('after_decode', self._after_decode)
+        client.add_hook('on_retry', self._on_retry)
+        client.add_hook('on_cache_hit', self._on_cache_hit)
+
+    def detach(self, client):
+        """Remove the collecting hooks from a client.
+
+        Args:
+            client (UTIL): NOAA, OSM or NCDC instance.
+        """
+        client.remove_hook('after_response', self._after_response)
+        client.remove_hook('after_decode', self._after_decode)
+        client.remove_hook('on_retry', self._on_retry)
+        client.remove_hook('on_cache_hit', self._on_cache_hit)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def _endpoint(self, info):
+        key = (info['end_point'], endpoint_template(info['uri']))
+        metrics = self._endpoints.get(key)
+        if metrics is None:
+            metrics = self._endpoints[key] = _EndpointMetrics(self._buckets)
+        return metrics
+
+    def _after_response(self, info):
+        with self._lock:
+            metrics = self._endpoint(info)
+            status = str(info['status_code'])
+            metrics.responses[status] = metrics.responses.get(status, 0) + 1
+            metrics.latency.observe(info['elapsed'])
+
+    def _after_decode(self, info):
+        with self._lock:
+            self._endpoint(info).decode.observe(info['elapsed'])
+
+    def _on_retry(self, info):
+        with self._lock:
+            self._endpoint(info).retries += 1
+
+    def _on_cache_hit(self, info):
+        with self._lock:
+            hits = self._endpoint(info).cache_hits
+            hits[info['cache']] = hits.get(info['cache'], 0) + 1
+
+    def as_dict(self):
+        """Export the metrics.
+
+        Returns:
+            dict: {end_point: {template: {'responses': {status: count},
+            'retries': count, 'cache_hits': {cache: count}, 'latency':
+            histogram, 'decode': histogram}}} where a histogram is
+            {'count', 'sum', 'buckets': [[upper bound, cumulative count]]}.
+        """
+        result = {}
+        with self._lock:
+            for (end_point, template), metrics in sorted(
+                    self._endpoints.items()):
+                result.setdefault(end_point, {})[template] = (
+                    metrics.as_dict())
+        return result
+
+    def to_prometheus(self, prefix='noaa_sdk'):
+        """Export the metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str[optional]): metric name prefix.
+        Returns:
+            str: metrics text.
+        """
+        counters = [
+            ('responses_total', 'counter', 'Responses received.'),
+            ('retries_total', 'counter', 'Retried requests.'),
+            ('cache_hits_total', 'counter', 'Requests served by a cache.'),
+            ('request_duration_seconds', 'histogram',
+             'Request duration including retries.'),
+            ('decode_duration_seconds', 'histogram',
+             'JSON decoding duration.'),
+        ]
+        samples = dict((name, []) for name, _, _ in counters)
+        for end_point, templates in self.as_dict().items():
+            for template, metrics in templates.items():
+                labels = 'end_point="{}",endpoint="{}"'.format(
+                    _escape(end_point), _escape(template))
+                for status, count in sorted(metrics['responses'].items()):
+                    samples['responses_total'].append(
+                        '{{{},status="{}"}} {}'.format(labels, status, count))
+                samples['retries_total'].append(
+                    '{{{}}} {}'.format(labels, metrics['retries']))
+                for cache, count in sorted(metrics['cache_hits'].items()):
+                    samples['cache_hits_total'].append(
+                        '{{{},cache="{}"}} {}'.format(labels, cache, count))
+                for name, key in (('request_duration_seconds', 'latency'),
+                                  ('decode_duration_seconds', 'decode')):
+                    histogram = metrics[key]
+                    for bound, count in histogram['buckets']:
+                        samples[name].append(
+                            '_bucket{{{},le="{}"}} {}'.format(
+                                labels, _format_bound(bound), count))
+                    samples[name].append('_sum{{{}}} {}'.format(
+                        labels, repr(float(histogram['sum']))))
+                    samples[name].append('_count{{{}}} {}'.format(
+                        labels, histogram['count']))
+        lines = []
+        for name, kind, description in counters:
+            full_name = '{}_{}'.format(prefix, name)
+            lines.append('# HELP {} {}'.format(full_name, description))
+            lines.append('# TYPE {} {}'.format(full_name, kind))
+            lines.extend(full_name + sample for sample in samples[name])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
@@ -1,5 +1,4 @@
 from urllib.parse import urlencode
-import requests
 
 from noaa_sdk.util import UTIL
 
@@ -17,7 +16,8 @@ class NCDC(UTIL):
         'datatypes', 'locationcategories',
         'locations', 'stations', 'data'}
 
-    def __init__(self, token, user_agent=None, accept=None, show_uri=False):
+    def __init__(self, token, user_agent=None, accept=None, show_uri=False,
+                 **kwargs):
         """Constructor.
 
         Args:
@@ -26,6 +26,8 @@ class NCDC(UTIL):
             accept (str[optional]): accept string specified in the header.
             show_uri (boolean[optional]): True for showing the
                 actual url with query string being sent for requesting data.
+            kwargs: connection options passed through to UTIL
+                (eg. pool_connections, pool_maxsize).
         """
         if not token:
             raise Exception('Error: missing token.')
@@ -35,7 +37,7 @@ class NCDC(UTIL):
         self._token = token
         super().__init__(
             user_agent=user_agent, accept=accept,
-            show_uri=show_uri)
+            show_uri=show_uri, **kwargs)
 
     def make_get_request(self, uri, header=None, end_point=None):
         """Encapsulate code for GET request.
@@ -54,12 +56,15 @@ class NCDC(UTIL):
         if not end_point:
             raise Exception('Error: end_point is None.')
 
-        res = requests.get(
-            'https://{}/{}'.format(self.DEFAULT_END_POINT, uri),
-            headers=header)
-        if res.status_code == 200:
-            return res.json()
-        raise Exception('Error: {} {}'.format(res.status_code, res.reason))
+        if self._single_flight is not None:
+            return self._coalesce(
+                self.DEFAULT_END_POINT, uri, header or {},
+                self._make_get_request)
+        return self._make_get_request(self.DEFAULT_END_POINT, uri, header)
+
+    def _make_get_request(self, end_point, uri, header):
+        res = self._get(end_point, uri, header)
+        return self._decode(end_point, uri, res)
 
     def get_request_header(self):
         """Get required headers.
@@ -112,3 +117,80 @@ class NCDC(UTIL):
         """
 
         return self.request_end_point('datasets', **params)
+
+    def iter_request_end_point(
+            self, end_point, page_size=1000, prefetch=True, **params):
+        """Iterate over every result of an endpoint, walking the pages
+        described by metadata.resultset.
+
+        Args:
+            end_point (str): one of END_POINTS.
+            page_size (int[optional]): results requested per page
+                (maximum 1000).
+            prefetch (boolean[optional]): True to fetch the next page while
+                the current one is consumed.
+            params: query parameters of the endpoint. offset sets the first
+                result (1 based).
+        Returns:
+            generator: generator of result dictionaries.
+        """
+        if end_point not in self.END_POINTS:
+            raise Exception('Error: unknown end point {}. '
+                            'Available end points are: {}'.format(
+                                end_point, sorted(self.END_POINTS)))
+        params['limit'] = page_size
+        params.setdefault('offset', 1)
+        return self.iter_pages(
+            lambda page_params: self._fetch_page(end_point, page_params),
+            params, prefetch=prefetch)
+
+    def _fetch_page(self, end_point, params):
+        res = self.request_end_point(end_point, **params)
+        results = res.get('results', [])
+        resultset = res.get('metadata', {}).get('resultset')
+        if not results or not resultset:
+            return results, None
+        next_offset = int(resultset['offset']) + len(results)
+        if next_offset > int(resultset['count']):
+            return results, None
+        return results, dict(params, offset=next_offset)
+
+    def iter_datasets(self, **params):
+        """Iterate over all datasets. Takes the parameters of datasets()."""
+        return self.iter_request_end_point('datasets', **params)
+
+    def iter_datacategories(self, **params):
+        """Iterate over all data categories."""
+        return self.iter_request_end_point('datacategories', **params)
+
+    def iter_datatypes(self, **params):
+        """Iterate over all data types."""
+        return self.iter_request_end_point('datatypes', **params)
+
+    def iter_locationcategories(self, **params):
+        """Iterate over all location categories."""
+        return self.iter_request_end_point('locationcategories', **params)
+
+    def iter_locations(self, **params):
+        """Iterate over all locations."""
+        return self.iter_request_end_point('locations', **params)
+
+    def iter_stations(self, **params):
+        """Iterate over all stations."""
+        return self.iter_request_end_point('stations', **params)
+
+    def iter_data(self, datasetid, startdate, enddate, **params):
+        """Iterate over all data points of a dataset.
+
+        Args:
+            datasetid (str): eg. GHCND.
+            startdate (str): eg. 2010-01-01 (ISO formated date).
+            enddate (str): eg. 2010-12-31 (ISO formated date).
+            params: other query parameters (eg. locationid, stationid,
+                datatypeid, units).
+        Returns:
+            generator: generator of data point dictionaries.
+        """
+        return self.iter_request_end_point(
+            'data', datasetid=datasetid, startdate=startdate,
+            enddate=enddate, **params)
@@ -10,11 +10,23 @@ For copyright information, visit: https://www.openstreetmap.org/copyright
 
 """
 
+from collections import namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait)
 import json
 from urllib.parse import urlencode
 
 from noaa_sdk.util import UTIL
 from noaa_sdk.accept import ACCEPT
+from noaa_sdk.cache import GeocodeCache, LRUCache
+from noaa_sdk.frame import GridForecast, ObservationFrame
+from noaa_sdk.grid import GridResolver
+
+
+ForecastResult = namedtuple(
+    'ForecastResult', ['location', 'forecasts', 'error'])
+
+_EXHAUSTED = object()
 
 
 class OSM(UTIL):
@@ -28,14 +40,46 @@ class OSM(UTIL):
 
     OSM_ENDPOINT = 'nominatim.openstreetmap.org'
 
-    def __init__(self, show_uri=False):
+    def __init__(self, show_uri=False, cache=None, gazetteer=None,
+                 **kwargs):
         """Constructor.
+
+        Args:
+            show_uri (boolean[optional]): True for showing the
+                actual url with query string being sent for requesting data.
+            cache (GeocodeCache[optional]): cache for forward and reverse
+                lookups. Defaults to an in-memory cache, False disables it.
+            gazetteer (Gazetteer|str[optional]): offline postal code table
+                (or the path of one) tried before Nominatim.
+            kwargs: connection options passed through to UTIL
+                (eg. pool_connections, pool_maxsize).
         """
         self._user_agent = 'pypi noaa_sdk'
         self._accept = ACCEPT.JSON
+        if cache is None:
+            cache = GeocodeCache()
+        self._cache = cache if cache is not False else None
+        if isinstance(gazetteer, str):
+            # Only loaded when used, importing noaa stays light.
+            from noaa_sdk.gazetteer import Gazetteer
+            gazetteer = Gazetteer(gazetteer)
+        self._gazetteer = gazetteer
         super().__init__(
             user_agent=self._user_agent, accept=ACCEPT.JSON,
-            show_uri=show_uri)
+            show_uri=show_uri, **kwargs)
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def gazetteer(self):
+        return self._gazetteer
+
+    def _offline_hit(self, uri):
+        if self._hooks:
+            self._emit('on_cache_hit', end_point=self.OSM_ENDPOINT, uri=uri,
+                       cache='gazetteer')
 
     def get_lat_lon_by_postalcode_country(self, postalcode, country):
         """Get latitude and longitude coordinate from postalcode
@@ -48,14 +92,31 @@ class OSM(UTIL):
             tuple: tuple of latitude and longitude.
         """
 
-        res = self.make_get_request(
-            '/search?postalcode={}&country={}&format=json'.format(
-                postalcode, country), end_point=self.OSM_ENDPOINT)
+        key = 'search:{}:{}'.format(postalcode, country).upper()
+        uri = '/search?postalcode={}&country={}&format=json'.format(
+            postalcode, country)
+        if self._cache is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                if self._hooks:
+                    self._emit('on_cache_hit', end_point=self.OSM_ENDPOINT,
+                               uri=uri, cache='geocode')
+                return cached
+        if self._gazetteer is not None:
+            result = self._gazetteer.lookup(postalcode, country)
+            if result is not None:
+                self._offline_hit(uri)
+                return result
+
+        res = self.make_get_request(uri, end_point=self.OSM_ENDPOINT)
         if len(res) == 0 or 'lat' not in res[0] or 'lon' not in res[0]:
             raise Exception(
                 'Postalcode and Country: {}, {} does not exist.'.format(
                     postalcode, country))
-        return float(res[0]['lat']), float(res[0]['lon'])
+        result = float(res[0]['lat']), float(res[0]['lon'])
+        if self._cache is not None:
+            self._cache.set(key, result)
+        return result
 
     def get_postalcode_country_by_lan_lon(self, lat, lon):
         """Get postalcode and country code by latitude and longitude.
@@ -66,10 +127,23 @@ class OSM(UTIL):
         Returns:
             tuple: tuple of postalcode and country code.
         """
-        res = self.make_get_request(
-            '/reverse?lat={}&lon={}&addressdetails=1&format=json'.format(
-                lat, lon),
-            end_point=self.OSM_ENDPOINT)
+        key = 'reverse:{}:{}'.format(lat, lon)
+        uri = '/reverse?lat={}&lon={}&addressdetails=1&format=json'.format(
+            lat, lon)
+        if self._cache is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                if self._hooks:
+                    self._emit('on_cache_hit', end_point=self.OSM_ENDPOINT,
+                               uri=uri, cache='geocode')
+                return cached
+        if self._gazetteer is not None:
+            result = self._gazetteer.reverse(lat, lon)
+            if result is not None:
+                self._offline_hit(uri)
+                return result
+
+        res = self.make_get_request(uri, end_point=self.OSM_ENDPOINT)
         if 'address' not in res:
             raise Exception('No address found.')
 
@@ -79,7 +153,10 @@ class OSM(UTIL):
         if 'postcode' not in res['address']:
             raise Exception('No postal code found.')
 
-        return res['address']['postcode'], res['address']['country_code']
+        result = res['address']['postcode'], res['address']['country_code']
+        if self._cache is not None:
+            self._cache.set(key, result)
+        return result
 
 
 class NOAA(UTIL):
@@ -87,8 +164,19 @@ class NOAA(UTIL):
 
     DEFAULT_END_POINT = 'api.weather.gov'
     DEFAULT_USER_AGENT = 'Test (your@email.com)'
-
-    def __init__(self, user_agent=None, accept=None, show_uri=False):
+    DEFAULT_POINTS_CACHE_SIZE = 4096
+    DEFAULT_POINTS_CACHE_TTL = 24 * 3600
+    # Forecasts kept by get_forecasts_many for locations of the same cell.
+    SHARED_FORECASTS = 256
+    GRIDPOINT_FORECAST_PATHS = {
+        'forecast': '/forecast',
+        'forecastHourly': '/forecast/hourly',
+        'forecastGridData': '',
+    }
+
+    def __init__(self, user_agent=None, accept=None, show_uri=False,
+                 geocode_cache=None, points_cache=None, station_index=None,
+                 grid_resolver=None, gazetteer=None, **kwargs):
         """Constructor.
 
         Args:
@@ -96,16 +184,88 @@ class NOAA(UTIL):
             accept (str[optional]): accept string specified in the header.
             show_uri (boolean[optional]): True for showing the
                 actual url with query string being sent for requesting data.
+            geocode_cache (GeocodeCache[optional]): cache used by the OSM
+                geocoder. Defaults to an in-memory cache, False disables it.
+            points_cache (LRUCache[optional]): cache of /points metadata
+                keyed by the coordinate rounded to 4 decimals. Defaults to
+                DEFAULT_POINTS_CACHE_SIZE entries kept for
+                DEFAULT_POINTS_CACHE_TTL seconds, False disables it.
+            station_index (StationIndex[optional]): local index used to
+                pick the nearest stations of get_observations without
+                requesting /points and its observation stations.
+            grid_resolver (GridResolver[optional]): learns office grids from
+                /points and /gridpoints responses to build forecast urls
+                without /points. True creates a new GridResolver.
+            gazetteer (Gazetteer|str[optional]): offline postal code table
+                used by the geocoder before Nominatim.
+            kwargs: connection options passed through to UTIL and the
+                OSM geocoder (eg. pool_connections, pool_maxsize).
         """
         if not user_agent:
             user_agent = self.DEFAULT_USER_AGENT
         if not accept:
             accept = ACCEPT.GEOJSON
 
+        # Registered once the geocoder exists, add_hook forwards to it.
+        hooks = kwargs.pop('hooks', None)
+        metrics = kwargs.pop('metrics', None)
         super().__init__(
             user_agent=user_agent, accept=accept,
-            show_uri=show_uri)
-        self._osm = OSM()
+            show_uri=show_uri, **kwargs)
+        self._osm = OSM(cache=geocode_cache, gazetteer=gazetteer, **kwargs)
+        self._register_hooks(hooks, metrics)
+        if points_cache is None:
+            points_cache = LRUCache(
+                maxsize=self.DEFAULT_POINTS_CACHE_SIZE,
+                ttl=self.DEFAULT_POINTS_CACHE_TTL)
+        if points_cache is False:
+            points_cache = None
+        self._points_cache = points_cache
+        self._station_index = station_index
+        if grid_resolver is True:
+            grid_resolver = GridResolver()
+        self._grid_resolver = grid_resolver
+
+    @property
+    def points_cache(self):
+        return self._points_cache
+
+    @property
+    def grid_resolver(self):
+        return self._grid_resolver
+
+    @grid_resolver.setter
+    def grid_resolver(self, value):
+        self._grid_resolver = value
+
+    @property
+    def station_index(self):
+        return self._station_index
+
+    @station_index.setter
+    def station_index(self, value):
+        self._station_index = value
+
+    def close(self):
+        """Close pooled connections of this client and its geocoder."""
+        super().close()
+        self._osm.close()
+
+    def add_hook(self, event, callback):
+        """Call a function on every occurrence of an event, for requests
+        of this client and its geocoder.
+
+        Args:
+            event (str): one of metrics.EVENTS.
+            callback (function): called with a dictionary holding the event
+                name, end_point, uri and the event details.
+        """
+        super().add_hook(event, callback)
+        self._osm.add_hook(event, callback)
+
+    def remove_hook(self, event, callback):
+        super().remove_hook(event, callback)
+        self._osm.remove_hook(event, callback)
 
     def get_forecasts(
             self, postal_code, country, hourly=False, type='forecastHourly'):
@@ -131,7 +291,137 @@ class NOAA(UTIL):
         lat, lon = self._osm.get_lat_lon_by_postalcode_country(
             postal_code, country)
         res = self.points_forecast(lat, lon, hourly=hourly, type=type)
+        return self._parse_forecasts(res, type)
 
+    def get_grid_forecast(self, postal_code, country, convert_units=True):
+        """Get the gridpoint forecast of a postal code and country code
+        decoded into aligned hourly NumPy arrays (requires numpy).
+
+        Args:
+            postalcode (str): postal code.
+            country (str): 2 letter country code.
+            convert_units (boolean[optional]): True to convert layers to SI
+                units.
+        Returns:
+            GridForecast: decoded forecastGridData layers.
+        """
+        return GridForecast.from_properties(
+            self.get_forecasts(postal_code, country, type='forecastGridData'),
+            convert_units=convert_units)
+
+    def points_grid_forecast(self, lat, long, convert_units=True):
+        """Get the gridpoint forecast of a coordinate decoded into aligned
+        hourly NumPy arrays (requires numpy).
+
+        Args:
+            lat (float): latitude.
+            long (float): longitude.
+            convert_units (boolean[optional]): True to convert layers to SI
+                units.
+        Returns:
+            GridForecast: decoded forecastGridData layers.
+        """
+        res = self.points_forecast(lat, long, type='forecastGridData')
+        return GridForecast.from_properties(
+            self._parse_forecasts(res, 'forecastGridData'),
+            convert_units=convert_units)
+
+    def get_forecasts_many(
+            self, locations, hourly=False, type='forecastHourly',
+            max_workers=8):
+        """Get forecasts for many postal codes and country codes.
+
+           Geocoding, point resolution and forecast fetching are pipelined
+           on a thread pool. Locations are read lazily, at most
+           max_workers requests are in flight and a forecast fetch is
+           always submitted before the next location is geocoded, so
+           results stream while the locations are still being read.
+           Locations resolving to the same forecast url (same grid cell)
+           share a single forecast request; the last SHARED_FORECASTS
+           forecasts are kept for that.
+
+        Args:
+            locations (iterable): (postal code, country code) tuples.
+            * hourly (boolean[optional]): True for getting hourly forecast.
+            type (string[optional]): forecast, forecastHourly or
+                forecastGridData.
+            max_workers (int[optional]): maximum number of requests in
+                flight at the same time.
+        Returns:
+            generator: ForecastResult(location, forecasts, error) tuples in
+            completion order. forecasts is what get_forecasts would return
+            and error is the exception raised for that location (or None).
+        """
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        locations = iter(locations)
+        pending = {}
+        waiting = {}
+        forecasts = LRUCache(maxsize=self.SHARED_FORECASTS)
+        exhausted = False
+        try:
+            while True:
+                # Forecast fetches were submitted as their urls resolved,
+                # new locations only take the slots left.
+                while not exhausted and len(pending) < max_workers:
+                    location = next(locations, _EXHAUSTED)
+                    if location is _EXHAUSTED:
+                        exhausted = True
+                        break
+                    future = executor.submit(
+                        self._location_forecast_uri, location, hourly, type)
+                    pending[future] = (location, None)
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    location, uri = pending.pop(future)
+                    if uri is not None:
+                        # Failures are shared with the locations waiting
+                        # for them only, later locations retry.
+                        if future.exception() is None:
+                            forecasts.set(uri, future)
+                        for waiter in waiting.pop(uri):
+                            yield self._forecast_result(waiter, future, type)
+                        continue
+                    if future.exception() is not None:
+                        yield ForecastResult(
+                            location, None, future.exception())
+                        continue
+                    uri = future.result()
+                    if uri in waiting:
+                        waiting[uri].append(location)
+                        continue
+                    shared = forecasts.get(uri)
+                    if shared is not None:
+                        yield self._forecast_result(location, shared, type)
+                        continue
+                    forecast_future = executor.submit(
+                        self.make_get_request,
+                        uri=uri, end_point=self.DEFAULT_END_POINT)
+                    pending[forecast_future] = (None, uri)
+                    waiting[uri] = [location]
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _location_forecast_uri(self, location, hourly, type):
+        postal_code, country = location
+        lat, lon = self._osm.get_lat_lon_by_postalcode_country(
+            postal_code, country)
+        return self._forecast_uri(lat, lon, hourly=hourly, type=type)
+
+    def _forecast_result(self, location, future, type):
+        if future.exception() is not None:
+            return ForecastResult(location, None, future.exception())
+        try:
+            return ForecastResult(
+                location, self._parse_forecasts(future.result(), type), None)
+        except Exception as err:
+            return ForecastResult(location, None, err)
+
+    def _parse_forecasts(self, res, type):
         if 'status' in res and res['status'] == 503 and 'detail' in res:
             raise Exception('Status: {}, NOAA API Error Response: {}'.format(
                 res['status'], res['detail']))
@@ -146,7 +436,8 @@ class NOAA(UTIL):
         return res['properties']['periods']
 
     def get_observations(
-            self, postalcode, country, start=None, end=None, num_of_stations=1):
+            self, postalcode, country, start=None, end=None, num_of_stations=1,
+            max_workers=1, ordered=True, columnar=False):
         """Get all nearest station observations by postalcode and
         country code.
 
@@ -163,6 +454,16 @@ class NOAA(UTIL):
                 (eg. '%Y-%m-%dT%H:%M:%SZ' | '%Y-%m-%d' | '%Y-%m-%d %H:%M:%S').
             num_of_stations (int[optional]): get observations from the
                 nearest x stations. (Put -1 of wants to get all stations.)
+                When start or end is given, every page of the range is
+                fetched lazily while the generator is consumed.
+            max_workers (int[optional]): number of stations fetched in
+                parallel. 1 fetches stations one after another lazily.
+            ordered (boolean[optional]): with max_workers > 1, True yields
+                observations in station order, False yields each station
+                as soon as it completes.
+            columnar (boolean[optional]): True to return an ObservationFrame
+                of typed NumPy arrays instead of a generator (requires
+                numpy).
         Returns:
             generator: generator of dictionaries of observations with the
             following variables: 'relativeHumidity', 'presentWeather',
@@ -178,20 +479,63 @@ class NOAA(UTIL):
         lat, lon = self._osm.get_lat_lon_by_postalcode_country(
             postalcode, country)
 
-        return self.get_observations_by_lat_lon(lat, lon, start, end, num_of_stations)
+        return self.get_observations_by_lat_lon(
+            lat, lon, start, end, num_of_stations,
+            max_workers=max_workers, ordered=ordered, columnar=columnar)
 
     def get_observations_by_lat_lon(
-            self, lat, lon, start=None, end=None, num_of_stations=1):
+            self, lat, lon, start=None, end=None, num_of_stations=1,
+            max_workers=1, ordered=True, columnar=False):
         "Same as get_observations() but uses Lat and Lon instead of Postalcode and Country"
 
+        observations = self._iter_observations_by_lat_lon(
+            lat, lon, start, end, num_of_stations, max_workers, ordered)
+        if columnar:
+            return ObservationFrame.from_observations(observations)
+        return observations
+
+    def _iter_observations_by_lat_lon(
+            self, lat, lon, start, end, num_of_stations, max_workers,
+            ordered):
         stations_observations_params = {}
         if start:
             stations_observations_params['start'] = start
         if end:
             stations_observations_params['end'] = end
 
-        points_res = self.points(
-            '{},{}'.format(round(lat, 4), round(lon, 4)))
+        station_ids = self._nearest_station_ids(lat, lon, num_of_stations)
+
+        if max_workers > 1:
+            observations = self._parallel_station_observations(
+                station_ids, stations_observations_params, max_workers,
+                ordered)
+        else:
+            observations = (
+                observation for station_id in station_ids
+                for observation in self._station_observations(
+                    station_id, stations_observations_params))
+        for observation in observations:
+            yield observation.get('properties')
+
+    def _station_observations(self, station_id, params):
+        if params:
+            return self.iter_stations_observations(
+                station_id=station_id, **params)
+        response = self.stations_observations(station_id=station_id)
+        if type(response) == dict:
+            return response['features']
+        return response
+
+    def _nearest_station_ids(self, lat, lon, num_of_stations):
+        if self._station_index is not None:
+            stations = self._station_index.nearest_stations(
+                lat, lon, k=num_of_stations if num_of_stations > 0 else
+                len(self._station_index))
+            if not stations:
+                raise Exception('Error: No Observation Stations found.')
+            return [station_id for station_id, _ in stations]
+
+        points_res = self.points_metadata(lat, lon)
 
         if 'properties' not in points_res or 'observationStations' not in points_res['properties']:
             raise Exception('Error: No Observation Stations found.')
@@ -199,18 +543,27 @@ class NOAA(UTIL):
             uri=points_res['properties']['observationStations'],
             end_point=self.DEFAULT_END_POINT)['observationStations']
 
-        for index, station in enumerate(stations):
-            if num_of_stations > 0 and num_of_stations <= index:
-                break
-            station_id = station.split('/')[-1]
-            response = self.stations_observations(
-                station_id=station_id, **stations_observations_params)
-
-            observations = response
-            if type(response) == dict:
-                observations = response['features']
-            for observation in observations:
-                yield observation.get('properties')
+        if num_of_stations > 0:
+            stations = stations[:num_of_stations]
+        return [station.split('/')[-1] for station in stations]
+
+    def _parallel_station_observations(
+            self, station_ids, params, max_workers, ordered):
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = [
+            executor.submit(
+                lambda station_id: list(
+                    self._station_observations(station_id, params)),
+                station_id)
+            for station_id in station_ids]
+        try:
+            for future in futures if ordered else as_completed(futures):
+                for observation in future.result():
+                    yield observation
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
 
     def get_observations_by_postalcode_country(
             self, postalcode, country, start=None, end=None, num_of_stations=1):
@@ -243,6 +596,34 @@ class NOAA(UTIL):
             "/points/{point}".format(point=point),
             end_point=self.DEFAULT_END_POINT)
 
+    def points_metadata(self, lat, lon):
+        """Metadata about a point, served from the points cache when the
+        coordinate (rounded to 4 decimals) was resolved before.
+
+        Args:
+            lat (float): latitude.
+            lon (float): longitude.
+        Returns:
+            json: json response from /points.
+        """
+        point = '{},{}'.format(round(lat, 4), round(lon, 4))
+        if self._points_cache is not None:
+            res = self._points_cache.get(point)
+            if res is not None:
+                if self._hooks:
+                    self._emit(
+                        'on_cache_hit', end_point=self.DEFAULT_END_POINT,
+                        uri='/points/{}'.format(point), cache='points')
+                return res
+        res = self.points(point)
+        if isinstance(res, dict) and 'properties' in res:
+            if self._points_cache is not None:
+                self._points_cache.set(point, res)
+            if self._grid_resolver is not None:
+                self._grid_resolver.learn_point(
+                    round(lat, 4), round(lon, 4), res['properties'])
+        return res
+
     def points_forecast(self, lat, long, hourly=False, type=''):
         """Get observation data from a weather station.
 
@@ -263,20 +644,68 @@ class NOAA(UTIL):
             json: json response from api.
         """
 
+        uri = self._forecast_uri(lat, long, hourly=hourly, type=type)
         res = self.make_get_request(
-            "/points/{lat},{long}".format(
-                lat=lat, long=long), end_point=self.DEFAULT_END_POINT)
+            uri=uri, end_point=self.DEFAULT_END_POINT)
+        if self._grid_resolver is not None and type == 'forecastGridData':
+            self._learn_cell(res)
+        return res
+
+    def _learn_cell(self, res):
+        properties = res.get('properties') or {}
+        geometry = res.get('geometry') or {}
+        if geometry.get('type') != 'Polygon' or 'gridId' not in properties:
+            return
+        self._grid_resolver.learn_cell(
+            properties['gridId'], properties['gridX'], properties['gridY'],
+            geometry['coordinates'][0])
+
+    def resolve_forecast_uris(self, coordinates, type='forecast'):
+        """Get the forecast urls of many coordinates, resolved offline by
+        the grid resolver when possible and through /points otherwise.
 
-        if type:
-            uri = res['properties'][type]
-        else:
-            if hourly:
-                uri = res['properties']['forecastHourly']
+        Args:
+            coordinates (list): (lat, lon) tuples.
+            type (string[optional]): forecast, forecastHourly or
+                forecastGridData.
+        Returns:
+            list: forecast urls in the order of coordinates.
+        """
+        if type not in self.GRIDPOINT_FORECAST_PATHS:
+            raise Exception('Error: invalid forecast type {}.'.format(type))
+        resolved = [None] * len(coordinates)
+        if self._grid_resolver is not None and coordinates:
+            lats, lons = zip(*coordinates)
+            resolved = self._grid_resolver.resolve_many(lats, lons)
+        uris = []
+        for (lat, lon), gridpoint in zip(coordinates, resolved):
+            if gridpoint is not None:
+                uris.append(self._gridpoint_uri(gridpoint, type))
             else:
-                uri = res['properties']['forecast']
+                uris.append(self._forecast_uri(lat, lon, type=type))
+        return uris
 
-        return self.make_get_request(
-            uri=uri, end_point=self.DEFAULT_END_POINT)
+    def _gridpoint_uri(self, gridpoint, type):
+        return '{}://{}/gridpoints/{}/{},{}{}'.format(
+            self.SCHEME, self.DEFAULT_END_POINT, gridpoint[0], gridpoint[1],
+            gridpoint[2], self.GRIDPOINT_FORECAST_PATHS[type])
+
+    def _forecast_uri(self, lat, long, hourly=False, type=''):
+        if self._grid_resolver is not None:
+            forecast_type = type or (
+                'forecastHourly' if hourly else 'forecast')
+            if forecast_type in self.GRIDPOINT_FORECAST_PATHS:
+                gridpoint = self._grid_resolver.resolve(lat, long)
+                if gridpoint is not None:
+                    return self._gridpoint_uri(gridpoint, forecast_type)
+
+        res = self.points_metadata(lat, long)
+
+        if type:
+            return res['properties'][type]
+        if hourly:
+            return res['properties']['forecastHourly']
+        return res['properties']['forecast']
 
     def stations(self, **params):
         """Get list of US weather stations and their metadata.
@@ -321,32 +750,22 @@ class NOAA(UTIL):
             limit (int[optional]): limit of results.
             current (bool[optional]): True if needs current observations.
             recordId (str[optional]): recordId, Record Id (ISO8601DateTime)
+            columnar (bool[optional]): True to return the observations as
+                an ObservationFrame (requires numpy).
         Returns:
             json: json response from api.
         """
 
+        if params.pop('columnar', False):
+            res = self.stations_observations(station_id, **params)
+            if isinstance(res, dict):
+                res = res.get('features', [res])
+            return ObservationFrame.from_observations(res)
         if not station_id:
             raise Exception("'station_id' is required.")
         if 'recordId' in params and 'current' in params:
             raise Exception("Cannot have both 'current' and 'recordId'")
-        if 'start' in params:
-            start = params['start']
-            self.parse_param_timestamp(start)
-            if len(start) < 19:
-                start = '{}T00:00:00Z'.format(start[:10])
-            elif len(params['start']) < 20:
-                start = start.replace(' ', 'T')
-                start = '{}Z'.format(start)
-            params['start'] = start
-        if 'end' in params:
-            end = params['end']
-            self.parse_param_timestamp(end)
-            if len(end) < 19:
-                end = '{}T23:59:59Z'.format(end[:10])
-            elif len(params['end']) < 20:
-                end = end.replace(' ', 'T')
-                end = '{}Z'.format(end)
-            params['end'] = end
+        self._normalize_observation_params(params)
 
         request_uri = "/stations/{stationId}/observations".format(
             stationId=station_id)
@@ -379,6 +798,108 @@ class NOAA(UTIL):
             "/stations/{stationId}/observations".format(stationId=station_id),
             end_point=self.DEFAULT_END_POINT)
 
+    def iter_stations(self, prefetch=True, stream=False, **params):
+        """Iterate over all weather stations, following the
+        pagination.next links of the api.
+
+        Args:
+            prefetch (boolean[optional]): True to fetch the next page in a
+                background thread while the current one is consumed.
+            stream (boolean[optional]): True to parse each page
+                incrementally and yield stations as they are received
+                (pages are then not prefetched).
+            params: filters accepted by stations().
+        Returns:
+            generator: generator of station features.
+        """
+        if 'station_id' in params:
+            params['id'] = params.pop('station_id')
+        request_uri = "/stations"
+        if params:
+            request_uri = '{}?{}'.format(request_uri, urlencode(params))
+        return self._iter_features(request_uri, prefetch, stream)
+
+    def iter_stations_observations(
+            self, station_id, prefetch=True, stream=False, **params):
+        """Iterate over all observations of a station, following the
+        pagination.next links of the api so that long start / end ranges
+        are not truncated to the first page.
+
+        Args:
+            station_id (str): station id.
+            prefetch (boolean[optional]): True to fetch the next page in a
+                background thread while the current one is consumed.
+            stream (boolean[optional]): True to parse each page
+                incrementally and yield observations as they are received
+                (pages are then not prefetched).
+            start (str[optional]): start date of observation
+                (eg. '%Y-%m-%dT%H:%M:%SZ' | '%Y-%m-%d' | '%Y-%m-%d %H:%M:%S').
+            end (str[optional]): end date of observation
+                (eg. '%Y-%m-%dT%H:%M:%SZ' | '%Y-%m-%d' | '%Y-%m-%d %H:%M:%S').
+            limit (int[optional]): limit of results per page.
+        Returns:
+            generator: generator of observation features.
+        """
+        if not station_id:
+            raise Exception("'station_id' is required.")
+        self._normalize_observation_params(params)
+        request_uri = "/stations/{stationId}/observations".format(
+            stationId=station_id)
+        if params:
+            request_uri = '{}?{}'.format(request_uri, urlencode(params))
+        return self._iter_features(request_uri, prefetch, stream)
+
+    def _normalize_observation_params(self, params):
+        if 'start' in params:
+            start = params['start']
+            self.parse_param_timestamp(start)
+            if len(start) < 19:
+                start = '{}T00:00:00Z'.format(start[:10])
+            elif len(params['start']) < 20:
+                start = start.replace(' ', 'T')
+                start = '{}Z'.format(start)
+            params['start'] = start
+        if 'end' in params:
+            end = params['end']
+            self.parse_param_timestamp(end)
+            if len(end) < 19:
+                end = '{}T23:59:59Z'.format(end[:10])
+            elif len(params['end']) < 20:
+                end = end.replace(' ', 'T')
+                end = '{}Z'.format(end)
+            params['end'] = end
+        return params
+
+    def _iter_features(self, uri, prefetch, stream):
+        if stream:
+            return self._stream_feature_pages(uri)
+        return self.iter_pages(
+            self._fetch_feature_page, uri, prefetch=prefetch)
+
+    def _stream_feature_pages(self, uri):
+        while uri:
+            metadata = {}
+            count = 0
+            for feature in self.make_streaming_get_request(
+                    uri, end_point=self.DEFAULT_END_POINT,
+                    metadata=metadata):
+                count += 1
+                yield feature
+            next_uri = metadata.get('pagination', {}).get('next')
+            if not count or next_uri == uri:
+                return
+            uri = next_uri
+
+    def _fetch_feature_page(self, uri):
+        res = self.make_get_request(uri, end_point=self.DEFAULT_END_POINT)
+        if 'features' not in res:
+            raise Exception(res)
+        features = res['features']
+        next_uri = res.get('pagination', {}).get('next')
+        if not features or not next_uri or next_uri == uri:
+            return features, None
+        return features, next_uri
+
     def products(self, id):
         """Get data of a product.
 
@@ -527,6 +1048,26 @@ class NOAA(UTIL):
             "/alerts?{query_string}".format(query_string=urlencode(params)),
             end_point=self.DEFAULT_END_POINT)
 
+    def iter_alerts(self, prefetch=True, stream=False, **params):
+        """Iterate over all alerts matching the parameters of alerts(),
+        following the pagination.next links of the api.
+
+        Args:
+            prefetch (boolean[optional]): True to fetch the next page in a
+                background thread while the current one is consumed.
+            stream (boolean[optional]): True to parse each page
+                incrementally and yield alerts as they are received
+                (pages are then not prefetched).
+            params: filters accepted by alerts() except alert_id.
+        Returns:
+            generator: generator of alert features.
+        """
+        if 'alert_id' in params:
+            raise Exception('Error: alert_id cannot be paginated.')
+        return self._iter_features(
+            "/alerts?{query_string}".format(query_string=urlencode(params)),
+            prefetch, stream)
+
     def active_alerts(self, count=False, **params):
         """Active alerts endpoints.
 
@@ -547,21 +1088,17 @@ class NOAA(UTIL):
             return self.make_get_request(
                 "/alerts/count",
                 end_point=self.DEFAULT_END_POINT)
+        return self.make_get_request(
+            self._active_alerts_uri(**params),
+            end_point=self.DEFAULT_END_POINT)
+
+    def _active_alerts_uri(self, **params):
         if 'zone_id' in params:
-            return self.make_get_request(
-                "/alerts/active/zone/{zoneId}".format(
-                    zoneId=params['zone_id']),
-                end_point=self.DEFAULT_END_POINT)
+            return "/alerts/active/zone/{zoneId}".format(
+                zoneId=params['zone_id'])
         if 'area' in params:
-            return self.make_get_request(
-                "/alerts/active/area/{area}".format(
-                    area=params['area']),
-                end_point=self.DEFAULT_END_POINT)
+            return "/alerts/active/area/{area}".format(area=params['area'])
         if 'region' in params:
-            return self.make_get_request(
-                "/alerts/active/region/{region}".format(
-                    region=params['region']),
-                end_point=self.DEFAULT_END_POINT)
-        return self.make_get_request(
-            "/alerts/active",
-            end_point=self.DEFAULT_END_POINT)
+            return "/alerts/active/region/{region}".format(
+                region=params['region'])
+        return "/alerts/active"
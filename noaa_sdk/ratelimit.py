@@ -0,0 +1,178 @@
+"""
+Client-side rate limiting
+=========================
+Token buckets pacing requests per endpoint host. Buckets are thread safe and
+can be shared between client instances; FileTokenBucket keeps its state in a
+locked file so that several processes share one budget.
+"""
+
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class TokenBucket(object):
+    """Thread safe token bucket.
+
+    Callers reserve tokens up front and sleep for the time it takes the
+    bucket to refill, so requests are spread evenly instead of bursting.
+    """
+
+    def __init__(self, rate, capacity=1):
+        """Constructor.
+
+        Args:
+            rate (float): tokens added per second.
+            capacity (float[optional]): maximum burst size.
+        """
+        if rate <= 0:
+            raise Exception('Error: rate must be positive.')
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Take tokens from the bucket, sleeping until they are available.
+
+        Args:
+            tokens (float[optional]): number of tokens to take.
+        Returns:
+            float: seconds waited.
+        """
+        with self._lock:
+            self._tokens, self._updated, wait = self._reserve(
+                self._tokens, self._updated, tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def _reserve(self, available, updated, tokens):
+        now = time.time()
+        available = min(
+            self.capacity, available + max(0.0, now - updated) * self.rate)
+        available -= tokens
+        wait = -available / self.rate if available < 0 else 0.0
+        return available, now, wait
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket whose state lives in a file locked with fcntl, shared
+    by every process using the same path (POSIX only).
+    """
+
+    _STATE = struct.Struct('<dd')
+
+    def __init__(self, path, rate, capacity=1):
+        """Constructor.
+
+        Args:
+            path (str): state file shared by the processes.
+            rate (float): tokens added per second.
+            capacity (float[optional]): maximum burst size.
+        """
+        if fcntl is None:
+            raise Exception(
+                'Error: FileTokenBucket requires fcntl (POSIX only).')
+        super().__init__(rate, capacity=capacity)
+        self.path = path
+
+    def acquire(self, tokens=1):
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                data = os.read(fd, self._STATE.size)
+                if len(data) == self._STATE.size:
+                    available, updated = self._STATE.unpack(data)
+                else:
+                    available, updated = self.capacity, time.time()
+                available, updated, wait = self._reserve(
+                    available, updated, tokens)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, self._STATE.pack(available, updated))
+            finally:
+                os.close(fd)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RateLimiter(object):
+    """Token buckets keyed by endpoint host.
+
+    A host can have several buckets (eg. a per second and a per day limit);
+    a request waits for all of them. Hosts without buckets are not limited.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+
+    @classmethod
+    def default(cls, path=None):
+        """Rate limiter with the published limits of the services.
+
+        Nominatim allows 1 request per second and NCDC 5 per second and
+        10,000 per day for a token. api.weather.gov does not publish a
+        limit, 10 per second stays clear of its burst throttling.
+
+        Args:
+            path (str[optional]): directory for file backed buckets shared
+                between processes (None for in-process buckets).
+        Returns:
+            RateLimiter: configured rate limiter.
+        """
+        limiter = cls()
+        for host, rate, capacity in (
+                ('api.weather.gov', 10, 1),
+                ('nominatim.openstreetmap.org', 1, 1),
+                ('www.ncdc.noaa.gov', 5, 1),
+                ('www.ncdc.noaa.gov', 10000 / 86400.0, 10000)):
+            bucket_path = None
+            if path:
+                bucket_path = os.path.join(path, '{}-{:g}.bucket'.format(
+                    host, rate))
+            limiter.limit(host, rate, capacity=capacity, path=bucket_path)
+        return limiter
+
+    def limit(self, host, rate, capacity=1, path=None):
+        """Add a bucket for a host.
+
+        Args:
+            host (str): endpoint host (eg. api.weather.gov).
+            rate (float): requests per second.
+            capacity (float[optional]): maximum burst size.
+            path (str[optional]): state file to share the bucket between
+                processes.
+        Returns:
+            TokenBucket: the new bucket.
+        """
+        if path:
+            bucket = FileTokenBucket(path, rate, capacity=capacity)
+        else:
+            bucket = TokenBucket(rate, capacity=capacity)
+        self._buckets.setdefault(host, []).append(bucket)
+        return bucket
+
+    def buckets(self, host):
+        return list(self._buckets.get(host, []))
+
+    def acquire(self, host):
+        """Wait until a request to host is allowed.
+
+        Args:
+            host (str): endpoint host.
+        Returns:
+            float: seconds waited.
+        """
+        waited = 0.0
+        for bucket in self._buckets.get(host, ()):
+            waited += bucket.acquire()
+        return waited
@@ -0,0 +1,182 @@
+"""
+Retry policy for requests
+=========================
+Exponential backoff with jitter, a total deadline, per attempt connect and
+read timeouts and Retry-After support.
+"""
+
+from email.utils import parsedate_to_datetime
+import logging
+import random
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy(object):
+    """Decide whether and when a failed request is retried.
+
+    Only responses with a retryable status code (throttling and server
+    errors) are retried. The delay before attempt n + 1 is the server's
+    Retry-After when given, capped at backoff_cap, otherwise
+    backoff_base * 2 ** (n - 1) capped at backoff_cap, with full jitter
+    applied.
+    """
+
+    RETRYABLE_STATUS_CODES = frozenset([408, 425, 429, 500, 502, 503, 504])
+    DEFAULT_TIMEOUT = (10.0, 30.0)
+
+    def __init__(self, max_attempts=6, backoff_base=0.5, backoff_cap=30.0,
+                 jitter=True, retryable_status_codes=None, deadline=None,
+                 timeout=DEFAULT_TIMEOUT):
+        """Constructor.
+
+        Args:
+            max_attempts (int[optional]): maximum number of attempts
+                including the first one.
+            backoff_base (float[optional]): delay in seconds after the
+                first failed attempt.
+            backoff_cap (float[optional]): maximum delay in seconds between
+                attempts, Retry-After included.
+            jitter (boolean[optional]): True to pick a random delay between
+                0 and the backoff delay.
+            retryable_status_codes (iterable[optional]): status codes worth
+                retrying. Defaults to RETRYABLE_STATUS_CODES.
+            deadline (float[optional]): maximum seconds spent on a request
+                including retries (None for no deadline).
+            timeout (float|tuple[optional]): connect and read timeouts of
+                each attempt in seconds, as a (connect, read) tuple or one
+                value for both (None to wait forever). Attempts timing out
+                are retried like a 408 response.
+        """
+        if max_attempts < 1:
+            raise Exception('Error: max_attempts must be at least 1.')
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.jitter = jitter
+        if retryable_status_codes is None:
+            retryable_status_codes = self.RETRYABLE_STATUS_CODES
+        self.retryable_status_codes = frozenset(retryable_status_codes)
+        self.deadline = deadline
+        self.timeout = timeout
+
+    def is_retryable(self, status_code):
+        return status_code in self.retryable_status_codes
+
+    def backoff(self, attempt):
+        """Get the backoff delay after a failed attempt.
+
+        Args:
+            attempt (int): number of the failed attempt (starting at 1).
+        Returns:
+            float: delay in seconds.
+        """
+        delay = min(
+            self.backoff_cap, self.backoff_base * (2 ** (attempt - 1)))
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+    def retry_after(self, response):
+        """Get the delay requested by the Retry-After header.
+
+        Args:
+            response (Response): failed response.
+        Returns:
+            float: delay in seconds or None when not given.
+        """
+        headers = getattr(response, 'headers', None)
+        value = headers.get('Retry-After') if headers else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at is None:
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+    def attempt_timeout(self, started):
+        """Get the timeouts of the next attempt, capped by the time left
+        before the deadline.
+
+        Args:
+            started (float): time.monotonic() of the first attempt.
+        Returns:
+            tuple: (connect, read) timeouts in seconds or None.
+        """
+        timeout = self.timeout
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        if self.deadline is None:
+            return None if timeout == (None, None) else timeout
+        left = max(0.001, self.deadline - (time.monotonic() - started))
+        return tuple(left if value is None else min(value, left)
+                     for value in timeout)
+
+    def next_delay(self, attempt, response, started):
+        """Get the delay before the next attempt.
+
+        Args:
+            attempt (int): number of the failed attempt (starting at 1).
+            response (Response): failed response.
+            started (float): time.monotonic() of the first attempt.
+        Returns:
+            float: delay in seconds or None if the request must not be
+            retried.
+        """
+        if (attempt >= self.max_attempts or
+                not self.is_retryable(response.status_code)):
+            return None
+        delay = self.retry_after(response)
+        if delay is None:
+            delay = self.backoff(attempt)
+        else:
+            delay = min(delay, self.backoff_cap)
+        if (self.deadline is not None and
+                time.monotonic() - started + delay > self.deadline):
+            return None
+        return delay
+
+    def call(self, request, on_retry=None):
+        """Call request until it succeeds or the policy gives up.
+
+        Args:
+            request (function): function without arguments returning a
+                response object.
+            on_retry (function[optional]): called with (attempt, response,
+                delay) before sleeping.
+        Returns:
+            Response: first response which is not retryable.
+        """
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            response = request()
+            if not self.is_retryable(response.status_code):
+                return response
+            delay = self.next_delay(attempt, response, started)
+            if delay is None:
+                self._give_up(response)
+            self._log_retry(attempt, response, delay, on_retry)
+            time.sleep(delay)
+            attempt += 1
+
+    def _log_retry(self, attempt, response, delay, on_retry):
+        logger.warning(
+            'Request failed with code %s (attempt %s). Retrying in %.2fs.',
+            response.status_code, attempt, delay)
+        if on_retry is not None:
+            on_retry(attempt, response, delay)
+
+    def _give_up(self, response):
+        raise Exception(
+            'Maximum retries exceeded. Response object dump: {}'.format(
+                response))
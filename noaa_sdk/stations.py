@@ -0,0 +1,264 @@
+"""
+Station index
+=============
+A local spatial index of the observation stations of api.weather.gov, so
+the nearest stations of a coordinate are found without the /points and
+observationStations round trips.
+
+Stations are points on the unit sphere (x, y, z) organised as an implicit
+KD-tree: the points are ordered so that the node of the range [lo, hi) is
+its middle element, split on axis depth % 3. Chord distances on the sphere
+are monotonic with great circle distances, so nearest neighbours in 3D are
+nearest neighbours on Earth. The index is saved as a compact binary file.
+"""
+
+from array import array
+import heapq
+import math
+import struct
+import sys
+import time
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _to_xyz(lat, lon):
+    lat = math.radians(lat)
+    lon = math.radians(lon)
+    cos_lat = math.cos(lat)
+    return cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat)
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def _km_to_chord(km):
+    angle = km / EARTH_RADIUS_KM
+    if angle >= math.pi:
+        return 2.0
+    return 2 * math.sin(angle / 2)
+
+
+class StationIndex(object):
+    """Nearest station lookups over station coordinates."""
+
+    MAGIC = b'NSIX'
+    VERSION = 1
+    _HEADER = struct.Struct('<4sHId')
+
+    def __init__(self, stations=None, updated=None):
+        """Constructor.
+
+        Args:
+            stations (iterable[optional]): (station_id, lat, lon) tuples.
+            updated (float[optional]): unix time the stations were fetched.
+        """
+        self._stations = {}
+        for station_id, lat, lon in stations or ():
+            self._stations[station_id] = (float(lat), float(lon))
+        self.updated = updated or time.time()
+        self._build()
+
+    @classmethod
+    def from_features(cls, features):
+        """Build an index from GeoJSON station features.
+
+        Args:
+            features (iterable): features of the /stations feed.
+        Returns:
+            StationIndex: new index.
+        """
+        return cls(_feature_stations(features))
+
+    @classmethod
+    def build(cls, client, **params):
+        """Build an index from every page of the /stations feed.
+
+        Args:
+            client (NOAA): client fetching the stations.
+            params: filters accepted by NOAA.iter_stations (eg. state).
+        Returns:
+            StationIndex: new index.
+        """
+        return cls.from_features(client.iter_stations(**params))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, station_id):
+        return station_id in self._stations
+
+    def coordinates(self, station_id):
+        """Get the (lat, lon) of a station."""
+        return self._stations[station_id]
+
+    def update(self, features):
+        """Add or move stations from GeoJSON station features.
+
+        Args:
+            features (iterable): station features.
+        Returns:
+            int: number of stations added or moved.
+        """
+        changed = 0
+        for station_id, lat, lon in _feature_stations(features):
+            if self._stations.get(station_id) != (lat, lon):
+                self._stations[station_id] = (lat, lon)
+                changed += 1
+        if changed:
+            self._build()
+        self.updated = time.time()
+        return changed
+
+    def remove(self, station_ids):
+        """Remove stations from the index.
+
+        Args:
+            station_ids (iterable): station ids.
+        """
+        removed = [self._stations.pop(i, None) for i in station_ids]
+        if any(r is not None for r in removed):
+            self._build()
+
+    def refresh(self, client, **params):
+        """Update the index with the current /stations feed.
+
+        Args:
+            client (NOAA): client fetching the stations.
+            params: filters accepted by NOAA.iter_stations, to refresh part
+                of the index only (eg. state='NY').
+        Returns:
+            int: number of stations added or moved.
+        """
+        return self.update(client.iter_stations(**params))
+
+    def nearest_stations(self, lat, lon, k=1, max_km=None):
+        """Find the stations nearest to a coordinate.
+
+        Args:
+            lat (float): latitude.
+            lon (float): longitude.
+            k (int[optional]): maximum number of stations.
+            max_km (float[optional]): maximum distance in kilometers.
+        Returns:
+            list: (station_id, distance in km) tuples, nearest first.
+        """
+        if k < 1 or not self._ids:
+            return []
+        query = _to_xyz(lat, lon)
+        bound = 4.0 if max_km is None else _km_to_chord(max_km) ** 2
+        heap = []
+        self._search(query, 0, len(self._ids), 0, k, bound, heap)
+        return [(self._ids[i], _chord_to_km(math.sqrt(-d)))
+                for d, i in sorted(heap, reverse=True)]
+
+    def _search(self, query, lo, hi, depth, k, bound, heap):
+        coords = self._coords
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            point = coords[mid]
+            dx = query[0] - point[0]
+            dy = query[1] - point[1]
+            dz = query[2] - point[2]
+            distance = dx * dx + dy * dy + dz * dz
+            if len(heap) < k:
+                if distance <= bound:
+                    heapq.heappush(heap, (-distance, mid))
+            elif distance < -heap[0][0]:
+                heapq.heapreplace(heap, (-distance, mid))
+            diff = (dx, dy, dz)[depth % 3]
+            if diff < 0:
+                near, far = (lo, mid), (mid + 1, hi)
+            else:
+                near, far = (mid + 1, hi), (lo, mid)
+            self._search(query, near[0], near[1], depth + 1, k, bound, heap)
+            worst = bound if len(heap) < k else min(bound, -heap[0][0])
+            if diff * diff > worst:
+                return
+            lo, hi = far
+            depth += 1
+
+    def _build(self):
+        items = sorted(self._stations.items())
+        points = [_to_xyz(lat, lon) for _, (lat, lon) in items]
+        order = list(range(len(items)))
+        stack = [(0, len(order), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if hi - lo < 2:
+                continue
+            axis = depth % 3
+            order[lo:hi] = sorted(
+                order[lo:hi], key=lambda i: points[i][axis])
+            mid = (lo + hi) >> 1
+            stack.append((lo, mid, depth + 1))
+            stack.append((mid + 1, hi, depth + 1))
+        self._ids = [items[i][0] for i in order]
+        self._coords = [points[i] for i in order]
+
+    def save(self, path):
+        """Write the index to a binary file.
+
+        The file holds a header (magic, version, count, updated), the
+        latitudes and longitudes as little-endian float64 arrays in tree
+        order, then the newline separated station ids.
+
+        Args:
+            path (str): file path.
+        """
+        lats = array('d', (self._stations[i][0] for i in self._ids))
+        lons = array('d', (self._stations[i][1] for i in self._ids))
+        if sys.byteorder != 'little':
+            lats.byteswap()
+            lons.byteswap()
+        with open(path, 'wb') as f:
+            f.write(self._HEADER.pack(
+                self.MAGIC, self.VERSION, len(self._ids), self.updated))
+            f.write(lats.tobytes())
+            f.write(lons.tobytes())
+            f.write('\n'.join(self._ids).encode('utf-8'))
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save().
+
+        Args:
+            path (str): file path.
+        Returns:
+            StationIndex: loaded index.
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, count, updated = cls._HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise Exception(
+                'Error: {} is not a station index file.'.format(path))
+        offset = cls._HEADER.size
+        lats = array('d', data[offset:offset + 8 * count])
+        offset += 8 * count
+        lons = array('d', data[offset:offset + 8 * count])
+        offset += 8 * count
+        if sys.byteorder != 'little':
+            lats.byteswap()
+            lons.byteswap()
+        ids = data[offset:].decode('utf-8').split('\n') if count else []
+        index = cls.__new__(cls)
+        index._stations = dict(zip(ids, zip(lats, lons)))
+        index.updated = updated
+        # Saved in tree order: the tree is restored without sorting.
+        index._ids = ids
+        index._coords = [_to_xyz(lat, lon) for lat, lon in zip(lats, lons)]
+        return index
+
+
+def _feature_stations(features):
+    for feature in features:
+        properties = feature.get('properties') or {}
+        geometry = feature.get('geometry') or {}
+        station_id = properties.get('stationIdentifier')
+        coordinates = geometry.get('coordinates')
+        if not station_id or not coordinates:
+            continue
+        yield station_id, float(coordinates[1]), float(coordinates[0])
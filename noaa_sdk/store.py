@@ -0,0 +1,315 @@
+"""
+Record and replay of responses
+==============================
+A content addressed on-disk store of HTTP responses. In record mode every
+response received by a client is saved; in replay mode requests are served
+from the store without touching the network, so NOAA, OSM and NCDC can run
+fully offline from a captured corpus.
+
+Record or replay a whole script with:
+
+    python -m noaa_sdk.store record DIRECTORY script.py [args...]
+    python -m noaa_sdk.store replay DIRECTORY script.py [args...]
+    python -m noaa_sdk.store list DIRECTORY
+"""
+
+from contextlib import contextmanager
+import gzip
+import hashlib
+import json
+import os
+import runpy
+import sys
+import threading
+
+from requests.structures import CaseInsensitiveDict
+
+from noaa_sdk.cache import LRUCache
+
+
+ENV_PATH = 'NOAA_SDK_STORE'
+ENV_MODE = 'NOAA_SDK_STORE_MODE'
+
+# Headers that change between runs without changing the response.
+_VOLATILE_HEADERS = frozenset(['if-none-match', 'if-modified-since'])
+
+
+class StoredResponse(object):
+    """Replayed response exposing the parts of requests.Response used by
+    the SDK.
+    """
+
+    def __init__(self, status_code, content, headers=None, reason='',
+                 url=''):
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.reason = reason
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=65536):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class ResponseStore(object):
+    """Content addressed store of responses on disk.
+
+    Entries are keyed by the sha256 of end point, uri and request headers
+    (conditional headers excluded). Each entry is one file holding a JSON
+    metadata line followed by the raw body, gzip compressed unless
+    compress=False. In replay mode the last memory_size entries read are
+    kept in memory; record mode keeps nothing.
+
+    Recording reads the whole body of a response, so streamed responses
+    (make_streaming_get_request) are buffered in memory while recording.
+    Conditional headers are dropped while recording so that a revalidation
+    records the full response rather than an empty 304.
+    """
+
+    MODES = ('record', 'replay')
+
+    def __init__(self, path, mode='replay', compress=True, memory_size=256):
+        """Constructor.
+
+        Args:
+            path (str): directory holding the entries.
+            mode (str[optional]): 'record' to save responses received from
+                the network, 'replay' to serve responses from the store only.
+            compress (boolean[optional]): True to gzip new entries.
+            memory_size (int[optional]): number of replayed responses
+                kept in memory.
+        """
+        if mode not in self.MODES:
+            raise Exception('Error: invalid mode {}. Available modes are: '
+                            '{}'.format(mode, list(self.MODES)))
+        self.path = path
+        self.mode = mode
+        self.compress = compress
+        self._memory = LRUCache(maxsize=memory_size)
+        os.makedirs(path, exist_ok=True)
+
+    @classmethod
+    def from_environ(cls, environ=None):
+        """Store configured by the NOAA_SDK_STORE (directory) and
+        NOAA_SDK_STORE_MODE (record | replay) environment variables.
+
+        Returns:
+            ResponseStore: configured store or None.
+        """
+        environ = os.environ if environ is None else environ
+        if not environ.get(ENV_PATH):
+            return None
+        return cls(environ[ENV_PATH],
+                   mode=environ.get(ENV_MODE, 'replay'))
+
+    def key(self, end_point, uri, header=None):
+        """Get the content address of a request.
+
+        Args:
+            end_point (str): end point host.
+            uri (str): uri with query string.
+            header (dict[optional]): request header.
+        Returns:
+            str: hex digest.
+        """
+        headers = sorted(
+            (str(k).lower(), str(v)) for k, v in (header or {}).items()
+            if str(k).lower() not in _VOLATILE_HEADERS)
+        data = json.dumps([end_point, '/' + uri.lstrip('/'), headers])
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def fetch(self, end_point, uri, header, send):
+        """Serve a request according to the mode.
+
+        Args:
+            end_point (str): end point host.
+            uri (str): uri with query string.
+            header (dict): request header.
+            send (function): performs the request over the network with
+                the header given.
+        Returns:
+            Response: recorded or live response.
+        """
+        key = self.key(end_point, uri, header)
+        if self.mode == 'replay':
+            response = self.load(key)
+            if response is None:
+                raise Exception(
+                    'Error: no recorded response for {}/{}.'.format(
+                        end_point, uri.lstrip('/')))
+            return response
+        response = send(dict(
+            (k, v) for k, v in (header or {}).items()
+            if str(k).lower() not in _VOLATILE_HEADERS))
+        if hasattr(response, 'content') and response.status_code != 304 and (
+                response.status_code < 500 and response.status_code != 429):
+            self.save(key, end_point, uri, response)
+        return response
+
+    def save(self, key, end_point, uri, response):
+        """Write a response to the store.
+
+        Args:
+            key (str): content address from key().
+            end_point (str): end point host.
+            uri (str): uri with query string.
+            response (Response): response to save.
+        """
+        meta = json.dumps({
+            'end_point': end_point,
+            'uri': uri,
+            'status_code': response.status_code,
+            'reason': getattr(response, 'reason', '') or '',
+            'headers': dict(getattr(response, 'headers', None) or {}),
+        }).encode('utf-8')
+        data = meta + b'\n' + response.content
+        if self.compress:
+            data = gzip.compress(data)
+        path = self._entry_path(key, self.compress)
+        tmp_path = '{}.{}.tmp'.format(path, threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def load(self, key):
+        """Read a response from the store.
+
+        Args:
+            key (str): content address from key().
+        Returns:
+            StoredResponse: stored response or None.
+        """
+        response = self._memory.get(key)
+        if response is not None:
+            return response
+        response = self._read(key)
+        if response is not None and self.mode == 'replay':
+            self._memory.set(key, response)
+        return response
+
+    def entries(self):
+        """Iterate over the metadata of every stored response.
+
+        Returns:
+            generator: dictionaries with key, end_point, uri, status_code
+            and size.
+        """
+        for name in sorted(os.listdir(self.path)):
+            key, ext = os.path.splitext(name)
+            if ext not in ('.gz', '.bin'):
+                continue
+            response = self._read(key)
+            if response is None:
+                continue
+            yield {
+                'key': key,
+                'end_point': response.url.split('/')[0],
+                'uri': response.url[len(response.url.split('/')[0]):],
+                'status_code': response.status_code,
+                'size': len(response.content),
+            }
+
+    def _entry_path(self, key, compressed):
+        return os.path.join(
+            self.path, '{}.{}'.format(key, 'gz' if compressed else 'bin'))
+
+    def _read(self, key):
+        path = self._entry_path(key, False)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return self._parse(f.read())
+        path = self._entry_path(key, True)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, 'rb') as f:
+            return self._parse(f.read())
+
+    def _parse(self, data):
+        index = data.index(b'\n')
+        meta = json.loads(data[:index].decode('utf-8'))
+        return StoredResponse(
+            meta['status_code'], data[index + 1:], headers=meta['headers'],
+            reason=meta['reason'],
+            url='{}/{}'.format(meta['end_point'], meta['uri'].lstrip('/')))
+
+
+def _clients(clients):
+    for client in clients:
+        yield client
+        osm = getattr(client, '_osm', None)
+        if osm is not None:
+            yield osm
+
+
+@contextmanager
+def recording(path, *clients, **options):
+    """Record every response received by the clients inside the block.
+
+    Args:
+        path (str): directory of the store.
+        clients (UTIL): NOAA, OSM or NCDC instances.
+        options: other ResponseStore options (eg. compress).
+    """
+    with _using(ResponseStore(path, mode='record', **options), clients):
+        yield
+
+
+@contextmanager
+def replaying(path, *clients, **options):
+    """Serve every request made by the clients inside the block from the
+    store.
+
+    Args:
+        path (str): directory of the store.
+        clients (UTIL): NOAA, OSM or NCDC instances.
+        options: other ResponseStore options (eg. compress).
+    """
+    with _using(ResponseStore(path, mode='replay', **options), clients):
+        yield
+
+
+@contextmanager
+def _using(store, clients):
+    clients = list(_clients(clients))
+    previous = [client.response_store for client in clients]
+    for client in clients:
+        client.response_store = store
+    try:
+        yield store
+    finally:
+        for client, value in zip(clients, previous):
+            client.response_store = value
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] not in ('record', 'replay', 'list') or (
+            argv[0] != 'list' and len(argv) < 3):
+        print('\n'.join(
+            line.strip() for line in __doc__.strip().splitlines()[-3:]))
+        return 2
+    command, path = argv[0], argv[1]
+    if command == 'list':
+        for entry in ResponseStore(path).entries():
+            print('{status_code} {size:>10} {end_point}{uri}'.format(**entry))
+        return 0
+    os.environ[ENV_PATH] = path
+    os.environ[ENV_MODE] = command
+    sys.argv = argv[2:]
+    runpy.run_path(argv[2], run_name='__main__')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
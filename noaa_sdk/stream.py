@@ -0,0 +1,220 @@
+"""
+Incremental JSON parsing
+========================
+Parse a GeoJSON FeatureCollection from a stream of byte chunks and yield its
+features one at a time, so memory is bounded by the largest feature rather
+than by the whole response.
+"""
+
+import codecs
+import json
+import re
+
+
+_WHITESPACE = ' \t\n\r'
+_SCAN_WINDOW = 4096
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_COMPLETE_STRINGS = re.compile(
+    r'[^"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"]*)*', re.DOTALL)
+# A lone quote is a string cut at the end of the buffer.
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]|"', re.DOTALL)
+_NOT_BRACKET = re.compile(r'[^\[\]{}]+')
+_BRACKET_PAIR = re.compile(r'[\[{][\]}]')
+_SCALAR_END = re.compile(r'[,\]}\s]')
+
+
+class _Reader(object):
+    """Character buffer refilled from an iterator of byte chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=1):
+        """Append at least size characters (fewer at the end)."""
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        texts = []
+        count = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                texts.append(text)
+                count += len(text)
+                if count >= size:
+                    break
+        else:
+            texts.append(self._decoder.decode(b'', final=True))
+            self.eof = True
+        self.buf += ''.join(texts)
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at the end)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in (
+                    _WHITESPACE):
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise Exception(
+                'Error: invalid JSON stream, expected {!r} at {!r}.'.format(
+                    char, self.buf[self.pos:self.pos + 20]))
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value.
+
+        A value not complete in the buffer is read until its end, found
+        by scanning each chunk once while tracking the nesting depth and
+        whether it is inside a string, then decoded in one call.
+        """
+        first = self.peek()
+        if first == '':
+            raise Exception('Error: truncated JSON stream.')
+        if first in '[{"':
+            # Most values are already complete in the buffer.
+            try:
+                value, self.pos = self._json.raw_decode(self.buf, self.pos)
+                return value
+            except ValueError:
+                self._buffer_container()
+        else:
+            self._buffer_scalar()
+        try:
+            value, self.pos = self._json.raw_decode(self.buf, self.pos)
+        except ValueError as err:
+            raise Exception('Error: invalid JSON stream, {}.'.format(err))
+        return value
+
+    def _more(self, offset):
+        # Read more chunks, keeping offset (absolute in buf) valid
+        # although fill() drops the consumed part of the buffer.
+        relative = offset - self.pos
+        # Doubling the buffered part of the value keeps the copies made
+        # by appending to the buffer linear in its size.
+        if not self.fill(len(self.buf) - self.pos):
+            raise Exception('Error: truncated JSON stream.')
+        return self.pos + relative
+
+    def _buffer_container(self):
+        # Read until the buffer holds the whole array, object or string.
+        if self.buf[self.pos] == '"':
+            self._buffer_string(self.pos + 1)
+            return
+        depth, i = self._scan(0, self.pos, len(self.buf))
+        while depth:
+            i = self._more(i)
+            # A value ending early in the new chunk is found token by token.
+            depth, i = self._scan(
+                depth, i, min(len(self.buf), i + _SCAN_WINDOW))
+            if not depth:
+                return
+            # Reduce the new text (stopping before a string cut at the end
+            # of the buffer) with regular expressions, dropping strings and
+            # then balanced bracket pairs. What is left is the unmatched
+            # closing brackets followed by the opening ones, so only the
+            # chunk closing the value is scanned token by token.
+            j = _COMPLETE_STRINGS.match(self.buf, i).end()
+            brackets = _NOT_BRACKET.sub('', _STRING.sub('', self.buf[i:j]))
+            while True:
+                reduced = _BRACKET_PAIR.sub('', brackets)
+                if len(reduced) == len(brackets):
+                    break
+                brackets = reduced
+            closing = len(brackets) - len(brackets.lstrip(']}'))
+            if closing >= depth:
+                depth, i = self._scan(depth, i, j)
+            else:
+                depth += len(brackets) - 2 * closing
+                i = j
+
+    def _scan(self, depth, start, end):
+        # Track the depth token by token from start. Returns the depth and
+        # where to resume: 0 and the end of the value once it is closed,
+        # else the start of a string cut at the end of the buffer or end.
+        for match in _TOKEN.finditer(self.buf, start, end):
+            token = match.group()
+            if token == '"':
+                return depth, match.start()
+            if token in ('[', '{'):
+                depth += 1
+            elif token in (']', '}'):
+                depth -= 1
+                if depth == 0:
+                    return 0, match.end()
+        return depth, end
+
+    def _buffer_string(self, i):
+        while True:
+            match = _STRING_SPECIAL.search(self.buf, i)
+            if match is None or (match.group() == '\\' and
+                                 match.end() == len(self.buf)):
+                # Resume at the escape so it is not split.
+                i = self._more(len(self.buf) if match is None
+                               else match.start())
+            elif match.group() == '\\':
+                i = match.end() + 1
+            else:
+                return
+
+    def _buffer_scalar(self):
+        # Numbers and literals end at a delimiter, or at the end of the
+        # document.
+        while not self.eof and _SCALAR_END.search(
+                self.buf, self.pos) is None:
+            self._more(self.pos)
+
+
+def iter_features(chunks, metadata=None, key='features'):
+    """Yield the items of a top-level array member of a JSON object.
+
+    Args:
+        chunks (iterable): bytes chunks of the JSON document.
+        metadata (dict[optional]): receives every other top-level member
+            (eg. pagination) once it has been parsed.
+        key (str[optional]): name of the array member to stream.
+    Returns:
+        generator: items of the array.
+    """
+    reader = _Reader(chunks)
+    if metadata is None:
+        metadata = {}
+    reader.expect('{')
+    while True:
+        char = reader.peek()
+        if char == '}':
+            return
+        if char == ',':
+            reader.pos += 1
+            continue
+        name = reader.value()
+        reader.expect(':')
+        if name == key and reader.peek() == '[':
+            reader.pos += 1
+            while True:
+                char = reader.peek()
+                if char == ']':
+                    reader.pos += 1
+                    break
+                if char == ',':
+                    reader.pos += 1
+                    continue
+                if char == '':
+                    raise Exception('Error: truncated JSON stream.')
+                yield reader.value()
+        else:
+            metadata[name] = reader.value()
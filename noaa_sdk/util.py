@@ -1,25 +1,197 @@
 from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache
+import json
 import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import Timeout
+import threading
 import time
 
 
 from noaa_sdk.accept import ACCEPT
+from noaa_sdk.cache import CachedResponse, HTTPCache
+from noaa_sdk.metrics import EVENTS, Metrics
+from noaa_sdk.retry import RetryPolicy
+from noaa_sdk.store import ResponseStore
+from noaa_sdk.stream import iter_features
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+JSON_DECODERS = {'json': json.loads}
+if orjson is not None:
+    JSON_DECODERS['orjson'] = orjson.loads
+if ujson is not None:
+    JSON_DECODERS['ujson'] = ujson.loads
+
+
+def get_json_decoder(name='auto'):
+    """Get a function decoding JSON from bytes.
+
+    Args:
+        name (str|function[optional]): 'auto' (fastest installed of orjson,
+            ujson and json), a key of JSON_DECODERS or a callable.
+    Returns:
+        function: decoder taking bytes.
+    """
+    if callable(name):
+        return name
+    if name == 'auto':
+        for name in ('orjson', 'ujson', 'json'):
+            if name in JSON_DECODERS:
+                return JSON_DECODERS[name]
+    if name not in JSON_DECODERS:
+        raise Exception(
+            'Error: JSON decoder {} is not available. '
+            'Available decoders are: {}'.format(
+                name, sorted(JSON_DECODERS)))
+    return JSON_DECODERS[name]
+
+
+class ConditionalResponse(namedtuple(
+        'ConditionalResponse', ['status_code', 'headers', 'body'])):
+    """Result of UTIL.make_conditional_get_request(). body is the decoded
+    response, or None when the server answered 304 Not Modified.
+    """
+
+    __slots__ = ()
+
+    @property
+    def modified(self):
+        return self.status_code != 304
+
+    def validators(self):
+        """Get the headers revalidating this response in the next request.
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers.
+        """
+        return CachedResponse(
+            None, etag=self.headers.get('ETag'),
+            last_modified=self.headers.get('Last-Modified')).validators()
+
+
+class SingleFlight(object):
+    """Share one call between the threads asking for the same key at the
+    same time: the first caller runs the function and the others wait for
+    its result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        """Run function, or wait for the call in flight for key.
+
+        Args:
+            key (hashable): identity of the call.
+            function (function): function without arguments.
+        Returns:
+            tuple: result of the function and False for the caller which ran
+            it, True for callers which waited for it.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            shared = future is not None
+            if not shared:
+                future = self._calls[key] = Future()
+        if shared:
+            return future.result(), True
+        try:
+            result = function()
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return result, False
+
+    def __len__(self):
+        return len(self._calls)
 
 
 class UTIL(object):
     """Utility class for making requests."""
 
-    def __init__(self, user_agent='', accept=None, show_uri=False):
+    SCHEME = 'https'
+    DEFAULT_POOL_CONNECTIONS = 10
+    DEFAULT_POOL_MAXSIZE = 10
+
+    def __init__(self, user_agent='', accept=None, show_uri=False,
+                 pool_connections=None, pool_maxsize=None,
+                 response_cache=None, retry_policy=None, rate_limiter=None,
+                 json_decoder='auto', response_store=None, hooks=None,
+                 metrics=None, coalesce_requests=False):
         """Constructor.
 
         Args:
             user_agent (str[optional]): user agent specified in the header.
             accept (str[optional]): accept string specified in the header.
+            show_uri (boolean[optional]): True for showing the
+                actual url with query string being sent for requesting data.
+            pool_connections (int[optional]): number of hosts to keep
+                connection pools for.
+            pool_maxsize (int[optional]): maximum number of keep-alive
+                connections kept per host.
+            response_cache (HTTPCache[optional]): cache honouring
+                Cache-Control max-age and revalidating with ETag /
+                Last-Modified. Hits decode the cached raw body again, so
+                results may be mutated. True creates a default HTTPCache,
+                None disables caching.
+            retry_policy (RetryPolicy[optional]): when and how failed
+                requests are retried. Defaults to RetryPolicy().
+            rate_limiter (RateLimiter[optional]): paces requests per
+                endpoint host. Share one instance between clients to share
+                the budget (None for no limit).
+            json_decoder (str|function[optional]): 'auto', 'orjson',
+                'ujson', 'json' or a function decoding response bytes.
+            response_store (ResponseStore[optional]): records responses or
+                replays them offline. Defaults to the store configured by
+                the NOAA_SDK_STORE environment variable, False disables it.
+            hooks (dict[optional]): event name (see metrics.EVENTS) to a
+                function or list of functions called with a dictionary
+                describing the event.
+            metrics (Metrics[optional]): collector of request counters and
+                latency histograms. True creates a new Metrics.
+            coalesce_requests (boolean[optional]): True to share one HTTP
+                request between threads making the same GET at the same
+                time. Waiters receive the same decoded object, which must
+                not be mutated.
         """
         self._show_uri = show_uri
         self._user_agent = user_agent
+        if response_cache is True:
+            response_cache = HTTPCache()
+        self._response_cache = response_cache
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._rate_limiter = rate_limiter
+        self._json_decoder = get_json_decoder(json_decoder)
+        if response_store is None:
+            response_store = ResponseStore.from_environ()
+        self._response_store = response_store or None
+        self._single_flight = SingleFlight() if coalesce_requests else None
+        self._hooks = {}
+        self._metrics = None
+        self._register_hooks(hooks, metrics)
+        self._pool_connections = (
+            pool_connections or self.DEFAULT_POOL_CONNECTIONS)
+        self._pool_maxsize = pool_maxsize or self.DEFAULT_POOL_MAXSIZE
+        self._session = None
+        self._session_lock = threading.Lock()
 
         if accept:
             accepts = [getattr(ACCEPT, i)
@@ -31,42 +203,155 @@ class UTIL(object):
                     'Available formats are: {}'.format(accepts))
             self._accept = accept
 
-    def _retry_request_decorator(max_retries):
-        def _retry_request_sub_decorator(request):
-            @wraps(request)
-            def wrapper(*args, **kargs):
-                status_code = ''
-                response = {}
-                retry = 0
-                fib_num_a = 1
-                fib_num_b = 1
-                new_interval = 0
-
-                while status_code == '' or (retry <= max_retries and (
-                        status_code == '' or status_code != 200)):
-                    if retry > 0:
-                        print(
-                            ('Previous request failed with code {}. '
-                             'Retrying...').format(status_code))
-                        print('Previous Response: {}'.format(
-                            response.text))
-                    response = request(*args, **kargs)
-                    status_code = response.status_code
-                    time.sleep(new_interval)
-                    new_interval = fib_num_b + fib_num_a
-                    fib_num_a = fib_num_b
-                    fib_num_b = new_interval
-                    retry += 1
-
-                if retry > max_retries:
-                    raise Exception(
-                        'Maximum retries exceeded. Response object dump: {}'.format(
-                            response))
-                return response
-
-            return wrapper
-
-        return _retry_request_sub_decorator
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def session(self):
+        """Pooled keep-alive session shared by every request (and every
+        thread) made through this instance. Created on first use.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self._pool_connections,
+                        pool_maxsize=self._pool_maxsize)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def close(self):
+        """Close the pooled session and release its connections."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    @property
+    def json_decoder(self):
+        return self._json_decoder
+
+    @json_decoder.setter
+    def json_decoder(self, value):
+        self._json_decoder = get_json_decoder(value)
+
+    def decode_json(self, response):
+        """Decode a JSON response body straight from its raw bytes.
+
+        Args:
+            response (Response): response object.
+        Returns:
+            dict: decoded response.
+        """
+        return self._json_decoder(response.content)
+
+    def _decode(self, end_point, uri, response):
+        if not self._hooks:
+            return self.decode_json(response)
+        started = time.perf_counter()
+        body = self.decode_json(response)
+        self._emit('after_decode', end_point=end_point, uri=uri,
+                   elapsed=time.perf_counter() - started)
+        return body
+
+    @property
+    def hooks(self):
+        return dict((event, list(callbacks))
+                    for event, callbacks in self._hooks.items())
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    def _register_hooks(self, hooks, metrics):
+        for event, callbacks in (hooks or {}).items():
+            if callable(callbacks):
+                callbacks = [callbacks]
+            for callback in callbacks:
+                self.add_hook(event, callback)
+        if metrics is True:
+            metrics = Metrics()
+        self._metrics = metrics
+        if metrics is not None:
+            metrics.attach(self)
+
+    def add_hook(self, event, callback):
+        """Call a function on every occurrence of an event.
+
+        Args:
+            event (str): one of metrics.EVENTS.
+            callback (function): called with a dictionary holding the event
+                name, end_point, uri and the event details.
+        """
+        if event not in EVENTS:
+            raise Exception(
+                'Error: invalid event {}. Available events are: {}'.format(
+                    event, list(EVENTS)))
+        # Replaced rather than mutated, so requests in flight keep iterating
+        # over a consistent list.
+        hooks = dict(self._hooks)
+        hooks[event] = hooks.get(event, []) + [callback]
+        self._hooks = hooks
+
+    def remove_hook(self, event, callback):
+        """Stop calling a function registered with add_hook.
+
+        Args:
+            event (str): one of metrics.EVENTS.
+            callback (function): registered function.
+        """
+        hooks = dict(self._hooks)
+        callbacks = [c for c in hooks.get(event, []) if c != callback]
+        if callbacks:
+            hooks[event] = callbacks
+        else:
+            hooks.pop(event, None)
+        self._hooks = hooks
+
+    def _emit(self, event, **info):
+        callbacks = self._hooks.get(event)
+        if callbacks:
+            info['event'] = event
+            for callback in callbacks:
+                callback(info)
+
+    @property
+    def rate_limiter(self):
+        return self._rate_limiter
+
+    @rate_limiter.setter
+    def rate_limiter(self, value):
+        self._rate_limiter = value
+
+    @property
+    def retry_policy(self):
+        return self._retry_policy
+
+    @retry_policy.setter
+    def retry_policy(self, value):
+        self._retry_policy = value
+
+    @property
+    def response_cache(self):
+        return self._response_cache
+
+    @response_cache.setter
+    def response_cache(self, value):
+        self._response_cache = value
+
+    @property
+    def response_store(self):
+        return self._response_store
+
+    @response_store.setter
+    def response_store(self, value):
+        self._response_store = value
 
     @property
     def show_uri(self):
@@ -107,18 +392,65 @@ class UTIL(object):
             'accept': self._accept
         }
 
-    @_retry_request_decorator(5)
-    def _get(self, end_point, uri, header):
+    def _get(self, end_point, uri, header, stream=False):
+        started = time.monotonic()
+
+        def send():
+            return self._send(
+                end_point, uri, header, stream=stream,
+                timeout=self._retry_policy.attempt_timeout(started))
+
+        if not self._hooks:
+            response = self._retry_policy.call(send)
+        else:
+            response = self._get_with_hooks(end_point, uri, header, send)
+        if response.status_code not in (200, 304):
+            raise Exception('Error: {} {}'.format(
+                response.status_code, getattr(response, 'reason', '')))
+        return response
+
+    def _get_with_hooks(self, end_point, uri, header, send):
+        def on_retry(attempt, response, delay):
+            self._emit('on_retry', end_point=end_point, uri=uri,
+                       attempt=attempt, status_code=response.status_code,
+                       delay=delay)
+
+        self._emit('before_request', end_point=end_point, uri=uri,
+                   header=header)
+        started = time.perf_counter()
+        response = self._retry_policy.call(send, on_retry=on_retry)
+        self._emit('after_response', end_point=end_point, uri=uri,
+                   status_code=response.status_code,
+                   elapsed=time.perf_counter() - started)
+        return response
+
+    def _send(self, end_point, uri, header, stream=False, timeout=None):
+        if self._response_store is not None:
+            return self._response_store.fetch(
+                end_point, uri, header, lambda header: self._send_http(
+                    end_point, uri, header, stream, timeout))
+        return self._send_http(end_point, uri, header, stream, timeout)
+
+    def _send_http(self, end_point, uri, header, stream=False, timeout=None):
         response = None
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(end_point)
         try:
-            response = requests.get(
-                'https://{}/{}'.format(end_point, uri), headers=header)
+            response = self.session.get(
+                '{}://{}/{}'.format(self.SCHEME, end_point, uri),
+                headers=header, stream=stream, timeout=timeout)
         except Exception as err:
             if self._show_uri:
                 print('Caught exception: {}'.format(str(err)))
             InstanceProperties = namedtuple(
-                'ResponseProperties', ['status_code'])
-            response = InstanceProperties(status_code=500)
+                'ResponseProperties', ['status_code', 'reason'])
+            # Timeouts are retried like a 408, other failures like a 500.
+            if isinstance(err, Timeout):
+                response = InstanceProperties(
+                    status_code=408, reason='Timeout')
+            else:
+                response = InstanceProperties(
+                    status_code=500, reason=str(err))
         return response
 
     def make_get_request(self, uri, header=None, end_point=None):
@@ -140,14 +472,154 @@ class UTIL(object):
         if not end_point:
             raise Exception('Error: end_point is None.')
 
+        end_point, uri = self._split_uri(uri, end_point)
+        if self._single_flight is not None:
+            return self._coalesce(
+                end_point, uri, header, self._make_get_request)
+        return self._make_get_request(end_point, uri, header)
+
+    def _coalesce(self, end_point, uri, header, request):
+        key = (end_point, uri, tuple(sorted(
+            (k, str(v)) for k, v in header.items())))
+        body, shared = self._single_flight.do(
+            key, lambda: request(end_point, uri, header))
+        if shared and self._hooks:
+            self._emit('on_cache_hit', end_point=end_point, uri=uri,
+                       cache='in_flight')
+        return body
+
+    def _make_get_request(self, end_point, uri, header):
+        cache_key = None
+        cached = None
+        if self._response_cache is not None:
+            cache_key = (end_point, uri, header.get('accept'))
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                if cached.is_fresh():
+                    if self._hooks:
+                        self._emit('on_cache_hit', end_point=end_point,
+                                   uri=uri, cache='response')
+                    return self._decode(end_point, uri, cached)
+                header = dict(header, **cached.validators())
+
+        res = self._get(end_point, uri, header)
+
+        if res.status_code == 304 and cached is not None:
+            if self._hooks:
+                self._emit('on_cache_hit', end_point=end_point, uri=uri,
+                           cache='response')
+            cached = self._response_cache.revalidated(cache_key, cached, res)
+            return self._decode(end_point, uri, cached)
+        body = self._decode(end_point, uri, res)
+        if cache_key is not None and res.status_code == 200:
+            self._response_cache.store(cache_key, res)
+        return body
+
+    def make_conditional_get_request(
+            self, uri, validators=None, header=None, end_point=None):
+        """Conditional GET request, for pollers tracking changes of one
+        resource themselves rather than through the response cache.
+
+        Args:
+            uri (str): full get url with query string.
+            validators (dict[optional]): If-None-Match / If-Modified-Since
+                headers, eg. validators() of the previous response.
+            header (dict[optional]): request header.
+            end_point (str): end point host.
+        Returns:
+            ConditionalResponse: status code, response headers and decoded
+            body (None when not modified).
+        """
+        if self._show_uri:
+            print('Calling: {}'.format(uri))
+        if not end_point:
+            raise Exception('Error: end_point is None.')
+        header = dict(header or self.get_request_header(),
+                      **(validators or {}))
+        end_point, uri = self._split_uri(uri, end_point)
+        res = self._get(end_point, uri, header)
+        headers = getattr(res, 'headers', None) or {}
+        if res.status_code == 304:
+            if self._hooks:
+                self._emit('on_cache_hit', end_point=end_point, uri=uri,
+                           cache='response')
+            return ConditionalResponse(304, headers, None)
+        return ConditionalResponse(
+            res.status_code, headers, self._decode(end_point, uri, res))
+
+    def make_streaming_get_request(
+            self, uri, header=None, end_point=None, metadata=None,
+            key='features', chunk_size=65536):
+        """GET request parsing the response incrementally, yielding the
+        items of one top-level array (eg. the features of a GeoJSON
+        FeatureCollection) as soon as they are received.
+
+        Args:
+            uri (str): full get url with query string.
+            header (dict): request header.
+            end_point (str): end point host.
+            metadata (dict[optional]): receives the other top-level members
+                of the response (eg. pagination) once they are parsed.
+            key (str[optional]): name of the array to stream.
+            chunk_size (int[optional]): bytes read from the socket at once.
+        Returns:
+            generator: items of the array.
+        """
+
+        if self._show_uri:
+            print('Calling: {}'.format(uri))
+        if not header:
+            header = self.get_request_header()
+        if not end_point:
+            raise Exception('Error: end_point is None.')
+        end_point, uri = self._split_uri(uri, end_point)
+
+        res = self._get(end_point, uri, header, stream=True)
+        try:
+            for item in iter_features(
+                    res.iter_content(chunk_size=chunk_size),
+                    metadata=metadata, key=key):
+                yield item
+        finally:
+            res.close()
+
+    def _split_uri(self, uri, end_point):
         if 'http://' in uri or 'https://' in uri:
             uri = uri.replace('http://', '').replace('https://', '')
             end_point = uri.split('/')[0]
             uri = uri.replace(end_point, '')
+        return end_point, uri
 
-        res = self._get(end_point, uri, header)
+    def iter_pages(self, fetch_page, request, prefetch=True):
+        """Iterate over the items of a paginated resource.
 
-        return res.json()
+        Args:
+            fetch_page (function): takes a page request and returns a tuple
+                of (items, next page request or None).
+            request (object): request for the first page.
+            prefetch (boolean[optional]): True to fetch the next page in a
+                background thread while the current one is consumed.
+        Returns:
+            generator: items of every page.
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            items, request = fetch_page(request)
+            while True:
+                future = None
+                if request is not None and executor is not None:
+                    future = executor.submit(fetch_page, request)
+                for item in items:
+                    yield item
+                if request is None:
+                    return
+                if future is not None:
+                    items, request = future.result()
+                else:
+                    items, request = fetch_page(request)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
 
     def parse_param_timestamp(self, str_date_time):
         """Parse string to datetime object.
@@ -158,21 +630,7 @@ class UTIL(object):
         Returns:
             datetime object.
         """
-        formats = [
-            '%Y-%m-%dT%H:%M:%SZ',
-            '%Y-%m-%d',
-            '%Y-%m-%d %H:%M:%S'
-        ]
-
-        for format in formats:
-            try:
-                return datetime.strptime(str_date_time, format)
-            except Exception as err:
-                continue
-
-        raise Exception(
-            "Error: start and end must have "
-            "format '%Y-%m-%dT%H:%M:%SZ' | '%Y-%m-%d' | '%Y-%m-%d %H:%M:%S'")
+        return _parse_param_timestamp(str_date_time)
 
     def parse_response_timestamp(self, str_date_time):
         """Parse string to datetime object.
@@ -182,4 +640,90 @@ class UTIL(object):
         Returns:
             datetime object.
         """
-        return datetime.strptime(str_date_time, '%Y-%m-%dT%H:%M:%S+00:00')
+        return _parse_response_timestamp(str_date_time)
+
+    def parse_response_timestamps(self, str_date_times):
+        """Parse a list of response timestamps at once.
+
+        Args:
+            str_date_times (list): date times in format
+                '%Y-%m-%dT%H:%M:%S+00:00'.
+        Returns:
+            list: list of datetime objects.
+        """
+        parsed = {}
+        results = []
+        for str_date_time in str_date_times:
+            value = parsed.get(str_date_time)
+            if value is None:
+                value = parsed[str_date_time] = _parse_response_timestamp(
+                    str_date_time)
+            results.append(value)
+        return results
+
+
+_fromisoformat = datetime.fromisoformat
+
+
+def _is_iso_date(value):
+    return value[4] == '-' and value[7] == '-'
+
+
+def _is_iso_time(value, separator):
+    return (value[10] == separator and value[13] == ':' and
+            value[16] == ':')
+
+
+def _parse_param_timestamp(str_date_time):
+    if isinstance(str_date_time, str):
+        value = _parse_iso_param_timestamp(str_date_time)
+        if value is not None:
+            return value
+
+    formats = [
+        '%Y-%m-%dT%H:%M:%SZ',
+        '%Y-%m-%d',
+        '%Y-%m-%d %H:%M:%S'
+    ]
+
+    for format in formats:
+        try:
+            return datetime.strptime(str_date_time, format)
+        except Exception as err:
+            continue
+
+    raise Exception(
+        "Error: start and end must have "
+        "format '%Y-%m-%dT%H:%M:%SZ' | '%Y-%m-%d' | '%Y-%m-%d %H:%M:%S'")
+
+
+@lru_cache(maxsize=1024)
+def _parse_iso_param_timestamp(str_date_time):
+    # Pick the format by length and parse with fromisoformat. Returns None
+    # for anything unusual (eg. '2017-1-1'), which is left to strptime.
+    length = len(str_date_time)
+    if length not in (10, 19, 20) or not _is_iso_date(str_date_time):
+        return None
+    try:
+        if length == 10:
+            return _fromisoformat(str_date_time)
+        if length == 19 and _is_iso_time(str_date_time, ' '):
+            return _fromisoformat(str_date_time)
+        if (length == 20 and str_date_time[19] == 'Z' and
+                _is_iso_time(str_date_time, 'T')):
+            return _fromisoformat(str_date_time[:19])
+    except ValueError:
+        pass
+    return None
+
+
+def _parse_response_timestamp(str_date_time):
+    if (isinstance(str_date_time, str) and len(str_date_time) == 25 and
+            str_date_time.endswith('+00:00') and
+            _is_iso_date(str_date_time) and
+            _is_iso_time(str_date_time, 'T')):
+        try:
+            return _fromisoformat(str_date_time[:19])
+        except ValueError:
+            pass
+    return datetime.strptime(str_date_time, '%Y-%m-%dT%H:%M:%S+00:00')
@@ -7,13 +7,24 @@ with open('README.rst') as file:
 setup(name='noaa-sdk',
       version='0.1.21',
       description='NOAA API (V3) Python 3 SDK.',
+      python_requires='>=3.7',
       install_requires=[
           'requests>=2.22.0'
       ],
+      extras_require={
+          'columnar': ['numpy'],
+          'fast': ['orjson'],
+          'pandas': ['numpy', 'pandas']
+      },
       classifiers=[
           'Development Status :: 3 - Alpha',
           'License :: OSI Approved :: MIT License',
-          'Programming Language :: Python :: 3.4'
+          'Programming Language :: Python :: 3 :: Only',
+          'Programming Language :: Python :: 3.7',
+          'Programming Language :: Python :: 3.8',
+          'Programming Language :: Python :: 3.9',
+          'Programming Language :: Python :: 3.10',
+          'Programming Language :: Python :: 3.11'
       ],
       keywords=(
           'NOAA noaa weather public v3 api sdk osm postalcode country postcode'),
@@ -21,7 +32,8 @@ setup(name='noaa-sdk',
       author='Paulo Kuong',
       author_email='paulo.kuong@gmail.com',
       license='MIT',
-      packages=find_packages(exclude=["tests"]),
+      packages=find_packages(
+          exclude=["tests", "tests.*", "benchmarks", "benchmarks.*"]),
       include_package_data=True,
       zip_safe=False,
       long_description=long_description)
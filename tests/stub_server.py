@@ -0,0 +1,114 @@
+"""Local HTTP stub server emulating the remote APIs used by the SDK."""
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit
+import json
+import random
+import threading
+import time
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubServer(object):
+    """Serve canned JSON responses keyed by request path.
+
+    A route value is either a dict/list (served with status 200), a
+    (status, body) tuple, or a callable taking the handler and returning
+    one of those.
+
+    latency (seconds) delays every response and error_rate is the fraction
+    of requests answered with a 503, to emulate a slow or flaky service.
+    """
+
+    def __init__(self, routes=None, latency=0.0, error_rate=0.0, seed=None):
+        self.routes = dict(routes or {})
+        self.requests = []
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._server = _ThreadingHTTPServer(
+            ('127.0.0.1', 0), self._handler_class())
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={'poll_interval': 0.01})
+        self._thread.daemon = True
+
+    @property
+    def host(self):
+        return '127.0.0.1:{}'.format(self._server.server_address[1])
+
+    def url(self, path):
+        return 'http://{}{}'.format(self.host, path)
+
+    def point(self, client):
+        """Point an SDK client at this server."""
+        client.SCHEME = 'http'
+        for name in ('DEFAULT_END_POINT', 'OSM_ENDPOINT'):
+            if hasattr(client, name):
+                setattr(client, name, self.host)
+        if getattr(client, '_osm', None) is not None:
+            self.point(client._osm)
+        return client
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, without this the
+            # client's delayed ACK stalls every keep-alive response.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                path = '/' + url.path.lstrip('/')
+                self.stub_path = path
+                self.stub_query = url.query
+                stub.requests.append(
+                    path + ('?' + url.query if url.query else ''))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                route = stub.routes.get(path)
+                if (stub.error_rate and
+                        stub._random.random() < stub.error_rate):
+                    route = (503, {'status': 503,
+                                   'detail': 'Service Unavailable'})
+                if callable(route):
+                    route = route(self)
+                if route is None:
+                    route = (404, {'status': 404, 'detail': 'Not Found'})
+                if not isinstance(route, tuple):
+                    route = (200, route)
+                status, body = route[0], route[1]
+                headers = route[2] if len(route) > 2 else {}
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/geo+json')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
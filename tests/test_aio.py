@@ -0,0 +1,90 @@
+from noaa_sdk.aio import AsyncNCDC, AsyncNOAA
+from tests.stub_server import StubServer
+import asyncio
+import threading
+import time
+
+
+def test_async_points_against_stub_server():
+    routes = {'/points/40.7314,-73.8656': {'properties': {'gridId': 'OKX'}}}
+    with StubServer(routes) as server:
+        async def run():
+            async with AsyncNOAA(user_agent='test_agent') as n:
+                server.point(n.client)
+                return await n.points('40.7314,-73.8656')
+
+        res = asyncio.run(run())
+    assert res == {'properties': {'gridId': 'OKX'}}
+
+
+def test_async_points_forecast_follows_forecast_url():
+    with StubServer() as server:
+        server.routes['/points/1.0,2.0'] = {
+            'properties': {
+                'forecast': server.url('/gridpoints/OKX/1,2/forecast')}}
+        server.routes['/gridpoints/OKX/1,2/forecast'] = {
+            'properties': {'periods': [{'number': 1}]}}
+
+        async def run():
+            async with AsyncNOAA(user_agent='test_agent') as n:
+                server.point(n.client)
+                return await n.points_forecast(1.0, 2.0, type='forecast')
+
+        res = asyncio.run(run())
+    assert res == {'properties': {'periods': [{'number': 1}]}}
+
+
+def test_async_concurrency_limit():
+    lock = threading.Lock()
+    state = {'active': 0, 'peak': 0}
+
+    def slow_zone(handler):
+        with lock:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+        time.sleep(0.05)
+        with lock:
+            state['active'] -= 1
+        return {'id': handler.stub_path}
+
+    zones = ['Z{:03d}'.format(i) for i in range(12)]
+    routes = {'/zones/forecast/{}'.format(z): slow_zone for z in zones}
+    with StubServer(routes) as server:
+        async def run():
+            async with AsyncNOAA(
+                    user_agent='test_agent', max_concurrency=3) as n:
+                server.point(n.client)
+                return await asyncio.gather(
+                    *[n.zones('forecast', z) for z in zones])
+
+        res = asyncio.run(run())
+    assert [r['id'] for r in res] == [
+        '/zones/forecast/{}'.format(z) for z in zones]
+    assert state['peak'] <= 3
+
+
+def test_async_ncdc_datasets():
+    routes = {'/cdo-web/api/v2/datasets': {'results': [{'id': 'GHCND'}]}}
+    with StubServer(routes) as server:
+        async def run():
+            async with AsyncNCDC('token') as n:
+                server.point(n.client)
+                return await n.datasets(limit=1)
+
+        res = asyncio.run(run())
+    assert res == {'results': [{'id': 'GHCND'}]}
+    assert server.requests == ['/cdo-web/api/v2/datasets?limit=1']
+
+
+def test_async_exit_closes_off_the_event_loop():
+    threads = []
+
+    async def run():
+        async with AsyncNOAA(user_agent='test_agent') as n:
+            close = n.close
+            n.close = lambda: (threads.append(threading.current_thread()),
+                               close())
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 1 and threads[0] is not loop_thread
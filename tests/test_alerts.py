@@ -0,0 +1,174 @@
+from noaa_sdk import noaa
+from noaa_sdk.alerts import AlertIndex, AlertWatcher, _timestamp
+from tests.stub_server import StubServer
+import random
+import pytest
+
+
+NOW = _timestamp('2024-01-01T12:00:00-05:00')
+
+
+def _alert(alert_id, sent='2024-01-01T11:00:00-05:00',
+           expires='2024-01-01T18:00:00-05:00'):
+    return {'id': 'https://api.weather.gov/alerts/' + alert_id,
+            'properties': {'id': alert_id, 'sent': sent,
+                           'expires': expires}}
+
+
+class Feed(object):
+    """/alerts/active route answering 304 while the alerts are unchanged."""
+
+    def __init__(self, features):
+        self.features = features
+        self.version = 1
+
+    def __call__(self, handler):
+        etag = '"v{}"'.format(self.version)
+        if handler.headers.get('If-None-Match') == etag:
+            return (304, b'', {'ETag': etag})
+        return (200, {'features': self.features}, {'ETag': etag})
+
+    def update(self, features):
+        self.features = features
+        self.version += 1
+
+
+def _changes(events):
+    return [(event.type, event.id) for event in events]
+
+
+def test_poll_reports_changes_only():
+    feed = Feed([_alert('a'), _alert('b')])
+    with StubServer({'/alerts/active': feed}) as server:
+        n = server.point(noaa.NOAA(user_agent='test_agent'))
+        watcher = AlertWatcher(n)
+        assert _changes(watcher.poll(now=NOW)) == [
+            ('added', 'a'), ('added', 'b')]
+        assert watcher.poll(now=NOW) == []
+
+        feed.update([_alert('b', sent='2024-01-01T11:30:00-05:00'),
+                     _alert('c')])
+        assert _changes(watcher.poll(now=NOW)) == [
+            ('updated', 'b'), ('added', 'c'), ('expired', 'a')]
+        assert sorted(watcher.alerts) == ['b', 'c']
+        assert watcher.get('b')['properties']['sent'] == (
+            '2024-01-01T11:30:00-05:00')
+    assert len(server.requests) == 3
+
+
+def test_alerts_expire_between_polls():
+    feed = Feed([_alert('a', expires='2024-01-01T13:00:00-05:00'),
+                 _alert('b'),
+                 _alert('c', expires='2024-01-01T11:00:00-05:00')])
+    with StubServer({'/alerts/active': feed}) as server:
+        n = server.point(noaa.NOAA(user_agent='test_agent'))
+        received = []
+        watcher = AlertWatcher(n, callbacks={'expired': received.append})
+        assert _changes(watcher.poll(now=NOW)) == [
+            ('added', 'a'), ('added', 'b')]
+        assert _changes(watcher.poll(now=NOW + 3600)) == [('expired', 'a')]
+        assert _changes(received) == [('expired', 'a')]
+        assert 'a' not in watcher and len(watcher) == 1
+
+
+def test_watch_zone():
+    feed = Feed([_alert('a', expires=None)])
+    routes = {'/alerts/active/zone/NYZ072': feed}
+    with StubServer(routes) as server:
+        n = server.point(noaa.NOAA(user_agent='test_agent'))
+        watcher = AlertWatcher(n, zone_id='NYZ072')
+        events = list(watcher.watch(interval=0, polls=2))
+    assert _changes(events) == [('added', 'a')]
+    assert server.requests == ['/alerts/active/zone/NYZ072'] * 2
+
+
+def test_unknown_callback_event():
+    with pytest.raises(Exception) as err:
+        AlertWatcher(noaa.NOAA(user_agent='test_agent'),
+                     callbacks={'removed': print})
+    assert 'unknown alert event' in str(err.value)
+
+
+def _square(lon, lat, size):
+    return [[lon, lat], [lon + size, lat], [lon + size, lat + size],
+            [lon, lat + size], [lon, lat]]
+
+
+def _zone_alert(alert_id, zones, geometry=None):
+    alert = _alert(alert_id)
+    alert['geometry'] = geometry
+    alert['properties']['geocode'] = {'UGC': zones}
+    return alert
+
+
+def _brute_force(index, lat, lon):
+    # Point in polygon over every alert, without the R-tree.
+    from noaa_sdk.alerts import _contains, _edges, _polygon_rings
+    return [alert_id for alert_id in index._alerts
+            if any(_contains(_edges(rings), lon, lat) for rings in
+                   _polygon_rings(index.get(alert_id).get('geometry')))]
+
+
+def test_alerts_for_zone_and_point():
+    index = AlertIndex([
+        _zone_alert('a', ['NYZ072', 'NYC081']),
+        _zone_alert('b', ['NYZ072'], {
+            'type': 'Polygon',
+            'coordinates': [_square(-74, 40.5, 0.5),
+                            _square(-73.9, 40.6, 0.1)]}),
+        _zone_alert('c', ['NJZ006'], {
+            'type': 'MultiPolygon',
+            'coordinates': [[_square(-75, 40, 1)],
+                            [_square(-74.2, 40.2, 1)]]})])
+    assert index.alerts_for_zone('nyz072') == ['a', 'b']
+    assert index.alerts_for_zone('NJZ006') == ['c']
+    assert index.alerts_for_zone('CAZ001') == []
+    assert index.alerts_for_point(40.55, -73.95) == ['b', 'c']
+    # Inside the hole of b.
+    assert index.alerts_for_point(40.65, -73.85) == ['c']
+    assert index.alerts_for_point(35.0, -90.0) == []
+
+    index.update([_zone_alert('b', ['NYZ073'])])
+    index.remove(['a'])
+    assert index.alerts_for_zone('NYZ072') == []
+    assert index.alerts_for_zone('NYZ073') == ['b']
+    assert index.alerts_for_point(40.55, -73.95) == ['c']
+
+
+def test_alerts_for_points_matches_brute_force():
+    rng = random.Random(1)
+    features = []
+    for i in range(300):
+        lon, lat = rng.uniform(-120, -70), rng.uniform(25, 48)
+        ring = [[lon + rng.uniform(-1, 1), lat + rng.uniform(-1, 1)]
+                for _ in range(6)]
+        features.append(_zone_alert('A{}'.format(i), [], {
+            'type': 'Polygon', 'coordinates': [ring + ring[:1]]}))
+    index = AlertIndex(features)
+    lats = [rng.uniform(25, 48) for _ in range(500)]
+    lons = [rng.uniform(-120, -70) for _ in range(500)]
+    expected = [_brute_force(index, lat, lon) for lat, lon in zip(lats, lons)]
+    assert any(expected)
+    assert [index.alerts_for_point(lat, lon)
+            for lat, lon in zip(lats, lons)] == expected
+    assert index.alerts_for_points(lats, lons) == expected
+
+
+def test_index_follows_watcher():
+    square = {'type': 'Polygon', 'coordinates': [_square(-74, 40.5, 0.5)]}
+    feed = Feed([_zone_alert('a', ['NYZ072'], square)])
+    with StubServer({'/alerts/active': feed}) as server:
+        n = server.point(noaa.NOAA(user_agent='test_agent'))
+        assert AlertIndex.fetch(n).alerts_for_zone('NYZ072') == ['a']
+
+        watcher = AlertWatcher(n)
+        index = AlertIndex()
+        index.attach(watcher)
+        watcher.poll(now=NOW)
+        assert index.alerts_for_points([40.7, 41.5], [-73.8, -73.8]) == [
+            ['a'], []]
+        feed.update([_zone_alert('b', ['NYZ073'])])
+        watcher.poll(now=NOW)
+    assert 'a' not in index
+    assert index.alerts_for_zone('NYZ073') == ['b']
+    assert index.alerts_for_point(40.7, -73.8) == []
@@ -0,0 +1,37 @@
+from noaa_sdk.cache import GeocodeCache, LRUCache, SQLiteCache
+from unittest.mock import patch
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+@patch('noaa_sdk.cache.time')
+def test_lru_cache_ttl(mock_time):
+    mock_time.time.return_value = 100
+    cache = LRUCache(ttl=10)
+    cache.set('a', 1)
+    mock_time.time.return_value = 109
+    assert cache.get('a') == 1
+    mock_time.time.return_value = 110
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_geocode_cache_persists_to_sqlite(tmpdir):
+    path = str(tmpdir.join('geocode.sqlite'))
+    cache = GeocodeCache(path=path)
+    cache.set('search:11365:US', (40.7, -73.8))
+
+    reopened = GeocodeCache(path=path)
+    assert reopened.get('search:11365:US') == (40.7, -73.8)
+    assert reopened.get('search:00000:US') is None
+    assert reopened.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+    assert len(SQLiteCache(path)) == 1
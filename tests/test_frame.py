@@ -0,0 +1,124 @@
+from noaa_sdk import noaa
+from unittest.mock import patch
+import math
+import pytest
+
+np = pytest.importorskip('numpy')
+from noaa_sdk.frame import ObservationFrame  # noqa: E402
+
+OBSERVATIONS = [
+    {'properties': {
+        'timestamp': '2020-01-01T00:51:00+00:00',
+        'station': 'https://api.weather.gov/stations/KJFK',
+        'textDescription': 'Cloudy',
+        'temperature': {
+            'unitCode': 'wmoUnit:degC', 'value': 5.6,
+            'qualityControl': 'V'},
+        'windGust': {
+            'unitCode': 'wmoUnit:km_h-1', 'value': None,
+            'qualityControl': 'Z'},
+        'cloudLayers': [{'amount': 'OVC'}]}},
+    {'properties': {
+        'timestamp': '2020-01-01T01:51:00+00:00',
+        'station': 'https://api.weather.gov/stations/KJFK',
+        'temperature': {
+            'unitCode': 'wmoUnit:degC', 'value': 5.0,
+            'qualityControl': 'V'}}},
+]
+
+
+def test_from_observations_builds_typed_columns():
+    frame = ObservationFrame.from_observations(OBSERVATIONS)
+    assert len(frame) == 2
+    assert frame.columns == [
+        'station', 'temperature', 'textDescription', 'timestamp',
+        'windGust']
+    assert frame['temperature'].dtype == np.float64
+    assert frame['temperature'].tolist() == [5.6, 5.0]
+    assert all(math.isnan(v) for v in frame['windGust'])
+    assert frame['textDescription'].tolist() == ['Cloudy', None]
+    assert frame['timestamp'].dtype == np.dtype('datetime64[s]')
+    assert str(frame['timestamp'][1]) == '2020-01-01T01:51:00'
+    assert frame.units == {
+        'temperature': 'wmoUnit:degC', 'windGust': 'wmoUnit:km_h-1'}
+
+
+def test_from_observations_converts_offsets_to_utc():
+    frame = ObservationFrame.from_observations(
+        [{'timestamp': '2020-01-01T00:00:00-05:00'}])
+    assert str(frame['timestamp'][0]) == '2020-01-01T05:00:00'
+
+
+def test_to_pandas():
+    pytest.importorskip('pandas')
+    df = ObservationFrame.from_observations(OBSERVATIONS).to_pandas()
+    assert list(df['temperature']) == [5.6, 5.0]
+    assert df.index.name == 'timestamp'
+    assert df.attrs['units']['temperature'] == 'wmoUnit:degC'
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_stations_observations_columnar(mock_make_get_request):
+    mock_make_get_request.return_value = {'features': OBSERVATIONS}
+    n = noaa.NOAA(user_agent='test_agent')
+    frame = n.stations_observations('KJFK', columnar=True)
+    assert frame['temperature'].tolist() == [5.6, 5.0]
+    mock_make_get_request.assert_called_with(
+        '/stations/KJFK/observations', end_point=n.DEFAULT_END_POINT)
+
+
+GRID_PROPERTIES = {
+    'gridId': 'OKX',
+    'gridX': '39',
+    'validTimes': '2020-11-24T02:00:00+00:00/PT6H',
+    'temperature': {'uom': 'wmoUnit:degC', 'values': [
+        {'validTime': '2020-11-24T02:00:00+00:00/PT1H', 'value': 5.5},
+        {'validTime': '2020-11-24T03:00:00+00:00/PT3H', 'value': 6.0},
+        {'validTime': '2020-11-24T06:00:00+00:00/P1D', 'value': 7.0},
+    ]},
+    'windSpeed': {'uom': 'wmoUnit:km_h-1', 'values': [
+        {'validTime': '2020-11-23T21:00:00-05:00/PT2H', 'value': 36},
+        {'validTime': '2020-11-24T05:00:00+00:00/PT1H', 'value': None},
+    ]},
+    'weather': {'values': [
+        {'validTime': '2020-11-24T02:00:00+00:00/PT6H',
+         'value': [{'coverage': None}]},
+    ]},
+}
+
+
+def test_parse_duration_hours():
+    from noaa_sdk.frame import parse_duration_hours
+    assert parse_duration_hours('PT3H') == 3
+    assert parse_duration_hours('P7DT5H') == 173
+    assert parse_duration_hours('P1W') == 168
+    with pytest.raises(Exception):
+        parse_duration_hours('3H')
+
+
+def test_grid_forecast_expands_intervals():
+    from noaa_sdk.frame import GridForecast
+    grid = GridForecast.from_properties(GRID_PROPERTIES)
+    assert len(grid) == 6
+    assert str(grid.times[0]) == '2020-11-24T02'
+    assert grid.layer_names == ['temperature', 'windSpeed']
+    assert grid['temperature'].tolist() == [5.5, 6.0, 6.0, 6.0, 7.0, 7.0]
+    wind = grid['windSpeed']
+    assert wind[:2].tolist() == [10.0, 10.0]
+    assert all(math.isnan(v) for v in wind[2:])
+    assert grid.units == {
+        'temperature': 'wmoUnit:degC', 'windSpeed': 'wmoUnit:m_s-1'}
+    assert grid.properties['gridId'] == 'OKX'
+    assert grid.to_array().shape == (2, 6)
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_points_grid_forecast(mock_make_get_request):
+    mock_make_get_request.side_effect = [
+        {'properties': {'forecastGridData': 'grid_uri'}},
+        {'properties': GRID_PROPERTIES},
+    ]
+    n = noaa.NOAA(user_agent='test_agent')
+    grid = n.points_grid_forecast(40.7, -73.8, convert_units=False)
+    assert grid.units['windSpeed'] == 'wmoUnit:km_h-1'
+    assert grid['windSpeed'][1] == 36
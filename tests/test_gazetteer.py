@@ -0,0 +1,106 @@
+from noaa_sdk import noaa
+from noaa_sdk.gazetteer import (
+    MAX_RINGS, Gazetteer, _KM_PER_DEGREE, _distance_km, build, main,
+    read_geonames)
+from tests.stub_server import StubServer
+import math
+import random
+import zipfile
+import pytest
+
+
+DUMP = (
+    'US\t11365\tFresh Meadows\tNew York\tNY\tQueens\t081\t\t\t'
+    '40.7391\t-73.7938\t4\n'
+    'US\t10001\tNew York\tNew York\tNY\tNew York\t061\t\t\t'
+    '40.7484\t-73.9967\t4\n'
+    'US\t10001\tNew York City\tNew York\tNY\tNew York\t061\t\t\t'
+    '40.7504\t-73.9987\t4\n'
+    'CA\tK1A\tOttawa\tOntario\tON\t\t\t\t\t45.4215\t-75.6972\t6\n'
+    'US\tbroken line\n')
+
+
+@pytest.fixture
+def gazetteer_path(tmpdir):
+    dump = tmpdir.join('US.txt')
+    dump.write(DUMP)
+    path = str(tmpdir.join('postal.gaz'))
+    assert main(['build', path, str(dump)]) == 0
+    return path
+
+
+def test_read_geonames():
+    assert list(read_geonames(DUMP.splitlines(True)))[0] == (
+        'US', '11365', 40.7391, -73.7938)
+
+
+def test_lookup(gazetteer_path):
+    with Gazetteer(gazetteer_path) as gazetteer:
+        assert len(gazetteer) == 3
+        assert gazetteer.lookup('11365', 'US') == (40.7391, -73.7938)
+        assert gazetteer.lookup('10001', 'us') == pytest.approx(
+            (40.7494, -73.9977))
+        assert gazetteer.lookup('k1a', 'CA') == (45.4215, -75.6972)
+        assert gazetteer.lookup('11365', 'CA') is None
+        assert gazetteer.lookup('99999', 'US') is None
+
+
+def test_reverse(gazetteer_path):
+    with Gazetteer(gazetteer_path) as gazetteer:
+        assert gazetteer.reverse(40.74, -73.8) == ('11365', 'us')
+        assert gazetteer.reverse(40.9, -73.99) == ('10001', 'us')
+        assert gazetteer.reverse(45.5, -75.6) == ('K1A', 'ca')
+        assert gazetteer.reverse(0, 0) is None
+
+
+def test_reverse_matches_brute_force(tmpdir):
+    rng = random.Random(1)
+    entries = [('US', '{:05d}'.format(i), rng.uniform(30, 45),
+                rng.uniform(-100, -70)) for i in range(2000)]
+    path = str(tmpdir.join('random.gaz'))
+    build(path, entries)
+    with Gazetteer(path) as gazetteer:
+        for _ in range(100):
+            lat, lon = rng.uniform(31, 44), rng.uniform(-99, -71)
+            distance, nearest = min(
+                (_distance_km(lat, lon, e[2], e[3]), e[1]) for e in entries)
+            found = gazetteer.reverse(lat, lon)
+            if found is None:
+                # Only codes farther than the searched rings are missed.
+                assert distance > MAX_RINGS * 0.1 * _KM_PER_DEGREE * math.cos(
+                    math.radians(lat + 0.6))
+            else:
+                assert found == (nearest, 'us')
+
+
+def test_build_from_zip(tmpdir):
+    archive = str(tmpdir.join('US.zip'))
+    with zipfile.ZipFile(archive, 'w') as f:
+        f.writestr('US.txt', DUMP)
+        f.writestr('readme.txt', 'readme')
+    path = str(tmpdir.join('zip.gaz'))
+    assert main(['build', path, archive]) == 0
+    with Gazetteer(path) as gazetteer:
+        assert len(gazetteer) == 3
+
+
+def test_invalid_file(tmpdir):
+    path = tmpdir.join('invalid.gaz')
+    path.write_binary(b'\x00' * 64)
+    with pytest.raises(Exception) as err:
+        Gazetteer(str(path))
+    assert 'not a gazetteer file' in str(err.value)
+
+
+def test_osm_uses_gazetteer_before_network(gazetteer_path):
+    routes = {'/search': [{'lat': '1.0', 'lon': '2.0'}]}
+    with StubServer(routes) as server:
+        osm = server.point(noaa.OSM(cache=False, gazetteer=gazetteer_path))
+        assert osm.get_lat_lon_by_postalcode_country('11365', 'US') == (
+            40.7391, -73.7938)
+        assert osm.get_postalcode_country_by_lan_lon(40.74, -73.8) == (
+            '11365', 'us')
+        assert server.requests == []
+        assert osm.get_lat_lon_by_postalcode_country('99999', 'US') == (
+            1.0, 2.0)
+    assert len(server.requests) == 1
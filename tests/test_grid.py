@@ -0,0 +1,145 @@
+from noaa_sdk import noaa
+from noaa_sdk.grid import GridResolver, project, unproject
+from tests.stub_server import StubServer
+import math
+import random
+import pytest
+
+
+# Made up origin of the OKX grid in CONUS cells.
+ORIGIN = (702.43, 689.71)
+
+
+def _gridpoint(lat, lon):
+    x, y = project(lat, lon)
+    return 'OKX', int(math.floor(x - ORIGIN[0])), int(
+        math.floor(y - ORIGIN[1]))
+
+
+def _cell_polygon(grid_x, grid_y):
+    corners = [(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)]
+    return [list(reversed(unproject(
+        ORIGIN[0] + grid_x + dx, ORIGIN[1] + grid_y + dy)))
+        for dx, dy in corners]
+
+
+def _points(rng, count, margin=0):
+    # The tiles around 40.5-41.0, -74.0--73.5 are learned with margin=0.25.
+    return [(rng.uniform(40.5 - margin, 41.0 + margin),
+             rng.uniform(-74.0 - margin, -73.5 + margin))
+            for _ in range(count)]
+
+
+def _learn(resolver, points):
+    for lat, lon in points:
+        office, grid_x, grid_y = _gridpoint(lat, lon)
+        resolver.learn_point(
+            lat, lon, {'gridId': office, 'gridX': grid_x, 'gridY': grid_y})
+
+
+def test_project_round_trip():
+    x, y = project(40.7314, -73.8656)
+    assert unproject(x, y) == pytest.approx((40.7314, -73.8656))
+    assert project(25, -95) == pytest.approx((0, 0))
+
+
+def test_learn_point_narrows_origin():
+    rng = random.Random(1)
+    resolver = GridResolver()
+    _learn(resolver, _points(rng, 400, margin=0.25))
+
+    resolved = 0
+    for lat, lon in _points(rng, 500):
+        gridpoint = resolver.resolve(lat, lon)
+        if gridpoint is not None:
+            assert gridpoint == _gridpoint(lat, lon)
+            resolved += 1
+    assert resolved > 450
+    assert resolver.resolve(35.0, -90.0) is None
+
+
+def test_learn_cell_is_exact():
+    resolver = GridResolver()
+    resolver.learn_cell('OKX', 33, 35, _cell_polygon(33, 35))
+    resolver.learn_point(40.6, -73.6, {'gridId': 'OKX', 'gridX': 1,
+                                       'gridY': 1})
+    rng = random.Random(2)
+    _learn(resolver, _points(rng, 100, margin=0.25))
+    # Points within the tolerance of a cell edge are left to /points.
+    points = [(lat, lon) for lat, lon in _points(rng, 500)
+              if resolver.resolve(lat, lon)]
+    assert len(points) > 490
+    for lat, lon in points:
+        assert resolver.resolve(lat, lon) == _gridpoint(lat, lon)
+
+
+def test_resolve_many_matches_resolve(tmpdir):
+    pytest.importorskip('numpy')
+    rng = random.Random(3)
+    resolver = GridResolver()
+    _learn(resolver, _points(rng, 100, margin=0.25))
+    resolver.learn_point(40.6, -73.6, {'gridId': 'HFO', 'gridX': 1,
+                                       'gridY': 1})
+    points = _points(rng, 300) + [(35.0, -90.0)]
+    lats, lons = zip(*points)
+    assert resolver.resolve_many(lats, lons) == [
+        resolver.resolve(lat, lon) for lat, lon in points]
+
+    path = str(tmpdir.join('grids.json'))
+    resolver.save(path)
+    assert GridResolver.load(path).resolve_many(lats, lons) == (
+        resolver.resolve_many(lats, lons))
+
+
+def test_tiles_and_extents_need_evidence():
+    lat, lon = 40.7, -73.8
+    office, grid_x, grid_y = _gridpoint(lat, lon)
+    resolver = GridResolver()
+    resolver.learn_cell(office, grid_x, grid_y, _cell_polygon(grid_x, grid_y))
+    # One cell does not vouch for its whole tile.
+    assert resolver.resolve(lat, lon) is None
+
+    # Samples from the tile and the four tiles next to it.
+    _learn(resolver, [(40.625 + d_lat, -73.875 + d_lon) for d_lat, d_lon in
+                      [(0, 0), (-0.25, 0), (0.25, 0), (0, -0.25), (0, 0.25)]])
+    assert resolver.resolve(lat, lon) == (office, grid_x, grid_y)
+
+    # Outside the gridX/gridY range seen for the office.
+    resolver._extents[office] = [grid_x + 1, grid_x + 5, grid_y, grid_y]
+    assert resolver.resolve(lat, lon) is None
+
+    resolver.learn_point(40.9, -73.85, {'gridId': 'BOX', 'gridX': 1,
+                                        'gridY': 1})
+    assert resolver.office(lat, lon) is None
+
+
+def test_forecast_uris_resolved_offline():
+    def points(handler):
+        lat, lon = map(float, handler.stub_path.split('/')[-1].split(','))
+        office, grid_x, grid_y = _gridpoint(lat, lon)
+        return {'properties': {
+            'gridId': office, 'gridX': grid_x, 'gridY': grid_y,
+            'forecast': 'https://api.weather.gov/gridpoints/{}/{},{}/'
+                        'forecast'.format(office, grid_x, grid_y)}}
+
+    rng = random.Random(4)
+    with StubServer() as server:
+        for lat, lon in _points(rng, 200, margin=0.25):
+            server.routes['/points/{},{}'.format(
+                round(lat, 4), round(lon, 4))] = points
+        n = server.point(noaa.NOAA(
+            user_agent='test_agent', grid_resolver=True))
+        for path in list(server.routes):
+            n.points_metadata(*map(float, path.split('/')[-1].split(',')))
+        requested = len(server.requests)
+
+        coordinates = [(40.73, -73.86), (35.0, -90.0)]
+        server.routes['/points/35.0,-90.0'] = {'properties': {
+            'forecast': 'https://api.weather.gov/gridpoints/MEG/1,2/'
+                        'forecast'}}
+        uris = n.resolve_forecast_uris(coordinates)
+    assert uris == [
+        'http://{}/gridpoints/{}/{},{}/forecast'.format(
+            server.host, *_gridpoint(40.73, -73.86)),
+        'https://api.weather.gov/gridpoints/MEG/1,2/forecast']
+    assert server.requests[requested:] == ['/points/35.0,-90.0']
@@ -0,0 +1,111 @@
+from noaa_sdk import noaa
+from noaa_sdk.metrics import Histogram, Metrics, endpoint_template
+from noaa_sdk.retry import RetryPolicy
+from tests.stub_server import StubServer
+import pytest
+
+
+@pytest.mark.parametrize('uri, template', [
+    ('/points/40.7,-73.8', '/points/{point}'),
+    ('gridpoints/OKX/33,35/forecast/hourly',
+     '/gridpoints/{wfo}/{x},{y}/forecast/hourly'),
+    ('/stations/KJFK/observations?start=2020-01-01T00%3A00%3A00Z',
+     '/stations/{id}/observations'),
+    ('/stations/KJFK/observations/current',
+     '/stations/{id}/observations/current'),
+    ('/stations/KJFK/observations/2017-01-04T18:54:00+00:00',
+     '/stations/{id}/observations/{recordId}'),
+    ('/alerts/active/zone/NYZ072', '/alerts/active/zone/{id}'),
+    ('/alerts/active', '/alerts/active'),
+    ('/alerts/urn:oid:2.49.0.1.840.0.1', '/alerts/{id}'),
+    ('/products/types/AFD/locations/OKX',
+     '/products/types/{type}/locations/OKX'),
+    ('cdo-web/api/v2/datasets?limit=1000', '/cdo-web/api/v2/datasets'),
+])
+def test_endpoint_template(uri, template):
+    assert endpoint_template(uri) == template
+
+
+def test_histogram_buckets():
+    histogram = Histogram(buckets=[0.1, 1])
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value)
+    assert histogram.as_dict() == {
+        'count': 4, 'sum': 2.65,
+        'buckets': [[0.1, 2], [1, 3], [float('inf'), 4]]}
+
+
+def _routes(server):
+    return {
+        '/search': [{'lat': '40.7', 'lon': '-73.8'}],
+        '/points/40.7,-73.8': {'properties': {
+            'forecastHourly': server.url(
+                '/gridpoints/OKX/33,35/forecast/hourly')}},
+        '/gridpoints/OKX/33,35/forecast/hourly': {
+            'properties': {'periods': [{'number': 1}]}},
+    }
+
+
+def test_metrics_per_endpoint_template():
+    metrics = Metrics()
+    with StubServer() as server:
+        server.routes.update(_routes(server))
+        n = server.point(noaa.NOAA(user_agent='test_agent', metrics=metrics))
+        n.get_forecasts('11365', 'US')
+        n.get_forecasts('11365', 'US')
+
+    stats = metrics.as_dict()[server.host]
+    assert sorted(stats) == [
+        '/gridpoints/{wfo}/{x},{y}/forecast/hourly', '/points/{point}',
+        '/search']
+    assert stats['/search']['responses'] == {'200': 1}
+    assert stats['/search']['cache_hits'] == {'geocode': 1}
+    assert stats['/points/{point}']['cache_hits'] == {'points': 1}
+    forecast = stats['/gridpoints/{wfo}/{x},{y}/forecast/hourly']
+    assert forecast['responses'] == {'200': 2}
+    assert forecast['latency']['count'] == 2
+    assert forecast['decode']['count'] == 2
+
+    text = metrics.to_prometheus()
+    assert '# TYPE noaa_sdk_request_duration_seconds histogram' in text
+    assert ('noaa_sdk_responses_total{{end_point="{}",endpoint='
+            '"/search",status="200"}} 1'.format(server.host)) in text
+    assert 'le="+Inf"' in text
+
+
+def test_hooks_report_retries():
+    events = []
+    calls = []
+
+    def flaky(handler):
+        calls.append(1)
+        if len(calls) == 1:
+            return (503, {'status': 503})
+        return {'id': 'OKX'}
+
+    policy = RetryPolicy(backoff_base=0, jitter=False)
+    with StubServer({'/offices/OKX': flaky}) as server:
+        n = server.point(noaa.NOAA(
+            user_agent='test_agent', retry_policy=policy,
+            hooks={'before_request': events.append,
+                   'on_retry': [events.append],
+                   'after_response': events.append}))
+        n.offices('OKX')
+        n.remove_hook('on_retry', events.append)
+        assert 'on_retry' not in n.hooks
+
+    assert [e['event'] for e in events] == [
+        'before_request', 'on_retry', 'after_response']
+    assert events[1]['attempt'] == 1
+    assert events[1]['status_code'] == 503
+    assert events[2]['uri'] == '/offices/OKX'
+    assert events[2]['status_code'] == 200
+
+
+def test_add_hook_rejects_unknown_event():
+    n = noaa.NOAA(user_agent='test_agent')
+    with pytest.raises(Exception) as err:
+        n.add_hook('on_test', print)
+    assert 'invalid event on_test' in str(err.value)
+    assert n.hooks == {}
+    assert n._osm.hooks == {}
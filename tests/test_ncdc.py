@@ -0,0 +1,48 @@
+from noaa_sdk.ncdc import NCDC
+from unittest.mock import patch
+import pytest
+
+
+def pages(total, page_size):
+    def request_end_point(end_point, **params):
+        offset = params['offset']
+        results = [
+            {'id': i} for i in range(
+                offset, min(total, offset + page_size - 1) + 1)]
+        if not results:
+            return {}
+        return {
+            'metadata': {'resultset': {
+                'offset': offset, 'count': total, 'limit': page_size}},
+            'results': results}
+    return request_end_point
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+@patch('noaa_sdk.ncdc.NCDC.request_end_point')
+def test_iter_request_end_point_walks_pages(mock_request, prefetch):
+    mock_request.side_effect = pages(25, 10)
+    n = NCDC('token')
+    results = list(n.iter_stations(
+        locationid='FIPS:37', page_size=10, prefetch=prefetch))
+    assert [r['id'] for r in results] == list(range(1, 26))
+    assert [c[1]['offset'] for c in mock_request.call_args_list] == [
+        1, 11, 21]
+    mock_request.assert_any_call(
+        'stations', locationid='FIPS:37', limit=10, offset=11)
+
+
+@patch('noaa_sdk.ncdc.NCDC.request_end_point')
+def test_iter_request_end_point_empty(mock_request):
+    mock_request.return_value = {}
+    n = NCDC('token')
+    assert list(n.iter_data('GHCND', '2010-01-01', '2010-01-31')) == []
+    mock_request.assert_called_once_with(
+        'data', datasetid='GHCND', startdate='2010-01-01',
+        enddate='2010-01-31', limit=1000, offset=1)
+
+
+def test_iter_request_end_point_unknown():
+    with pytest.raises(Exception) as err:
+        NCDC('token').iter_request_end_point('unknown')
+    assert str(err.value).startswith('Error: unknown end point unknown.')
@@ -1,7 +1,11 @@
 from __future__ import absolute_import
 from __future__ import print_function
+from datetime import datetime
 from unittest.mock import patch
 from noaa_sdk import noaa
+from noaa_sdk.retry import RetryPolicy
+from tests.stub_server import StubServer
+import itertools
 import pytest
 
 try:
@@ -60,9 +64,9 @@ def test_get_request_header():
 def test_make_get_request(mock_requests):
     mock_response_obj = MagicMock()
     mock_response_obj.text = 'mock text'
-    mock_response_obj.json = lambda: {"test":"test"}
+    mock_response_obj.content = b'{"test": "test"}'
     mock_response_obj.status_code = 200
-    mock_requests.get.return_value = mock_response_obj
+    mock_requests.Session.return_value.get.return_value = mock_response_obj
 
     n = noaa.NOAA(user_agent='test_agent')
     res = n.make_get_request(
@@ -70,13 +74,36 @@ def test_make_get_request(mock_requests):
     assert res == {"test": "test"}
 
 
+@patch('noaa_sdk.util.requests')
+def test_make_get_request_reuses_session(mock_requests):
+    mock_response_obj = MagicMock()
+    mock_response_obj.content = b'{"test": "test"}'
+    mock_response_obj.status_code = 200
+    mock_session = mock_requests.Session.return_value
+    mock_session.get.return_value = mock_response_obj
+
+    n = noaa.NOAA(user_agent='test_agent', pool_maxsize=4)
+    n.make_get_request('/points/1,2', end_point=n.DEFAULT_END_POINT)
+    n.make_get_request('/points/3,4', end_point=n.DEFAULT_END_POINT)
+    assert mock_requests.Session.call_count == 1
+    assert mock_session.get.call_count == 2
+
+
+@patch('noaa_sdk.util.requests')
+def test_close_with_context_manager(mock_requests):
+    with noaa.NOAA(user_agent='test_agent') as n:
+        session = n.session
+    session.close.assert_called_once_with()
+    assert n._session is None
+
+
 @patch('noaa_sdk.util.requests')
 def test_make_get_request_failed(mock_requests):
     mock_response_obj = MagicMock()
     mock_response_obj.text = 'mock text'
     mock_response_obj.status_code = 500
     mock_response_obj.json = lambda: {"test":"test"}
-    mock_requests.get.return_value = mock_response_obj
+    mock_requests.Session.return_value.get.return_value = mock_response_obj
 
     with pytest.raises(Exception) as err:
         n = noaa.NOAA(user_agent='test_agent')
@@ -388,3 +415,514 @@ def test_osm_get_postalcode_country_by_lan_lon_failed(mock_make_get_request):
             '/reverse?lat=23.22&lon=33.33&addressdetails=1&format=json',
             end_point=n.OSM_ENDPOINT)
         assert err == 'No response from: {}'.format(n.OSM_ENDPOINT)
+
+
+@patch('noaa_sdk.noaa.OSM.get_lat_lon_by_postalcode_country')
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_get_forecasts_many(mock_make_get_request, mock_geocode):
+    coordinates = {'11365': (1.0, 2.0), '11366': (1.0, 2.0), '99999': None}
+
+    def geocode(postal_code, country):
+        if coordinates[postal_code] is None:
+            raise Exception('Postalcode does not exist.')
+        return coordinates[postal_code]
+
+    def get(uri, end_point=None):
+        if uri.startswith('/points/'):
+            return {'properties': {'forecastHourly': 'grid_uri'}}
+        return {'properties': {'periods': [{'number': 1}]}}
+
+    mock_geocode.side_effect = geocode
+    mock_make_get_request.side_effect = get
+    n = noaa.NOAA(user_agent='test_agent')
+    results = {
+        r.location[0]: r for r in n.get_forecasts_many(
+            [('11365', 'US'), ('11366', 'US'), ('99999', 'US')],
+            max_workers=2)}
+
+    assert results['11365'].forecasts == [{'number': 1}]
+    assert results['11366'].forecasts == [{'number': 1}]
+    assert results['11365'].error is None
+    assert results['99999'].forecasts is None
+    assert str(results['99999'].error) == 'Postalcode does not exist.'
+    forecast_calls = [
+        c for c in mock_make_get_request.call_args_list
+        if c[1].get('uri') == 'grid_uri']
+    assert len(forecast_calls) == 1
+
+
+@patch('noaa_sdk.noaa.OSM.get_lat_lon_by_postalcode_country')
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_get_forecasts_many_streams(mock_make_get_request, mock_geocode):
+    read = []
+
+    def locations():
+        for i in itertools.count():
+            read.append(i)
+            yield ('{:05d}'.format(i), 'US')
+
+    mock_geocode.return_value = (1.0, 2.0)
+    mock_make_get_request.side_effect = lambda uri, end_point=None: (
+        {'properties': {'forecastHourly': 'grid_uri'}}
+        if uri.startswith('/points/') else
+        {'properties': {'periods': [{'number': 1}]}})
+    n = noaa.NOAA(user_agent='test_agent', points_cache=False)
+    results = n.get_forecasts_many(locations(), max_workers=4)
+    first = next(results)
+    assert first.forecasts == [{'number': 1}]
+    # Locations are read as slots free up, not all up front.
+    assert len(read) < 100
+    results.close()
+
+
+@patch('noaa_sdk.noaa.OSM.get_lat_lon_by_postalcode_country')
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_get_forecasts_many_retries_failed_forecasts(
+        mock_make_get_request, mock_geocode):
+    failures = [Exception('Error: 503 Service Unavailable')]
+
+    def get(uri, end_point=None):
+        if uri.startswith('/points/'):
+            return {'properties': {'forecastHourly': 'grid_uri'}}
+        if failures:
+            raise failures.pop()
+        return {'properties': {'periods': [{'number': 1}]}}
+
+    mock_geocode.return_value = (1.0, 2.0)
+    mock_make_get_request.side_effect = get
+    n = noaa.NOAA(user_agent='test_agent')
+    results = list(n.get_forecasts_many(
+        [('11365', 'US'), ('11366', 'US')], max_workers=1))
+
+    assert str(results[0].error) == 'Error: 503 Service Unavailable'
+    assert results[1].forecasts == [{'number': 1}]
+
+
+@patch('noaa_sdk.noaa.OSM.make_get_request')
+def test_osm_get_lat_lon_by_postalcode_country_cached(mock_make_get_request):
+    mock_make_get_request.return_value = [{'lat': 56.34, 'lon': 12.78}]
+    n = noaa.OSM()
+    assert n.get_lat_lon_by_postalcode_country('11365', 'US') == (
+        56.34, 12.78)
+    assert n.get_lat_lon_by_postalcode_country('11365', 'us') == (
+        56.34, 12.78)
+    assert mock_make_get_request.call_count == 1
+    assert n.cache.hits == 1
+    assert n.cache.misses == 1
+
+
+@patch('noaa_sdk.noaa.OSM.make_get_request')
+def test_osm_get_postalcode_country_by_lan_lon_cached(mock_make_get_request):
+    mock_make_get_request.return_value = {
+        'address': {
+            'postcode': '11375', 'country_code': 'US'}
+    }
+    n = noaa.OSM()
+    n.get_postalcode_country_by_lan_lon(23.22, 33.33)
+    assert n.get_postalcode_country_by_lan_lon(23.22, 33.33) == (
+        '11375', 'US')
+    assert mock_make_get_request.call_count == 1
+
+
+@patch('noaa_sdk.noaa.OSM.make_get_request')
+def test_osm_cache_disabled(mock_make_get_request):
+    mock_make_get_request.return_value = [{'lat': 56.34, 'lon': 12.78}]
+    n = noaa.OSM(cache=False)
+    n.get_lat_lon_by_postalcode_country('11365', 'US')
+    n.get_lat_lon_by_postalcode_country('11365', 'US')
+    assert n.cache is None
+    assert mock_make_get_request.call_count == 2
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_points_forecast_uses_points_cache(mock_make_get_request):
+    mock_make_get_request.return_value = {
+        'properties': {
+            'forecast': 'forecast_uri',
+            'forecastHourly': 'forecast_hourly_uri'
+        }
+    }
+    n = noaa.NOAA(user_agent='test_agent')
+    n.points_forecast(23.44001, 34.55, hourly=False)
+    n.points_forecast(23.44, 34.55, hourly=True)
+    points_calls = [
+        c for c in mock_make_get_request.call_args_list
+        if c[0] and c[0][0].startswith('/points/')]
+    assert len(points_calls) == 1
+    mock_make_get_request.assert_any_call(
+        '/points/23.44,34.55', end_point=n.DEFAULT_END_POINT)
+    mock_make_get_request.assert_any_call(
+        uri='forecast_hourly_uri', end_point=n.DEFAULT_END_POINT)
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_points_metadata_does_not_cache_errors(mock_make_get_request):
+    mock_make_get_request.return_value = {'status': 500}
+    n = noaa.NOAA(user_agent='test_agent')
+    n.points_metadata(23.44, 34.55)
+    n.points_metadata(23.44, 34.55)
+    assert mock_make_get_request.call_count == 2
+    assert len(n.points_cache) == 0
+
+
+def test_make_get_request_revalidates_with_etag():
+    def alerts(handler):
+        if handler.headers.get('If-None-Match') == '"v1"':
+            return (304, b'', {'ETag': '"v1"'})
+        return (200, {'features': [1, 2]}, {'ETag': '"v1"'})
+
+    with StubServer({'/alerts/active': alerts}) as server:
+        n = server.point(
+            noaa.NOAA(user_agent='test_agent', response_cache=True))
+        first = n.active_alerts()
+        first['features'].append(3)
+        second = n.active_alerts()
+    assert second == {'features': [1, 2]}
+    assert len(server.requests) == 2
+
+
+def test_make_conditional_get_request():
+    def office(handler):
+        if handler.headers.get('If-None-Match') == '"v1"':
+            return (304, b'', {'ETag': '"v1"'})
+        return (200, {'id': 'OKX'}, {'ETag': '"v1"'})
+
+    with StubServer({'/offices/OKX': office}) as server:
+        n = server.point(noaa.NOAA(user_agent='test_agent'))
+        first = n.make_conditional_get_request(
+            '/offices/OKX', end_point=n.DEFAULT_END_POINT)
+        second = n.make_conditional_get_request(
+            '/offices/OKX', validators=first.validators(),
+            end_point=n.DEFAULT_END_POINT)
+    assert first.modified and first.body == {'id': 'OKX'}
+    assert first.validators() == {'If-None-Match': '"v1"'}
+    assert not second.modified and second.body is None
+
+
+def test_make_get_request_honors_max_age():
+    routes = {'/offices/OKX': (
+        200, {'id': 'OKX'}, {'Cache-Control': 'public, max-age=60'})}
+    with StubServer(routes) as server:
+        n = server.point(
+            noaa.NOAA(user_agent='test_agent', response_cache=True))
+        n.offices('OKX')
+        assert n.offices('OKX') == {'id': 'OKX'}
+    assert len(server.requests) == 1
+
+
+def test_make_get_request_ignores_s_maxage():
+    routes = {'/offices/OKX': (
+        200, {'id': 'OKX'}, {'Cache-Control': 's-maxage=60'})}
+    with StubServer(routes) as server:
+        n = server.point(
+            noaa.NOAA(user_agent='test_agent', response_cache=True))
+        n.offices('OKX')
+        n.offices('OKX')
+    assert len(server.requests) == 2
+
+
+def test_make_get_request_retries_server_errors():
+    calls = []
+
+    def flaky(handler):
+        calls.append(1)
+        if len(calls) == 1:
+            return (503, {'status': 503}, {'Retry-After': '0'})
+        return {'id': 'OKX'}
+
+    with StubServer({'/offices/OKX': flaky}) as server:
+        n = server.point(noaa.NOAA(user_agent='test_agent'))
+        assert n.offices('OKX') == {'id': 'OKX'}
+    assert len(calls) == 2
+
+
+def test_make_get_request_does_not_retry_client_errors():
+    with StubServer() as server:
+        n = server.point(noaa.NOAA(user_agent='test_agent'))
+        with pytest.raises(Exception) as err:
+            n.offices('UNKNOWN')
+    assert str(err.value) == 'Error: 404 Not Found'
+    assert len(server.requests) == 1
+
+
+def _waiting_futures():
+    # Future counting the callers which joined a call in flight.
+    import threading
+    from concurrent.futures import Future
+
+    class WaitingFuture(Future):
+        waiting = threading.Semaphore(0)
+
+        def result(self, timeout=None):
+            WaitingFuture.waiting.release()
+            return super(WaitingFuture, self).result(timeout)
+
+    return WaitingFuture
+
+
+def test_make_get_request_coalesces_concurrent_calls():
+    import threading
+
+    requested = threading.Event()
+    released = threading.Event()
+
+    def office(handler):
+        requested.set()
+        released.wait(5)
+        return {'id': 'OKX'}
+
+    future_class = _waiting_futures()
+    with StubServer({'/offices/OKX': office}) as server, patch(
+            'noaa_sdk.util.Future', future_class):
+        n = server.point(noaa.NOAA(
+            user_agent='test_agent', coalesce_requests=True))
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(n.offices('OKX')))
+            for _ in range(5)]
+        threads[0].start()
+        assert requested.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads[1:]:
+            assert future_class.waiting.acquire(timeout=5)
+        released.set()
+        for thread in threads:
+            thread.join()
+    assert results == [{'id': 'OKX'}] * 5
+    assert len(server.requests) == 1
+    assert len(n._single_flight) == 0
+
+
+def test_single_flight_shares_exceptions():
+    import threading
+    from noaa_sdk.util import SingleFlight
+
+    flight = SingleFlight()
+    started = threading.Event()
+    released = threading.Event()
+    calls = []
+    errors = []
+
+    def fail():
+        calls.append(1)
+        started.set()
+        released.wait(5)
+        raise Exception('Error: test')
+
+    def call():
+        try:
+            flight.do('key', fail)
+        except Exception as err:
+            errors.append(err)
+
+    future_class = _waiting_futures()
+    with patch('noaa_sdk.util.Future', future_class):
+        leader = threading.Thread(target=call)
+        leader.start()
+        assert started.wait(5)
+        follower = threading.Thread(target=call)
+        follower.start()
+        assert future_class.waiting.acquire(timeout=5)
+        released.set()
+        leader.join()
+        follower.join()
+    assert len(calls) == 1
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert str(errors[0]) == 'Error: test'
+    assert flight.do('key', lambda: 1) == (1, False)
+
+
+def test_make_get_request_gives_up_on_persistent_errors():
+    policy = RetryPolicy(max_attempts=3, backoff_base=0, jitter=False)
+    with StubServer({'/offices/OKX': {'id': 'OKX'}},
+                    error_rate=1.0) as server:
+        n = server.point(
+            noaa.NOAA(user_agent='test_agent', retry_policy=policy))
+        with pytest.raises(Exception) as err:
+            n.offices('OKX')
+    assert str(err.value).startswith('Maximum retries exceeded')
+    assert len(server.requests) == 3
+
+
+def test_make_get_request_retries_timeouts():
+    policy = RetryPolicy(max_attempts=2, backoff_base=0, jitter=False,
+                         timeout=(1.0, 0.05))
+    with StubServer({'/offices/OKX': {'id': 'OKX'}}, latency=0.5) as server:
+        n = server.point(
+            noaa.NOAA(user_agent='test_agent', retry_policy=policy))
+        with pytest.raises(Exception) as err:
+            n.offices('OKX')
+    assert str(err.value).startswith('Maximum retries exceeded')
+    assert len(server.requests) == 2
+
+
+def test_make_get_request_acquires_rate_limiter():
+    limiter = MagicMock()
+    with StubServer({'/offices/OKX': {'id': 'OKX'}}) as server:
+        n = server.point(
+            noaa.NOAA(user_agent='test_agent', rate_limiter=limiter))
+        n.offices('OKX')
+    limiter.acquire.assert_called_once_with(server.host)
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_iter_stations_observations_follows_pagination(mock_make_get_request):
+    first_uri = (
+        '/stations/KJFK/observations?start=2020-01-01T00%3A00%3A00Z')
+    pages = {
+        first_uri: {
+            'features': [{'properties': {'id': 1}}],
+            'pagination': {'next': 'page2'}},
+        'page2': {
+            'features': [{'properties': {'id': 2}}],
+            'pagination': {'next': 'page3'}},
+        'page3': {'features': [], 'pagination': {'next': 'page4'}},
+    }
+    mock_make_get_request.side_effect = lambda uri, end_point: pages[uri]
+    n = noaa.NOAA(user_agent='test_agent')
+    observations = n.iter_stations_observations('KJFK', start='2020-01-01')
+    assert [o['properties']['id'] for o in observations] == [1, 2]
+    assert mock_make_get_request.call_count == 3
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_iter_alerts_follows_pagination(mock_make_get_request):
+    pages = {
+        '/alerts?area=NY': {
+            'features': [{'id': 'a'}], 'pagination': {'next': 'page2'}},
+        'page2': {'features': [{'id': 'b'}]},
+    }
+    mock_make_get_request.side_effect = lambda uri, end_point: pages[uri]
+    n = noaa.NOAA(user_agent='test_agent')
+    alerts = n.iter_alerts(area='NY', prefetch=False)
+    assert [a['id'] for a in alerts] == ['a', 'b']
+
+
+@patch('noaa_sdk.noaa.NOAA.iter_stations_observations')
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_get_observations_by_lat_lon_paginates_ranges(
+        mock_make_get_request, mock_iter_stations_observations):
+    mock_make_get_request.side_effect = [
+        {'properties': {'observationStations': 'stations_uri'}},
+        {'observationStations': ['https://api.weather.gov/stations/KJFK']},
+    ]
+    mock_iter_stations_observations.return_value = iter(
+        [{'properties': {'id': 1}}, {'properties': {'id': 2}}])
+    n = noaa.NOAA(user_agent='test_agent')
+    observations = list(n.get_observations_by_lat_lon(
+        40.7, -73.8, start='2020-01-01', end='2020-03-01'))
+    assert observations == [{'id': 1}, {'id': 2}]
+    mock_iter_stations_observations.assert_called_once_with(
+        station_id='KJFK', start='2020-01-01', end='2020-03-01')
+
+
+def _mock_nearest_stations(mock_make_get_request, station_ids):
+    mock_make_get_request.side_effect = [
+        {'properties': {'observationStations': 'stations_uri'}},
+        {'observationStations': [
+            'https://api.weather.gov/stations/{}'.format(s)
+            for s in station_ids]},
+    ]
+
+
+@patch('noaa_sdk.noaa.NOAA.stations_observations')
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_get_observations_by_lat_lon_parallel_ordered(
+        mock_make_get_request, mock_stations_observations):
+    _mock_nearest_stations(
+        mock_make_get_request, ['KJFK', 'KLGA', 'KEWR', 'KTEB'])
+    mock_stations_observations.side_effect = lambda station_id: {
+        'features': [{'properties': {'station': station_id}}]}
+    n = noaa.NOAA(user_agent='test_agent')
+    observations = n.get_observations_by_lat_lon(
+        40.7, -73.8, num_of_stations=3, max_workers=3)
+    assert [o['station'] for o in observations] == ['KJFK', 'KLGA', 'KEWR']
+    assert mock_stations_observations.call_count == 3
+
+
+@patch('noaa_sdk.noaa.NOAA.stations_observations')
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_get_observations_by_lat_lon_parallel_as_completed(
+        mock_make_get_request, mock_stations_observations):
+    import threading
+    _mock_nearest_stations(mock_make_get_request, ['KJFK', 'KLGA', 'KEWR'])
+    nearest_released = threading.Event()
+
+    def stations_observations(station_id):
+        if station_id == 'KJFK':
+            nearest_released.wait(5)
+        return {'features': [{'properties': {'station': station_id}}]}
+
+    mock_stations_observations.side_effect = stations_observations
+    n = noaa.NOAA(user_agent='test_agent')
+    observations = n.get_observations_by_lat_lon(
+        40.7, -73.8, num_of_stations=-1, max_workers=3, ordered=False)
+    first = {next(observations)['station'], next(observations)['station']}
+    nearest_released.set()
+    assert first == {'KLGA', 'KEWR'}
+    assert [o['station'] for o in observations] == ['KJFK']
+
+
+@pytest.mark.parametrize('value,expected', [
+    ('2017-01-04', datetime(2017, 1, 4)),
+    ('2017-01-04 18:54:00', datetime(2017, 1, 4, 18, 54)),
+    ('2017-01-04T18:54:00Z', datetime(2017, 1, 4, 18, 54)),
+    ('2017-1-4', datetime(2017, 1, 4)),
+])
+def test_parse_param_timestamp(value, expected):
+    n = noaa.NOAA(user_agent='test_agent')
+    assert n.parse_param_timestamp(value) == expected
+
+
+@pytest.mark.parametrize('value', [
+    '2017-01-04T18:54:00', '2017-02-30', '2017-W01-1', 'tomorrow', None])
+def test_parse_param_timestamp_invalid(value):
+    n = noaa.NOAA(user_agent='test_agent')
+    with pytest.raises(Exception) as err:
+        n.parse_param_timestamp(value)
+    assert str(err.value).startswith('Error: start and end must have format')
+
+
+def test_parse_response_timestamps():
+    n = noaa.NOAA(user_agent='test_agent')
+    values = ['2017-01-04T18:54:00+00:00', '2017-01-04T18:54:00+00:00',
+              '2017-01-04T19:54:00+00:00']
+    assert n.parse_response_timestamps(values) == [
+        datetime(2017, 1, 4, 18, 54), datetime(2017, 1, 4, 18, 54),
+        datetime(2017, 1, 4, 19, 54)]
+    assert n.parse_response_timestamp(values[0]) == datetime(
+        2017, 1, 4, 18, 54)
+    with pytest.raises(ValueError):
+        n.parse_response_timestamp('2017-01-04T18:54:00-05:00')
+
+
+@pytest.mark.parametrize('decoder', ['auto', 'json', 'orjson', 'ujson'])
+def test_decode_json(decoder):
+    if decoder not in ('auto', 'json'):
+        pytest.importorskip(decoder)
+    response = MagicMock()
+    response.content = '{"name": "Flushing", "temperature": 5.5}'.encode(
+        'utf-8')
+    n = noaa.NOAA(user_agent='test_agent', json_decoder=decoder)
+    assert n.decode_json(response) == {
+        'name': 'Flushing', 'temperature': 5.5}
+
+
+def test_decode_json_unknown_decoder():
+    with pytest.raises(Exception) as err:
+        noaa.NOAA(user_agent='test_agent', json_decoder='simdjson')
+    assert str(err.value).startswith(
+        'Error: JSON decoder simdjson is not available.')
+
+
+def test_iter_alerts_stream():
+    with StubServer() as server:
+        server.routes['/alerts'] = lambda handler: {
+            'features': [{'id': 'a'}, {'id': 'b'}],
+            'pagination': {'next': server.url('/alerts/page2')}}
+        server.routes['/alerts/page2'] = {'features': [{'id': 'c'}]}
+        n = server.point(noaa.NOAA(user_agent='test_agent'))
+        alerts = [a['id'] for a in n.iter_alerts(stream=True, area='NY')]
+    assert alerts == ['a', 'b', 'c']
+    assert server.requests == ['/alerts?area=NY', '/alerts/page2']
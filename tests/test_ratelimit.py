@@ -0,0 +1,42 @@
+from noaa_sdk.ratelimit import FileTokenBucket, RateLimiter, TokenBucket
+from unittest.mock import patch
+
+
+@patch('noaa_sdk.ratelimit.time')
+def test_token_bucket_spaces_requests(mock_time):
+    mock_time.time.return_value = 100.0
+    bucket = TokenBucket(rate=2)
+    waits = [bucket.acquire() for _ in range(4)]
+    assert waits == [0.0, 0.5, 1.0, 1.5]
+
+
+@patch('noaa_sdk.ratelimit.time')
+def test_token_bucket_refills(mock_time):
+    mock_time.time.return_value = 100.0
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 1.0
+    mock_time.time.return_value = 110.0
+    assert bucket.acquire() == 0
+
+
+@patch('noaa_sdk.ratelimit.time')
+def test_file_token_bucket_shares_state(mock_time, tmpdir):
+    mock_time.time.return_value = 100.0
+    path = str(tmpdir.join('nominatim.bucket'))
+    first = FileTokenBucket(path, rate=1)
+    second = FileTokenBucket(path, rate=1)
+    assert first.acquire() == 0
+    assert second.acquire() == 1.0
+
+
+@patch('noaa_sdk.ratelimit.time')
+def test_rate_limiter_per_host(mock_time):
+    mock_time.time.return_value = 100.0
+    limiter = RateLimiter.default()
+    assert len(limiter.buckets('www.ncdc.noaa.gov')) == 2
+    assert limiter.acquire('nominatim.openstreetmap.org') == 0
+    assert limiter.acquire('nominatim.openstreetmap.org') == 1.0
+    assert limiter.acquire('api.weather.gov') == 0
+    assert limiter.acquire('unknown.host') == 0
@@ -0,0 +1,87 @@
+from collections import namedtuple
+from noaa_sdk.retry import RetryPolicy
+from unittest.mock import patch
+import pytest
+
+Response = namedtuple('Response', ['status_code', 'headers'])
+
+
+def responses(*status_codes, **headers):
+    items = iter([Response(code, headers) for code in status_codes])
+    return lambda: next(items)
+
+
+def test_backoff_is_exponential_and_capped():
+    policy = RetryPolicy(backoff_base=1, backoff_cap=5, jitter=False)
+    assert [policy.backoff(i) for i in range(1, 6)] == [1, 2, 4, 5, 5]
+
+
+def test_backoff_jitter_stays_within_bounds():
+    policy = RetryPolicy(backoff_base=1, backoff_cap=5)
+    assert all(0 <= policy.backoff(3) <= 4 for _ in range(100))
+
+
+def test_retry_after_seconds_and_date():
+    policy = RetryPolicy()
+    assert policy.retry_after(Response(503, {'Retry-After': '7'})) == 7
+    assert policy.retry_after(Response(
+        503, {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})) == 0
+    assert policy.retry_after(Response(503, {})) is None
+
+
+@patch('noaa_sdk.retry.time.sleep')
+def test_call_succeeds_without_sleeping(mock_sleep):
+    policy = RetryPolicy()
+    assert policy.call(responses(200)).status_code == 200
+    mock_sleep.assert_not_called()
+
+
+@patch('noaa_sdk.retry.time.sleep')
+def test_call_honors_retry_after(mock_sleep):
+    policy = RetryPolicy()
+    response = policy.call(responses(503, 200, **{'Retry-After': '3'}))
+    assert response.status_code == 200
+    mock_sleep.assert_called_once_with(3.0)
+
+
+@patch('noaa_sdk.retry.time.sleep')
+def test_call_caps_retry_after(mock_sleep):
+    policy = RetryPolicy(backoff_cap=10)
+    response = policy.call(
+        responses(503, 503, 200, **{'Retry-After': '3600'}))
+    assert response.status_code == 200
+    assert [c[0][0] for c in mock_sleep.call_args_list] == [10, 10]
+
+
+@patch('noaa_sdk.retry.time.sleep')
+def test_call_does_not_retry_client_errors(mock_sleep):
+    policy = RetryPolicy()
+    assert policy.call(responses(404, 200)).status_code == 404
+    mock_sleep.assert_not_called()
+
+
+@patch('noaa_sdk.retry.time.sleep')
+def test_call_gives_up_after_max_attempts(mock_sleep):
+    policy = RetryPolicy(max_attempts=3, jitter=False)
+    with pytest.raises(Exception) as err:
+        policy.call(responses(500, 502, 503, 200))
+    assert str(err.value).startswith('Maximum retries exceeded.')
+    assert [c[0][0] for c in mock_sleep.call_args_list] == [0.5, 1.0]
+
+
+@patch('noaa_sdk.retry.time.sleep')
+def test_call_gives_up_at_deadline(mock_sleep):
+    policy = RetryPolicy(deadline=1)
+    with pytest.raises(Exception):
+        policy.call(responses(503, 200, **{'Retry-After': '5'}))
+    mock_sleep.assert_not_called()
+
+
+@patch('noaa_sdk.retry.time.monotonic')
+def test_attempt_timeout_capped_by_deadline(mock_monotonic):
+    mock_monotonic.return_value = 108.0
+    assert RetryPolicy().attempt_timeout(100.0) == (10.0, 30.0)
+    assert RetryPolicy(timeout=None).attempt_timeout(100.0) is None
+    assert RetryPolicy(deadline=20).attempt_timeout(100.0) == (10.0, 12.0)
+    assert RetryPolicy(timeout=5, deadline=10).attempt_timeout(100.0) == (
+        2.0, 2.0)
@@ -0,0 +1,109 @@
+from noaa_sdk import noaa
+from noaa_sdk.stations import StationIndex, _chord_to_km, _to_xyz
+from tests.stub_server import StubServer
+import math
+import random
+import pytest
+
+
+def _feature(station_id, lat, lon):
+    return {'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {'stationIdentifier': station_id}}
+
+
+def _brute_force(stations, lat, lon, k):
+    query = _to_xyz(lat, lon)
+    distances = sorted(
+        (_chord_to_km(math.sqrt(sum(
+            (a - b) ** 2 for a, b in zip(query, _to_xyz(*coords))))),
+         station_id)
+        for station_id, coords in stations.items())
+    return [station_id for _, station_id in distances[:k]]
+
+
+@pytest.fixture
+def stations():
+    rng = random.Random(1)
+    return dict(
+        ('S{:04d}'.format(i), (rng.uniform(18, 72), rng.uniform(-180, -60)))
+        for i in range(2000))
+
+
+def test_nearest_stations_matches_brute_force(stations):
+    index = StationIndex(
+        (station_id, lat, lon) for station_id, (lat, lon) in stations.items())
+    rng = random.Random(2)
+    for _ in range(50):
+        lat, lon = rng.uniform(15, 75), rng.uniform(-180, -55)
+        nearest = index.nearest_stations(lat, lon, k=5)
+        assert [s for s, _ in nearest] == _brute_force(
+            stations, lat, lon, 5)
+        assert [d for _, d in nearest] == sorted(d for _, d in nearest)
+
+
+def test_nearest_stations_max_km():
+    index = StationIndex.from_features([
+        _feature('KJFK', 40.6392, -73.7639),
+        _feature('KLGA', 40.7792, -73.8803),
+        _feature('KBOS', 42.3606, -71.0097)])
+    nearest = index.nearest_stations(40.7314, -73.8656, k=3, max_km=50)
+    assert [s for s, _ in nearest] == ['KLGA', 'KJFK']
+    assert nearest[0][1] == pytest.approx(5.4, abs=0.1)
+    assert index.nearest_stations(0, 0, k=3, max_km=50) == []
+
+
+def test_update_and_remove():
+    index = StationIndex.from_features([_feature('KJFK', 40.6, -73.8)])
+    assert index.update([_feature('KJFK', 40.6, -73.8)]) == 0
+    assert index.update([_feature('KBOS', 42.4, -71.0),
+                         _feature('KJFK', 40.64, -73.76)]) == 2
+    assert index.coordinates('KJFK') == (40.64, -73.76)
+    index.remove(['KJFK'])
+    assert 'KJFK' not in index
+    assert index.nearest_stations(40.6, -73.8) == [
+        ('KBOS', pytest.approx(308, abs=2))]
+
+
+def test_save_and_load(tmpdir, stations):
+    index = StationIndex(
+        (station_id, lat, lon) for station_id, (lat, lon) in stations.items())
+    path = str(tmpdir.join('stations.idx'))
+    index.save(path)
+    loaded = StationIndex.load(path)
+    assert len(loaded) == len(index)
+    assert loaded.updated == index.updated
+    assert loaded.nearest_stations(40.7, -73.8, k=10) == (
+        index.nearest_stations(40.7, -73.8, k=10))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x00' * 32)
+    with pytest.raises(Exception) as err:
+        StationIndex.load(path)
+    assert 'not a station index file' in str(err.value)
+
+
+def test_get_observations_uses_station_index():
+    index = StationIndex.from_features([
+        _feature('KJFK', 40.6392, -73.7639),
+        _feature('KBOS', 42.3606, -71.0097)])
+    routes = {'/stations/KJFK/observations': {
+        'features': [{'properties': {'station': 'KJFK'}}]}}
+    with StubServer(routes) as server:
+        n = server.point(noaa.NOAA(
+            user_agent='test_agent', station_index=index))
+        observations = list(n.get_observations_by_lat_lon(40.73, -73.86))
+    assert observations == [{'station': 'KJFK'}]
+    assert server.requests == ['/stations/KJFK/observations']
+
+
+def test_build_from_paginated_feed():
+    routes = {'/stations': lambda handler: {
+        'features': [_feature('KJFK', 40.6, -73.8)],
+        'pagination': {'next': 'http://{}/stations?cursor=2'.format(
+            handler.headers['Host'])}}
+        if not handler.stub_query else {
+            'features': [_feature('KBOS', 42.4, -71.0)]}}
+    with StubServer(routes) as server:
+        n = server.point(noaa.NOAA(user_agent='test_agent'))
+        index = StationIndex.build(n, prefetch=False)
+    assert len(index) == 2
@@ -0,0 +1,104 @@
+from noaa_sdk import noaa
+from noaa_sdk.store import ResponseStore, StoredResponse, main, recording
+from tests.stub_server import StubServer
+import os
+import pytest
+
+
+def test_key_ignores_conditional_headers(tmpdir):
+    store = ResponseStore(str(tmpdir))
+    header = {'User-Agent': 'test_agent', 'accept': 'application/geo+json'}
+    key = store.key('api.weather.gov', '/offices/OKX', header)
+    assert key == store.key(
+        'api.weather.gov', 'offices/OKX',
+        dict(header, **{'If-None-Match': '"v1"'}))
+    assert key != store.key('api.weather.gov', '/offices/BOX', header)
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_save_and_load(tmpdir, compress):
+    store = ResponseStore(str(tmpdir), mode='record', compress=compress)
+    key = store.key('api.weather.gov', '/offices/OKX')
+    store.save(key, 'api.weather.gov', '/offices/OKX', StoredResponse(
+        200, b'{"id": "OKX"}', headers={'ETag': '"v1"'}, reason='OK'))
+
+    response = ResponseStore(str(tmpdir)).load(key)
+    assert response.status_code == 200
+    assert response.json() == {'id': 'OKX'}
+    assert response.headers['etag'] == '"v1"'
+    assert b''.join(response.iter_content(4)) == b'{"id": "OKX"}'
+    assert os.listdir(str(tmpdir)) == [
+        key + ('.gz' if compress else '.bin')]
+
+
+def test_memory_is_bounded(tmpdir):
+    recorder = ResponseStore(str(tmpdir), mode='record', memory_size=2)
+    keys = []
+    for office in ('OKX', 'BOX', 'PHI'):
+        key = recorder.key('api.weather.gov', '/offices/' + office)
+        recorder.save(key, 'api.weather.gov', '/offices/' + office,
+                      StoredResponse(200, b'{}'))
+        keys.append(key)
+    assert len(recorder._memory) == 0
+
+    store = ResponseStore(str(tmpdir), memory_size=2)
+    for key in keys:
+        assert store.load(key).status_code == 200
+    assert len(store._memory) == 2
+
+
+def test_record_then_replay_offline(tmpdir):
+    routes = {'/offices/OKX': {'id': 'OKX'}}
+    with StubServer(routes) as server:
+        n = server.point(noaa.NOAA(user_agent='test_agent'))
+        with recording(str(tmpdir), n):
+            assert n.offices('OKX') == {'id': 'OKX'}
+        assert n.response_store is None
+
+    n.response_store = ResponseStore(str(tmpdir))
+    assert n.offices('OKX') == {'id': 'OKX'}
+    with pytest.raises(Exception) as err:
+        n.offices('BOX')
+    assert str(err.value).startswith('Error: no recorded response')
+    assert len(server.requests) == 1
+
+
+def test_record_revalidation_then_replay(tmpdir):
+    conditional = []
+
+    def alerts(handler):
+        conditional.append(handler.headers.get('If-None-Match'))
+        if handler.headers.get('If-None-Match') == '"v1"':
+            return (304, b'', {'ETag': '"v1"'})
+        return (200, {'features': []}, {'ETag': '"v1"'})
+
+    with StubServer({'/alerts/active': alerts}) as server:
+        n = server.point(noaa.NOAA(
+            user_agent='test_agent', response_cache=True))
+        with recording(str(tmpdir), n):
+            assert n.active_alerts() == {'features': []}
+            assert n.active_alerts() == {'features': []}
+    assert conditional == [None, None]
+
+    n = server.point(noaa.NOAA(user_agent='test_agent'))
+    n.response_store = ResponseStore(str(tmpdir))
+    assert n.active_alerts() == {'features': []}
+
+
+def test_store_from_environ(tmpdir):
+    assert ResponseStore.from_environ({}) is None
+    store = ResponseStore.from_environ({
+        'NOAA_SDK_STORE': str(tmpdir), 'NOAA_SDK_STORE_MODE': 'record'})
+    assert store.mode == 'record'
+    with pytest.raises(Exception) as err:
+        ResponseStore(str(tmpdir), mode='test')
+    assert 'invalid mode' in str(err.value)
+
+
+def test_cli_list(tmpdir, capsys):
+    store = ResponseStore(str(tmpdir), mode='record')
+    key = store.key('api.weather.gov', '/offices/OKX')
+    store.save(key, 'api.weather.gov', '/offices/OKX',
+               StoredResponse(200, b'{}'))
+    assert main(['list', str(tmpdir)]) == 0
+    assert 'api.weather.gov/offices/OKX' in capsys.readouterr().out
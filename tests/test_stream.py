@@ -0,0 +1,64 @@
+from noaa_sdk.stream import iter_features
+import json
+from unittest.mock import patch
+import pytest
+
+DOCUMENT = {
+    '@context': ['https://geojson.org/geojson-ld/geojson-context.jsonld'],
+    'type': 'FeatureCollection',
+    'features': [
+        {'id': 1, 'properties': {'areaDesc': 'Queens, été ☃',
+                                 'values': [1.5, -2e3, None, True]}},
+        {'id': 2, 'properties': {'text': 'brackets ] } and "quotes"'}},
+    ],
+    'title': 'Alerts',
+    'updated': 12345,
+    'pagination': {'next': 'https://api.weather.gov/alerts?cursor=abc'},
+}
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 64, 100000])
+def test_iter_features_any_chunk_size(size):
+    data = json.dumps(DOCUMENT, indent=1, ensure_ascii=False).encode('utf-8')
+    metadata = {}
+    features = list(iter_features(chunked(data, size), metadata=metadata))
+    assert features == DOCUMENT['features']
+    assert metadata == dict(
+        (k, v) for k, v in DOCUMENT.items() if k != 'features')
+
+
+def test_iter_features_is_incremental():
+    data = json.dumps(DOCUMENT).encode('utf-8')
+    chunks = iter(chunked(data, 16))
+    features = iter_features(chunks)
+    assert next(features)['id'] == 1
+    assert next(chunks, None) is not None
+
+
+def test_iter_features_empty_and_missing():
+    assert list(iter_features([b'{"features": []}'])) == []
+    assert list(iter_features([b'{"type": "Feature"}'])) == []
+
+
+def test_iter_features_truncated():
+    with pytest.raises(Exception) as err:
+        list(iter_features([b'{"features": [{"id": 1}, {"id"']))
+    assert str(err.value) == 'Error: truncated JSON stream.'
+
+
+def test_large_feature_is_decoded_once():
+    feature = {'properties': {'values': [
+        {'v': i, 'text': 'a "[{" \\ ]} b'} for i in range(2000)]}}
+    data = json.dumps({'features': [feature, {'id': 2}]}).encode('utf-8')
+    decode = json.JSONDecoder.raw_decode
+    with patch.object(json.JSONDecoder, 'raw_decode', autospec=True,
+                      side_effect=decode) as mock_decode:
+        features = list(iter_features(chunked(data, 64)))
+    assert features == [feature, {'id': 2}]
+    # Key, first attempt on the partial feature, the whole feature and
+    # the last feature.
+    assert mock_decode.call_count == 4